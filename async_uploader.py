@@ -0,0 +1,548 @@
+import asyncio
+import ftplib
+import logging
+import os
+import posixpath
+import queue
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+from remote_dirs import RemoteDirCache, remote_location
+from upload_pool import ParallelUploader, UploadQueue
+
+# Erros que justificam reconectar e tentar de novo (asyncio.TimeoutError só virou alias no 3.11)
+RETRYABLE_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError, OSError, ftplib.error_temp)
+
+
+class AsyncFTPClient:
+    """Cliente FTP mínimo sobre asyncio: canal de controle e canal de dados passivo.
+
+    Usa as mesmas exceções do ftplib (error_temp, error_perm, error_reply)
+    para que o tratamento de erros seja igual ao do FTPImageUploader.
+    """
+
+    def __init__(self, host, port, timeout=30, metrics=None):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+        # transfer_metrics.TransferMetrics opcional: fases data_open e transfer do store()
+        self.metrics = metrics
+        self.reader = None
+        self.writer = None
+        # Diretório atual ('' = inicial) e diretório inicial da sessão, como no FTPImageUploader
+        self.remote_cwd = ""
+        self.home_dir = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        code, text = await self.read_reply()
+        self._check(code, text, "2")
+
+    async def login(self, username, password):
+        code, text = await self.command(f"USER {username}")
+        if code == 331:
+            code, text = await self.command(f"PASS {password}")
+        self._check(code, text, "2")
+
+    async def read_reply(self):
+        """Lê uma resposta (inclusive multilinha) e retorna (código, texto)"""
+        line = await self._readline()
+        lines = [line]
+        if len(line) > 3 and line[3] == "-":
+            code = line[:3]
+            while True:
+                line = await self._readline()
+                lines.append(line)
+                if line[:3] == code and line[3:4] == " ":
+                    break
+        try:
+            return int(lines[0][:3]), "\n".join(lines)
+        except ValueError:
+            raise ftplib.error_proto(lines[0])
+
+    async def _readline(self):
+        raw = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not raw:
+            raise ConnectionError("Conexão de controle encerrada pelo servidor")
+        return raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    async def command(self, cmd):
+        self.writer.write((cmd + "\r\n").encode("utf-8"))
+        await self.writer.drain()
+        return await self.read_reply()
+
+    async def voidcmd(self, cmd, expected="2"):
+        code, text = await self.command(cmd)
+        self._check(code, text, expected)
+        return text
+
+    @staticmethod
+    def _check(code, text, expected):
+        if str(code)[0] in expected:
+            return
+        if 400 <= code < 500:
+            raise ftplib.error_temp(text)
+        if code >= 500:
+            raise ftplib.error_perm(text)
+        raise ftplib.error_reply(text)
+
+    async def _open_data_channel(self):
+        """Abre o canal de dados em modo passivo (EPSV, ou PASV se não suportado)"""
+        try:
+            text = await self.voidcmd("EPSV")
+            port = int(re.search(r"\(\|\|\|(\d+)\|\)", text).group(1))
+        except (ftplib.error_perm, AttributeError):
+            text = await self.voidcmd("PASV")
+            numbers = re.search(r"(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)", text).groups()
+            # Como o ftplib, ignora o IP informado e usa o do canal de controle
+            port = (int(numbers[4]) << 8) + int(numbers[5])
+        return await asyncio.wait_for(asyncio.open_connection(self.host, port), self.timeout)
+
+    async def size(self, filename):
+        await self.voidcmd("TYPE I")
+        text = await self.voidcmd(f"SIZE {filename}")
+        return int(text.split()[1])
+
+    async def store(self, cmd, file, blocksize=65536, callback=None, rest=None, rate_limiter=None, rate_bucket=None,
+                    on_started=None):
+        """Envia o arquivo pelo canal de dados; equivalente assíncrono do storbinary.
+
+        on_started é chamado quando o servidor aceita o comando (resposta 1xx).
+        """
+        loop = asyncio.get_running_loop()
+        await self.voidcmd("TYPE I")
+        started = time.perf_counter()
+        data_reader, data_writer = await self._open_data_channel()
+        sent = 0
+        try:
+            if rest:
+                await self.voidcmd(f"REST {rest}", "3")
+            code, text = await self.command(cmd)
+            self._check(code, text, "1")
+            opened = time.perf_counter()
+            if on_started:
+                on_started()
+            while True:
+                size = rate_limiter.chunk_size(rate_bucket, blocksize) if rate_limiter else blocksize
+                # A leitura do disco não bloqueia o loop de eventos
+                chunk = await loop.run_in_executor(None, file.read, size)
+                if not chunk:
+                    break
+                if rate_limiter:
+                    wait = rate_limiter.delay(rate_bucket, len(chunk))
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                data_writer.write(chunk)
+                await data_writer.drain()
+                sent += len(chunk)
+                if callback:
+                    callback(chunk)
+        finally:
+            data_writer.close()
+            try:
+                await data_writer.wait_closed()
+            except OSError:
+                pass
+        code, text = await self.read_reply()
+        self._check(code, text, "2")
+        if self.metrics:
+            self.metrics.observe("data_open", opened - started)
+            self.metrics.observe("transfer", time.perf_counter() - opened)
+            self.metrics.inc("bytes_sent", sent)
+
+    async def quit(self):
+        try:
+            await self.voidcmd("QUIT")
+        except Exception:
+            pass
+        self.close()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class AsyncFTPUploader:
+    """Versão assíncrona do FTPImageUploader, com a mesma semântica de upload_file.
+
+    Faz até 3 tentativas com reconexão, retoma arquivos grandes a partir do
+    tamanho remoto (REST) com o registro de envios parciais no FileLog e
+    verifica o tamanho remoto quando force=False. Hash de integridade e
+    impressão digital ficam só no motor com threads.
+    """
+
+    def __init__(self, host, port, username, password, file_log=None, rate_limiter=None,
+                 remote_dir=None, dir_cache=None, remote_cache=None, metrics=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.file_log = file_log
+        self.client = None
+        self.is_connected = False
+        self.pool = None
+        self.last_fingerprint = None
+        self.resume_min_size = 1024 * 1024
+        self.rate_limiter = rate_limiter
+        self.rate_bucket = rate_limiter.connection_bucket() if rate_limiter else None
+        self.remote_dir = remote_dir
+        self.dir_cache = dir_cache if dir_cache is not None else RemoteDirCache()
+        self.remote_cache = remote_cache
+        self.metrics = metrics
+        # Diretório local (relativo) do último arquivo, usado para agrupar a fila por diretório
+        self.last_dir = None
+        self.logger = logging.getLogger(__name__)
+
+    async def connect(self):
+        """Conecta ao servidor FTP"""
+        self.disconnect()
+        try:
+            self.client = AsyncFTPClient(self.host, self.port, metrics=self.metrics)
+            with self._phase("connect"):
+                await self.client.connect()
+            with self._phase("login"):
+                await self.client.login(self.username, self.password)
+            self.is_connected = True
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao conectar ao servidor FTP: {str(e)}")
+            self.disconnect()
+            return False
+
+    def _phase(self, name):
+        return self.metrics.phase(name) if self.metrics else nullcontext()
+
+    def disconnect(self):
+        """Fecha a conexão sem esperar resposta do servidor"""
+        if self.client:
+            self.client.close()
+        self.client = None
+        self.is_connected = False
+
+    async def quit(self):
+        if self.client:
+            await self.client.quit()
+        self.client = None
+        self.is_connected = False
+
+    async def upload_file(self, filepath, progress_callback=None, force=False, filename=None):
+        """Faz upload de um arquivo para o servidor FTP, retomando do ponto de falha"""
+        max_retries = 3
+        retry_count = 0
+        filename = filename or os.path.basename(filepath)
+        remote_dir, remote_name = remote_location(self.remote_dir, filename)
+        self.last_dir = posixpath.dirname(filename)
+        filesize = 0
+        mtime = None
+        resume_offset = None
+        # Como no FTPImageUploader: o tamanho remoto só vale como offset depois que um STOR deste envio começou
+        transfer_started = False
+
+        while retry_count < max_retries:
+            try:
+                if not self.is_connected:
+                    if not await self.connect():
+                        self.logger.error("Não foi possível reconectar ao servidor FTP")
+                        return False
+
+                filesize = os.path.getsize(filepath)
+                mtime = os.path.getmtime(filepath)
+                resumable = filesize >= self.resume_min_size
+                await self._change_remote_dir(remote_dir)
+
+                if resume_offset is None:
+                    resume_offset = 0
+                    if resumable and self.file_log:
+                        partial = self.file_log.get_partial_upload(filename)
+                        if partial and partial.get("size") == filesize and partial.get("mtime") == mtime:
+                            resume_offset = await self._remote_resume_offset(remote_name, filesize)
+
+                def on_started(offset=resume_offset):
+                    nonlocal transfer_started
+                    transfer_started = True
+                    if resumable and self.file_log:
+                        self.file_log.update_partial_upload(filename, offset, filesize, mtime)
+
+                if resume_offset < filesize or filesize == 0:
+                    with open(filepath, 'rb') as file:
+                        callback_wrapper = None
+                        if progress_callback:
+                            bytes_sent = resume_offset
+                            last_callback = resume_offset
+                            def callback_wrapper(data):
+                                nonlocal bytes_sent, last_callback
+                                bytes_sent += len(data)
+                                # Atualiza a cada 256 KB enviados ou ao finalizar
+                                if bytes_sent - last_callback >= 262144 or bytes_sent == filesize:
+                                    progress_callback(bytes_sent, filesize)
+                                    last_callback = bytes_sent
+
+                        if resume_offset:
+                            self.logger.info(f"Retomando upload do arquivo {filename} a partir do byte {resume_offset}")
+                            await self._resume_store(remote_name, file, resume_offset, callback_wrapper, on_started)
+                        else:
+                            await self.client.store(f'STOR {remote_name}', file, callback=callback_wrapper,
+                                                    rate_limiter=self.rate_limiter, rate_bucket=self.rate_bucket,
+                                                    on_started=on_started)
+
+                if resumable and self.file_log:
+                    self.file_log.clear_partial_upload(filename)
+                if self.remote_cache:
+                    self.remote_cache.record(remote_dir, remote_name, filesize)
+
+                if force:
+                    return True
+
+                with self._phase("verify"):
+                    remote_size = await self._remote_size(remote_name)
+                if remote_size == filesize:
+                    self.logger.info(f"Upload do arquivo {filename} verificado com sucesso")
+                    return True
+                self.logger.error(f"Falha na verificação do upload do arquivo {filename}")
+                return False
+
+            except asyncio.CancelledError:
+                # Cancelamento cooperativo: não deixa a sessão em estado indefinido
+                self.disconnect()
+                raise
+
+            except RETRYABLE_ERRORS as e:
+                retry_count += 1
+                self.logger.warning(f"Tentativa {retry_count} de {max_retries} falhou: {str(e)}")
+                self.disconnect()
+                if self.metrics:
+                    self.metrics.inc("retries")
+
+                if retry_count < max_retries:
+                    await asyncio.sleep(2)
+                    if self.metrics:
+                        self.metrics.inc("reconnects")
+                    if not await self.connect():
+                        resume_offset = 0
+                    elif transfer_started and filesize >= self.resume_min_size:
+                        resume_offset = await self._remote_resume_offset(remote_name, filesize, remote_dir)
+                        if self.file_log:
+                            self.file_log.update_partial_upload(filename, resume_offset, filesize, mtime)
+                    elif transfer_started:
+                        resume_offset = 0
+                    # Sem STOR iniciado o servidor não mudou: mantém o offset
+                else:
+                    self.logger.error(f"Erro de conexão após {max_retries} tentativas: {str(e)}")
+                    return False
+
+            except Exception as e:
+                self.logger.error(f"Erro no upload do arquivo {filepath}: {str(e)}")
+                return False
+
+        return False
+
+    async def _change_remote_dir(self, directory):
+        """Entra no diretório remoto do arquivo, criando-o se preciso (ver FTPImageUploader)"""
+        client = self.client
+        if client.remote_cwd == directory:
+            return
+        if directory.startswith("/"):
+            path = directory
+        else:
+            if client.home_dir is None:
+                client.home_dir = ftplib.parse257(await client.voidcmd("PWD"))
+            path = posixpath.join(client.home_dir, directory) if directory else client.home_dir
+        try:
+            await client.voidcmd(f"CWD {path}")
+        except ftplib.error_perm:
+            self.dir_cache.discard(path)
+            for missing in self.dir_cache.missing(path):
+                try:
+                    await client.voidcmd(f"MKD {missing}")
+                    self.logger.info(f"Diretório remoto criado: {missing}")
+                except ftplib.error_perm:
+                    pass
+            await client.voidcmd(f"CWD {path}")
+        self.dir_cache.add(path)
+        client.remote_cwd = directory
+
+    async def _remote_size(self, filename):
+        try:
+            return await self.client.size(filename)
+        except ftplib.error_perm:
+            return None
+
+    async def _resume_store(self, remote_name, file, offset, callback=None, on_started=None):
+        """Continua um envio a partir de offset usando REST+STOR, ou APPE se REST for recusado"""
+        file.seek(offset)
+        try:
+            await self.client.store(f'STOR {remote_name}', file, callback=callback, rest=offset,
+                                    rate_limiter=self.rate_limiter, rate_bucket=self.rate_bucket,
+                                    on_started=on_started)
+        except ftplib.error_perm as e:
+            if not str(e).startswith(('500', '501', '502', '504')):
+                raise
+            self.logger.info(f"Servidor não aceitou REST, usando APPE para {remote_name}")
+            file.seek(offset)
+            await self.client.store(f'APPE {remote_name}', file, callback=callback,
+                                    rate_limiter=self.rate_limiter, rate_bucket=self.rate_bucket,
+                                    on_started=on_started)
+
+    async def _remote_resume_offset(self, filename, filesize, remote_dir=None):
+        """Consulta o tamanho remoto (SIZE) e retorna o offset a partir do qual retomar"""
+        try:
+            if remote_dir is not None:
+                await self._change_remote_dir(remote_dir)
+            remote_size = await self._remote_size(filename) or 0
+        except Exception as e:
+            self.logger.warning(f"Não foi possível consultar o tamanho remoto de {filename}: {str(e)}")
+            return 0
+        return remote_size if remote_size <= filesize else 0
+
+
+class AsyncParallelUploader(ParallelUploader):
+    """Consome a fila de upload com centenas de transferências em um único loop asyncio.
+
+    Mesma interface do ParallelUploader (start/stop/stats e callbacks), mas
+    num_connections é o limite de transferências simultâneas, todas na mesma
+    thread. As sessões ficam numa lista de ociosas e são reutilizadas; ao
+    parar, as transferências em andamento são canceladas e os arquivos
+    marcados com "Erro" para serem reenviados depois.
+    """
+
+    def __init__(self, host, port, username, password, upload_queue, file_log=None,
+                 num_connections=50, on_status=None, on_progress=None, rate_limiter=None,
+                 remote_dir=None, dir_cache=None, remote_cache=None, metrics=None):
+        dir_cache = dir_cache if dir_cache is not None else RemoteDirCache()
+        super().__init__(
+            lambda: AsyncFTPUploader(host, port, username, password, file_log=file_log, rate_limiter=rate_limiter,
+                                     remote_dir=remote_dir, dir_cache=dir_cache, remote_cache=remote_cache,
+                                     metrics=metrics),
+            upload_queue, file_log=file_log, num_connections=num_connections,
+            on_status=on_status, on_progress=on_progress, metrics=metrics
+        )
+        self._loop = None
+        self._main_task = None
+        self._idle_uploaders = []
+
+    def start(self):
+        """Inicia o loop asyncio em uma thread dedicada"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._started_at = None
+        worker = threading.Thread(target=lambda: asyncio.run(self._main()), name="ftp-upload-async", daemon=True)
+        self._workers = [worker]
+        worker.start()
+        self.logger.info(f"Motor assíncrono de upload iniciado com até {self.num_connections} transferências")
+
+    def stop(self, timeout=5):
+        """Cancela as transferências em andamento e encerra o loop"""
+        self._stop_event.set()
+        if self._loop and self._main_task:
+            try:
+                self._loop.call_soon_threadsafe(self._main_task.cancel)
+            except RuntimeError:
+                # Loop já encerrado
+                pass
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self.logger.info("Motor assíncrono de upload parado")
+
+    def _get_item(self, directory=None):
+        try:
+            if directory is not None and isinstance(self.upload_queue, UploadQueue):
+                return self.upload_queue.get(timeout=0.5, directory=directory)
+            return self.upload_queue.get(timeout=0.5)
+        except queue.Empty:
+            return None
+
+    async def _main(self):
+        self._started_at = time.monotonic()
+        self._loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        semaphore = asyncio.Semaphore(self.num_connections)
+        tasks = set()
+        pending_get = None
+        try:
+            while not self._stop_event.is_set():
+                # Só retira da fila quando há vaga: a fila segura o excesso
+                await semaphore.acquire()
+                # Prefere um arquivo do diretório em que está a sessão ociosa que vai enviá-lo
+                directory = self._idle_uploaders[-1].last_dir if self._idle_uploaders else None
+                # shield: cancelar a espera não para a thread do executor, que ainda pode
+                # retirar um item da fila; o finally recolhe esse item
+                pending_get = self._loop.run_in_executor(None, self._get_item, directory)
+                item = await asyncio.shield(pending_get)
+                pending_get = None
+                if item is None:
+                    semaphore.release()
+                    continue
+                task = asyncio.ensure_future(self._run_one(item, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            if pending_get is not None:
+                # _get_item espera no máximo 0,5 s
+                item = await pending_get
+                if item is not None:
+                    self._requeue(item)
+            for task in list(tasks):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for uploader in self._idle_uploaders:
+                await uploader.quit()
+            self._idle_uploaders = []
+
+    async def _run_one(self, item, semaphore):
+        filepath, filename = item
+        uploader = self._idle_uploaders.pop() if self._idle_uploaders else self.uploader_factory()
+        try:
+            await self._upload_one_async(uploader, filepath, filename)
+            self._idle_uploaders.append(uploader)
+        except asyncio.CancelledError:
+            self._notify_status(filename, "Erro")
+            uploader.disconnect()
+        except Exception as e:
+            self.logger.error(f"Erro no upload do arquivo {filename}: {str(e)}")
+            self._notify_status(filename, f"Erro: {str(e)}")
+            uploader.disconnect()
+        finally:
+            self._finish(item)
+            semaphore.release()
+
+    async def _upload_one_async(self, uploader, filepath, filename):
+        """Envia um arquivo e registra o resultado no FileLog"""
+        if not os.path.exists(filepath):
+            self.logger.error(f"Arquivo não encontrado: {filepath}")
+            self._notify_status(filename, "Erro")
+            return
+
+        self._notify_status(filename, "Enviando...")
+
+        progress_callback = None
+        if self.on_progress:
+            def progress_callback(current, total):
+                self.on_progress(filename, current, total)
+
+        filesize = os.path.getsize(filepath)
+        started = time.perf_counter()
+        uploaded = await uploader.upload_file(filepath, progress_callback=progress_callback, force=True, filename=filename)
+        self._record_upload(time.perf_counter() - started, uploaded)
+        if uploaded:
+            if self.file_log:
+                self.file_log.update_file_mtime(filename, os.path.getmtime(filepath))
+                self.file_log.clear_bundle(filename)
+                # O motor asyncio não calcula o hash: o registrado é de um conteúdo anterior
+                self.file_log.clear_uploaded_hash(filename)
+            with self._stats_lock:
+                self._files_done += 1
+                self._bytes_done += filesize
+            self._notify_status(filename, "Enviado")
+        else:
+            with self._stats_lock:
+                self._files_failed += 1
+            self._notify_status(filename, "Erro")
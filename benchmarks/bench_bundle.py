@@ -0,0 +1,104 @@
+"""Compara arquivos/s enviando arquivos pequenos um a um (um STOR cada) e em lotes tar.
+
+Os arquivos são colocados numa UploadQueue antes de iniciar os workers,
+como numa rajada de fotos na pasta monitorada. No modo lote, os tar
+recebidos pelo servidor local são abertos para conferir que todos os
+arquivos chegaram.
+
+Uso:
+    python benchmarks/bench_bundle.py --files 2000 --size 60000 --latency-ms 20 --connections 4
+"""
+import argparse
+import glob
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from local_server import BENCH_PASSWORD, BENCH_USER, make_files, start_local_server
+
+from connection_pool import FTPConnectionPool
+from file_bundler import SmallFileBundler
+from file_log import FileLog
+from ftp_uploader import FTPImageUploader
+from upload_pool import ParallelUploader, UploadQueue
+
+
+def run(paths, port, data_dir, connections, bundler=None):
+    file_log = FileLog(app_data_dir=data_dir)
+    pool = FTPConnectionPool("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, max_size=connections)
+    upload_queue = UploadQueue()
+    for path in paths:
+        upload_queue.put((path, os.path.basename(path)))
+
+    uploader_pool = ParallelUploader(
+        lambda: FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, pool=pool),
+        upload_queue,
+        file_log=file_log,
+        num_connections=connections,
+        bundler=bundler
+    )
+    started = time.perf_counter()
+    uploader_pool.start()
+    upload_queue.join()
+    elapsed = time.perf_counter() - started
+    stats = uploader_pool.stats()
+    uploader_pool.stop()
+    pool.close()
+    file_log.close()
+    stats["elapsed"] = elapsed
+    stats["files_per_sec"] = stats["files_done"] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
+def count_bundled_members(remote_dir):
+    members = 0
+    for path in glob.glob(os.path.join(remote_dir, "*.tar")):
+        with tarfile.open(path) as tar:
+            members += sum(1 for member in tar if member.isfile())
+    return members
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=60000, help="tamanho de cada arquivo em bytes")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="latência simulada por comando")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--max-files", type=int, default=500, help="arquivos por lote")
+    parser.add_argument("--max-mb", type=int, default=32, help="MB por lote")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="bench_bundle_")
+    try:
+        paths = make_files(os.path.join(work_dir, "local"), args.files, args.size)
+        modes = (
+            ("stor", "um a um", None),
+            ("lotes", "lotes", SmallFileBundler(max_file_size=max(args.size, 1), max_files=args.max_files,
+                                                max_bytes=args.max_mb * 1024 * 1024, max_wait=0.05)),
+        )
+        baseline = None
+        for key, label, bundler in modes:
+            remote_dir = os.path.join(work_dir, f"remote_{key}")
+            os.makedirs(remote_dir)
+            server, port = start_local_server(remote_dir, latency=args.latency_ms / 1000.0)
+            try:
+                stats = run(paths, port, os.path.join(work_dir, f"data_{key}"),
+                            args.connections, bundler)
+            finally:
+                server.close_all()
+            baseline = baseline or stats["files_per_sec"]
+            line = (f"{label:<8} arquivos/s={stats['files_per_sec']:8.1f}  tempo={stats['elapsed']:6.2f} s  "
+                    f"speedup={stats['files_per_sec'] / baseline:5.2f}x  falhas={stats['files_failed']}")
+            if bundler:
+                line += f"  lotes={stats['bundles_done']}  membros no servidor={count_bundled_members(remote_dir)}"
+            print(line)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Mede o custo por atualização do FileLog conforme o log cresce.
+
+Para cada tamanho de log, executa uma rodada de mudanças de status
+("Aguardando..." -> "Enviando..." -> "Enviado") e compara o journal com a
+reescrita completa do JSON (save_log a cada alteração, como era antes).
+
+Uso:
+    python benchmarks/bench_file_log.py --sizes 1000,10000,50000 --updates 3000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_log import FileLog
+
+
+def populate(data_dir, size):
+    file_log = FileLog(app_data_dir=data_dir)
+    for index in range(size):
+        file_log.log_data[f"arquivo_{index:07d}.jpg"] = {
+            "status": "Enviado", "status_date": "01/01/2024 00:00:00",
+            "upload_date": "01/01/2024 00:00:00", "mtime": 1700000000.0 + index,
+            "date": "14/11/2023 22:13:20",
+        }
+    file_log.save_log()
+    file_log.close()
+
+
+def run_updates(file_log, size, updates, full_rewrite=False):
+    statuses = ("Aguardando...", "Enviando...", "Enviado")
+    started = time.perf_counter()
+    for index in range(updates):
+        file_log.update_file_status(f"arquivo_{index % size:07d}.jpg", statuses[index % 3])
+        if full_rewrite:
+            file_log.save_log()
+    file_log.flush()
+    return (time.perf_counter() - started) / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--rewrite-updates", type=int, default=50,
+                        help="atualizações medidas no modo de reescrita completa")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_file_log_")
+    try:
+        print(f"{'entradas':>10} {'journal (us/upd)':>18} {'reescrita (us/upd)':>20}")
+        for size in [int(value) for value in args.sizes.split(",")]:
+            data_dir = os.path.join(work_dir, str(size))
+            populate(data_dir, size)
+
+            file_log = FileLog(app_data_dir=data_dir)
+            journal_cost = run_updates(file_log, size, args.updates)
+            rewrite_cost = run_updates(file_log, size, args.rewrite_updates, full_rewrite=True)
+            file_log.close()
+            print(f"{size:>10} {journal_cost * 1e6:>18.1f} {rewrite_cost * 1e6:>20.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
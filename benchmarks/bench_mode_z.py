@@ -0,0 +1,125 @@
+"""Compara envios com e sem MODE Z num link limitado (token bucket do RateLimiter).
+
+Gera uma pasta com exportações de texto (CSV, logs, XML) e fotos (dados
+aleatórios com extensão .jpg, que são enviados sem compressão), envia tudo
+para um pyftpdlib local que aceita MODE Z e confere que os arquivos
+recebidos são idênticos aos originais.
+
+Uso:
+    python benchmarks/bench_mode_z.py --text-files 40 --text-size 500000 --jpg-files 10 --limit-kbps 4096
+"""
+import argparse
+import filecmp
+import logging
+import os
+import queue
+import random
+import shutil
+import tempfile
+import time
+
+from local_server import BENCH_PASSWORD, BENCH_USER, start_local_server
+
+from file_log import FileLog
+from ftp_uploader import FTPImageUploader
+from rate_limiter import RateLimiter
+from upload_pool import ParallelUploader
+
+
+def make_text(path, size, rng):
+    """CSV com colunas repetitivas, parecido com as exportações reais"""
+    with open(path, "w") as f:
+        f.write("id;data;cliente;produto;quantidade;valor\n")
+        written = 0
+        index = 0
+        while written < size:
+            line = (f"{index};2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d};"
+                    f"CLIENTE {rng.randint(1, 500)};PRODUTO-{rng.randint(1, 80):03d};"
+                    f"{rng.randint(1, 20)};{rng.uniform(1, 999):.2f}\n")
+            f.write(line)
+            written += len(line)
+            index += 1
+
+
+def make_folder(folder, text_files, text_size, jpg_files, jpg_size):
+    os.makedirs(folder)
+    rng = random.Random(42)
+    names = []
+    for index in range(text_files):
+        name = f"export_{index:04d}.csv"
+        make_text(os.path.join(folder, name), text_size, rng)
+        names.append(name)
+    for index in range(jpg_files):
+        name = f"foto_{index:04d}.jpg"
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(os.urandom(jpg_size))
+        names.append(name)
+    return names
+
+
+def run(folder, names, remote_dir, data_dir, compression, limit_kbps, connections):
+    server, port = start_local_server(remote_dir, mode_z=True)
+    file_log = FileLog(app_data_dir=data_dir)
+    rate_limiter = RateLimiter(limit_kbps=limit_kbps)
+    upload_queue = queue.Queue()
+    for name in names:
+        upload_queue.put((os.path.join(folder, name), name))
+    uploader_pool = ParallelUploader(
+        lambda: FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD,
+                                 rate_limiter=rate_limiter, compression=compression),
+        upload_queue,
+        file_log=file_log,
+        num_connections=connections
+    )
+    started = time.perf_counter()
+    uploader_pool.start()
+    upload_queue.join()
+    elapsed = time.perf_counter() - started
+    stats = uploader_pool.stats()
+    uploader_pool.stop()
+    server.close_all()
+    file_log.close()
+    stats["elapsed"] = elapsed
+    stats["identical"] = all(
+        filecmp.cmp(os.path.join(folder, name), os.path.join(remote_dir, name), shallow=False)
+        for name in names
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text-files", type=int, default=40)
+    parser.add_argument("--text-size", type=int, default=500000, help="bytes por arquivo de texto")
+    parser.add_argument("--jpg-files", type=int, default=10)
+    parser.add_argument("--jpg-size", type=int, default=300000)
+    parser.add_argument("--limit-kbps", type=int, default=4096, help="banda total simulada (0 = sem limite)")
+    parser.add_argument("--connections", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="bench_mode_z_")
+    try:
+        folder = os.path.join(work_dir, "local")
+        names = make_folder(folder, args.text_files, args.text_size, args.jpg_files, args.jpg_size)
+        total = sum(os.path.getsize(os.path.join(folder, name)) for name in names)
+        print(f"{len(names)} arquivos, {total / 1048576:.1f} MB, limite {args.limit_kbps} KB/s")
+        for label, compression in (("MODE S", False), ("MODE Z", True)):
+            remote_dir = os.path.join(work_dir, label.replace(" ", "_"))
+            os.makedirs(remote_dir)
+            stats = run(folder, names, remote_dir, os.path.join(work_dir, f"data_{compression}"),
+                        compression, args.limit_kbps, args.connections)
+            line = (f"{label}  tempo={stats['elapsed']:6.2f} s  MB/s={total / 1048576 / stats['elapsed']:6.2f}  "
+                    f"falhas={stats['files_failed']}  idênticos={'sim' if stats['identical'] else 'NÃO'}")
+            if stats["compressed_files"]:
+                line += (f"\n        comprimidos={stats['compressed_files']}  "
+                         f"{stats['compressed_raw_bytes'] / 1048576:.1f} MB -> "
+                         f"{stats['compressed_sent_bytes'] / 1048576:.1f} MB ({stats['compression_ratio']:.1f}x)  "
+                         f"CPU={stats['compression_cpu']:.2f} s")
+            print(line)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compara a vazão do ParallelUploader com 1..N conexões contra um pyftpdlib local.
+
+Uso:
+    python benchmarks/bench_parallel_upload.py --files 300 --size 20000 --latency-ms 10 [--pool]
+"""
+import argparse
+import logging
+import os
+import queue
+import shutil
+import tempfile
+
+from local_server import BENCH_PASSWORD, BENCH_USER, make_files, start_local_server
+
+from connection_pool import FTPConnectionPool
+from file_log import FileLog
+from ftp_uploader import FTPImageUploader
+from upload_pool import ParallelUploader
+
+
+def run(connections, paths, port, data_dir, use_pool=False):
+    file_log = FileLog(app_data_dir=data_dir)
+    pool = None
+    if use_pool:
+        pool = FTPConnectionPool("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, max_size=connections)
+    upload_queue = queue.Queue()
+    for path in paths:
+        upload_queue.put((path, os.path.basename(path)))
+
+    uploader_pool = ParallelUploader(
+        lambda: FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, pool=pool),
+        upload_queue,
+        file_log=file_log,
+        num_connections=connections
+    )
+    uploader_pool.start()
+    upload_queue.join()
+    stats = uploader_pool.stats()
+    uploader_pool.stop()
+    if pool:
+        stats["pool"] = pool.stats()
+        pool.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size", type=int, default=20000, help="tamanho de cada arquivo em bytes")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="latência simulada por comando")
+    parser.add_argument("--connections", default="1,2,4,8")
+    parser.add_argument("--pool", action="store_true", help="usa FTPConnectionPool nos workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="bench_parallel_")
+    try:
+        paths = make_files(os.path.join(work_dir, "local"), args.files, args.size)
+        baseline = None
+        for connections in [int(value) for value in args.connections.split(",")]:
+            remote_dir = os.path.join(work_dir, f"remote_{connections}")
+            os.makedirs(remote_dir)
+            server, port = start_local_server(remote_dir, latency=args.latency_ms / 1000.0)
+            try:
+                stats = run(connections, paths, port, os.path.join(work_dir, f"data_{connections}"), args.pool)
+            finally:
+                server.close_all()
+            baseline = baseline or stats["files_per_sec"]
+            print(f"conexões={connections:>3}  arquivos/s={stats['files_per_sec']:8.1f}  "
+                  f"speedup={stats['files_per_sec'] / baseline:5.2f}x  falhas={stats['files_failed']}")
+            if "pool" in stats:
+                pool_stats = stats["pool"]
+                print(f"    pool: hits={pool_stats['hits']} misses={pool_stats['misses']} "
+                      f"login médio={pool_stats['login_avg'] * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Perfil de importação e tempo até a primeira janela da interface Tk.
+
+Cada medição roda em um processo novo (imports frios de módulos Python,
+cache de disco quente), com APPDATA apontando para um diretório temporário
+que tem um file_log.json de --log-entries arquivos e uma pasta monitorada
+com --files arquivos. Mede:
+
+- import: tempo de "import ftp_gui_tk" e os módulos mais caros (-X importtime)
+- janela: do início do processo até o primeiro <Map> da janela principal
+- lista: até a primeira página da tabela montada (log lido e pasta varrida)
+
+Precisa de um display (no Linux, rode com xvfb-run).
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5 --log-entries 100000 --files 2000
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no processo filho: abre a janela, registra os tempos e sai
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import ftp_gui_tk
+imported = time.perf_counter()
+marks = {"import": imported - started}
+
+app = ftp_gui_tk.FTPManagerApp()
+
+def on_map(event):
+    if event.widget is app and "window" not in marks:
+        marks["window"] = time.perf_counter() - started
+
+def poll():
+    if app._startup_done and app._list_pass is None and app.file_list_model.order:
+        marks["list"] = time.perf_counter() - started
+        print(json.dumps(marks))
+        app.is_running = False
+        app.file_log.close()
+        app.destroy()
+        return
+    app.after(5, poll)
+
+app.bind("<Map>", on_map, add="+")
+app.after(5, poll)
+app.mainloop()
+"""
+
+
+def prepare(work_dir, log_entries, files):
+    data_dir = os.path.join(work_dir, "FTP Manager")
+    folder = os.path.join(work_dir, "monitorada")
+    os.makedirs(data_dir)
+    os.makedirs(folder)
+    for index in range(files):
+        with open(os.path.join(folder, f"arquivo_{index:07d}.jpg"), "wb") as f:
+            f.write(b"\0" * 1024)
+    log_data = {
+        f"arquivo_{index:07d}.jpg": {
+            "status": "Enviado", "status_date": "01/01/2024 00:00:00",
+            "upload_date": "01/01/2024 00:00:00", "mtime": 1700000000.0 + index,
+            "date": "14/11/2023 22:13:20",
+        }
+        for index in range(log_entries)
+    }
+    with open(os.path.join(data_dir, "file_log.json"), "w") as f:
+        json.dump(log_data, f, indent=4)
+    with open(os.path.join(data_dir, "ftp_config.json"), "w") as f:
+        json.dump({"monitored_folder": folder}, f)
+
+
+def import_profile(env, top):
+    """Os `top` módulos com maior tempo acumulado de importação"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ftp_gui_tk"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    return result.returncode, modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--log-entries", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        prepare(work_dir, args.log_entries, args.files)
+        env = dict(os.environ, APPDATA=work_dir)
+
+        returncode, modules = import_profile(env, args.top)
+        print(f"Módulos mais caros na importação{' (a importação falhou)' if returncode else ''}:")
+        for cumulative, name in modules:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        samples = {"import": [], "window": [], "list": []}
+        for _ in range(args.runs):
+            result = subprocess.run(
+                [sys.executable, "-c", CHILD, ROOT_DIR],
+                cwd=work_dir, env=env, capture_output=True, text=True, timeout=120
+            )
+            if result.returncode != 0 or not result.stdout.strip():
+                print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "processo falhou")
+                return 1
+            marks = json.loads(result.stdout.strip().splitlines()[-1])
+            for key in samples:
+                if key in marks:
+                    samples[key].append(marks[key])
+
+        print(f"\n{args.runs} execuções, log com {args.log_entries} entradas, {args.files} arquivos na pasta:")
+        for key, label in (("import", "import ftp_gui_tk"), ("window", "primeira janela"), ("list", "lista montada")):
+            values = samples[key]
+            if not values:
+                print(f"  {label:<18} não medido")
+                continue
+            print(f"  {label:<18} mediana {statistics.median(values) * 1000:7.1f} ms  "
+                  f"mín {min(values) * 1000:7.1f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
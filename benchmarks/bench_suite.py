@@ -0,0 +1,298 @@
+"""Suíte reprodutível de benchmarks de transferência contra um pyftpdlib local.
+
+Gera conjuntos de arquivos sintéticos a partir de uma semente fixa:
+
+- tiny:  muitos arquivos pequenos (fotos de rajada, arquivos de controle)
+- mixed: tamanhos variados em distribuição log-normal, em subpastas
+- huge:  poucos arquivos grandes
+
+e envia cada conjunto por dois caminhos:
+
+- direct:   FTPImageUploader.upload_file, um arquivo depois do outro
+- pipeline: UploadQueue + ParallelUploader com --connections conexões
+
+Cada combinação roda em um processo separado (o pico de RSS é o do
+cliente, sem o servidor e sem as rodadas anteriores) e relata arquivos/s,
+MB/s, latência por arquivo p50/p99 e pico de RSS. No modo direct a
+latência é a chamada a upload_file; no pipeline, da entrada na fila até o
+status "Enviado". O resultado sai em JSON (stdout ou --output).
+
+Com --baseline, compara com um JSON anterior e termina com código 1 se
+arquivos/s ou MB/s de alguma combinação caiu mais que --tolerance.
+
+--scale multiplica quantidades e tamanhos (ex.: 0.1 para uma rodada rápida).
+
+Uso:
+    python benchmarks/bench_suite.py --output resultado.json
+    python benchmarks/bench_suite.py --sets tiny,mixed --scale 0.2 --baseline resultado.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from local_server import BENCH_PASSWORD, BENCH_USER, ROOT_DIR, peak_rss_mb, start_local_server
+
+SEED = 20240101
+SETS = ("tiny", "mixed", "huge")
+DRIVERS = ("direct", "pipeline")
+
+
+def set_sizes(name, scale, rng):
+    """Tamanhos dos arquivos de um conjunto, sempre os mesmos para a mesma semente e escala"""
+    if name == "tiny":
+        return [rng.randint(1024, 8 * 1024) for _ in range(max(1, int(2000 * scale)))]
+    if name == "mixed":
+        # Mediana ~100 KB, cauda até 32 MB
+        return [
+            min(32 * 1024 * 1024, max(1, int(rng.lognormvariate(11.5, 1.6) * scale)))
+            for _ in range(max(1, int(300 * scale)))
+        ]
+    if name == "huge":
+        return [int(256 * 1024 * 1024 * scale) for _ in range(3)]
+    raise ValueError(f"Conjunto desconhecido: {name}")
+
+
+def generate_set(name, folder, scale, seed):
+    """Cria os arquivos do conjunto e retorna a lista de chaves (caminhos relativos com '/')"""
+    rng = random.Random(f"{seed}-{name}")
+    # Conteúdo pseudoaleatório (não comprimível), repetido a partir de um bloco de 1 MB
+    block = rng.randbytes(1024 * 1024)
+    filenames = []
+    for index, size in enumerate(set_sizes(name, scale, rng)):
+        filename = f"d{index % 8}/{name}_{index:06d}.bin" if name == "mixed" else f"{name}_{index:06d}.bin"
+        path = os.path.join(folder, *filename.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining:
+                chunk = block[:min(remaining, len(block))]
+                f.write(chunk)
+                remaining -= len(chunk)
+        filenames.append(filename)
+    return filenames
+
+
+def percentile(values, fraction):
+    """Percentil pelo posto mais próximo; None para lista vazia"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_direct(folder, filenames, port, data_dir):
+    from file_log import FileLog
+    from ftp_uploader import FTPImageUploader
+
+    file_log = FileLog(app_data_dir=data_dir)
+    uploader = FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, file_log=file_log)
+    latencies = []
+    failed = 0
+    started = time.perf_counter()
+    uploader.connect()
+    for filename in filenames:
+        began = time.perf_counter()
+        if uploader.upload_file(os.path.join(folder, *filename.split("/")), filename=filename):
+            latencies.append(time.perf_counter() - began)
+        else:
+            failed += 1
+    elapsed = time.perf_counter() - started
+    uploader.disconnect()
+    file_log.close()
+    return elapsed, latencies, failed
+
+
+def run_pipeline(folder, filenames, port, data_dir, connections):
+    from connection_pool import FTPConnectionPool
+    from file_log import FileLog
+    from ftp_uploader import FTPImageUploader
+    from upload_pool import ParallelUploader, UploadQueue
+
+    file_log = FileLog(app_data_dir=data_dir)
+    pool = FTPConnectionPool("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, max_size=connections)
+    upload_queue = UploadQueue()
+    enqueued = {}
+    latencies = []
+
+    def on_status(filename, status):
+        if status == "Enviado":
+            latencies.append(time.perf_counter() - enqueued[filename])
+
+    uploader_pool = ParallelUploader(
+        lambda: FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD, pool=pool, file_log=file_log),
+        upload_queue,
+        file_log=file_log,
+        num_connections=connections,
+        on_status=on_status
+    )
+    started = time.perf_counter()
+    for filename in filenames:
+        enqueued[filename] = time.perf_counter()
+        upload_queue.put((os.path.join(folder, *filename.split("/")), filename))
+    uploader_pool.start()
+    upload_queue.join()
+    elapsed = time.perf_counter() - started
+    failed = uploader_pool.stats()["files_failed"]
+    uploader_pool.stop()
+    pool.close()
+    file_log.close()
+    return elapsed, latencies, failed
+
+
+def child_main(args):
+    """Executa uma combinação conjunto/motor e imprime o resultado em JSON"""
+    logging.basicConfig(level=logging.WARNING)
+    with open(args.child_files) as f:
+        filenames = json.load(f)
+    total_bytes = sum(os.path.getsize(os.path.join(args.folder, *name.split("/"))) for name in filenames)
+    if args.driver == "direct":
+        elapsed, latencies, failed = run_direct(args.folder, filenames, args.port, args.data_dir)
+    else:
+        elapsed, latencies, failed = run_pipeline(args.folder, filenames, args.port, args.data_dir, args.connections)
+    print(json.dumps({
+        "files": len(filenames),
+        "bytes": total_bytes,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 4),
+        "files_per_s": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "mb_per_s": round(total_bytes / 1048576 / elapsed, 2) if elapsed > 0 else None,
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if peak_rss_mb() else None,
+    }))
+    return 0
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(results, baseline_file, tolerance):
+    """Combinações cuja vazão caiu mais que tolerance em relação ao baseline"""
+    with open(baseline_file) as f:
+        baseline = {(r["set"], r["driver"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["set"], result["driver"]))
+        if not previous:
+            continue
+        for metric in ("files_per_s", "mb_per_s"):
+            if previous.get(metric) and result.get(metric) is not None:
+                change = result[metric] / previous[metric] - 1
+                if change < -tolerance:
+                    regressions.append(
+                        f"{result['set']}/{result['driver']} {metric}: {previous[metric]} -> {result[metric]} ({change:+.0%})"
+                    )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", default=",".join(SETS), help="conjuntos a rodar: tiny,mixed,huge")
+    parser.add_argument("--drivers", default=",".join(DRIVERS), help="direct,pipeline")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica quantidades e tamanhos")
+    parser.add_argument("--connections", type=int, default=4, help="conexões do pipeline")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência simulada por comando")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", help="JSON de uma rodada anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="queda aceita em relação ao baseline")
+    # Uso interno: processo filho que roda uma combinação
+    parser.add_argument("--child-files", help=argparse.SUPPRESS)
+    parser.add_argument("--driver", help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_files:
+        return child_main(args)
+
+    logging.basicConfig(level=logging.WARNING)
+    sets = [name for name in args.sets.split(",") if name]
+    drivers = [name for name in args.drivers.split(",") if name]
+    unknown = [name for name in sets if name not in SETS] + [name for name in drivers if name not in DRIVERS]
+    if unknown:
+        parser.error(f"valores desconhecidos: {', '.join(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    results = []
+    try:
+        for name in sets:
+            folder = os.path.join(work_dir, f"local_{name}")
+            filenames = generate_set(name, folder, args.scale, args.seed)
+            files_list = os.path.join(work_dir, f"{name}.json")
+            with open(files_list, "w") as f:
+                json.dump(filenames, f)
+
+            for driver in drivers:
+                remote_dir = os.path.join(work_dir, f"remote_{name}_{driver}")
+                os.makedirs(remote_dir)
+                server, port = start_local_server(remote_dir, latency=args.latency_ms / 1000.0)
+                try:
+                    result = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__),
+                         "--child-files", files_list, "--driver", driver, "--folder", folder,
+                         "--data-dir", os.path.join(work_dir, f"data_{name}_{driver}"),
+                         "--port", str(port), "--connections", str(args.connections)],
+                        capture_output=True, text=True
+                    )
+                finally:
+                    server.close_all()
+                shutil.rmtree(remote_dir, ignore_errors=True)
+                if result.returncode != 0:
+                    print(result.stderr, file=sys.stderr)
+                    return 2
+                measured = json.loads(result.stdout.strip().splitlines()[-1])
+                results.append(dict({"set": name, "driver": driver}, **measured))
+                print(f"{name:<6} {driver:<8} arquivos/s={measured['files_per_s']}  MB/s={measured['mb_per_s']}  "
+                      f"p50={measured['latency_p50_ms']} ms  p99={measured['latency_p99_ms']} ms  "
+                      f"RSS={measured['peak_rss_mb']} MB  falhas={measured['failed']}", file=sys.stderr)
+            shutil.rmtree(folder, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "scale": args.scale, "seed": args.seed, "connections": args.connections,
+            "latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"Regressão: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Rajada de N arquivos (padrão 10k) passando pela UploadQueue limitada e pelo ParallelUploader.
+
+Simula o watchdog: várias threads produtoras oferecem cada arquivo duas
+vezes (on_created + on_modified) enquanto os workers enviam. Mostra a vazão,
+quantos pedidos duplicados a fila descartou, a profundidade máxima da fila,
+quanto tempo os produtores ficaram bloqueados pela contrapressão e o pico
+de threads ativas.
+
+Uso:
+    python benchmarks/bench_upload_burst.py --files 10000 --size 512 --connections 8 --queue-size 1000
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from local_server import BENCH_PASSWORD, BENCH_USER, make_files, peak_rss_mb, start_local_server
+
+from file_log import FileLog
+from ftp_uploader import FTPImageUploader
+from upload_pool import ParallelUploader, UploadQueue
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--size", type=int, default=512, help="tamanho de cada arquivo em bytes")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência simulada por comando")
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--producers", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="bench_burst_")
+    try:
+        paths = make_files(os.path.join(work_dir, "local"), args.files, args.size)
+        remote_dir = os.path.join(work_dir, "remote")
+        os.makedirs(remote_dir)
+        server, port = start_local_server(remote_dir, latency=args.latency_ms / 1000.0)
+
+        upload_queue = UploadQueue(maxsize=args.queue_size)
+        uploader_pool = ParallelUploader(
+            lambda: FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD),
+            upload_queue,
+            file_log=FileLog(app_data_dir=os.path.join(work_dir, "data")),
+            num_connections=args.connections
+        )
+
+        lock = threading.Lock()
+        counters = {"queued": 0, "dropped": 0, "blocked": 0.0}
+
+        def produce(chunk):
+            queued = dropped = 0
+            blocked = 0.0
+            for path in chunk:
+                for _ in range(2):
+                    started = time.perf_counter()
+                    if upload_queue.put((path, os.path.basename(path))):
+                        queued += 1
+                    else:
+                        dropped += 1
+                    blocked += time.perf_counter() - started
+            with lock:
+                counters["queued"] += queued
+                counters["dropped"] += dropped
+                counters["blocked"] += blocked
+
+        peaks = {"depth": 0, "threads": 0}
+        sampling = threading.Event()
+
+        def sample():
+            while not sampling.wait(0.01):
+                peaks["depth"] = max(peaks["depth"], upload_queue.qsize())
+                peaks["threads"] = max(peaks["threads"], threading.active_count())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+        started = time.perf_counter()
+        uploader_pool.start()
+        producers = [
+            threading.Thread(target=produce, args=(paths[index::args.producers],))
+            for index in range(args.producers)
+        ]
+        for producer in producers:
+            producer.start()
+        for producer in producers:
+            producer.join()
+        upload_queue.join()
+        elapsed = time.perf_counter() - started
+        sampling.set()
+
+        stats = uploader_pool.stats()
+        uploader_pool.stop()
+        server.close_all()
+
+        print(f"arquivos={args.files}  conexões={args.connections}  fila máx={args.queue_size}")
+        print(f"tempo={elapsed:.2f}s  arquivos/s={stats['files_done'] / elapsed:.1f}  "
+              f"enviados={stats['files_done']}  falhas={stats['files_failed']}  "
+              f"no servidor={len(os.listdir(remote_dir))}")
+        print(f"pedidos enfileirados={counters['queued']}  duplicados descartados={counters['dropped']}")
+        print(f"profundidade máx da fila={peaks['depth']}  produtores bloqueados={counters['blocked']:.2f}s (soma)")
+        rss = peak_rss_mb()
+        print(f"pico de threads={peaks['threads']}" + (f"  pico de RSS={rss:.1f} MB" if rss else ""))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compara a CPU gasta por GB no envio com buffers do Python e com sendfile.
+
+Mede time.thread_time() da thread que envia, então o servidor pyftpdlib
+local (que roda no mesmo processo) não entra na conta.
+
+Uso:
+    python benchmarks/bench_zero_copy.py --size-mb 512 --runs 3
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from local_server import BENCH_PASSWORD, BENCH_USER, start_local_server
+
+from ftp_uploader import FTPImageUploader
+
+
+def run(port, path, zero_copy):
+    uploader = FTPImageUploader("127.0.0.1", port, BENCH_USER, BENCH_PASSWORD)
+    uploader.zero_copy = zero_copy
+    uploader.connect()
+    cpu_started = time.thread_time()
+    started = time.perf_counter()
+    ok = uploader.upload_file(path, force=True)
+    elapsed = time.perf_counter() - started
+    cpu = time.thread_time() - cpu_started
+    uploader.disconnect()
+    return ok, elapsed, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="bench_zero_copy_")
+    try:
+        path = os.path.join(work_dir, "big.bin")
+        with open(path, "wb") as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(args.size_mb):
+                f.write(block)
+        remote_dir = os.path.join(work_dir, "remote")
+        os.makedirs(remote_dir)
+        server, port = start_local_server(remote_dir)
+        gigabytes = args.size_mb / 1024
+        try:
+            for label, zero_copy in (("buffered", False), ("sendfile", True)):
+                results = [run(port, path, zero_copy) for _ in range(args.runs)]
+                elapsed = min(result[1] for result in results)
+                cpu = min(result[2] for result in results)
+                print(f"{label:>8}: ok={all(result[0] for result in results)}  "
+                      f"{args.size_mb / elapsed:7.1f} MB/s  CPU {cpu / gigabytes:6.3f} s/GB")
+        finally:
+            server.close_all()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Servidor pyftpdlib local usado pelos benchmarks"""
+import os
+import sys
+import threading
+import time
+import zlib
+
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import DTPHandler, FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+# Permite importar os módulos do projeto ao rodar os scripts diretamente
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench"
+
+
+class LatencyFTPHandler(FTPHandler):
+    """Handler que simula a latência de um link WAN em cada comando"""
+    latency = 0.0
+
+    def process_command(self, cmd, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().process_command(cmd, *args, **kwargs)
+
+
+class ModeZDTPHandler(DTPHandler):
+    """Canal de dados que descomprime os envios feitos em MODE Z"""
+    _decompressor = None
+
+    def enable_receiving(self, type, cmd):
+        super().enable_receiving(type, cmd)
+        if getattr(self.cmd_channel, "mode_z", False):
+            self._decompressor = zlib.decompressobj()
+            self._data_wrapper = self._decompressor.decompress
+
+    def close(self):
+        if self._decompressor and self.file_obj is not None and not self.file_obj.closed:
+            self.file_obj.write(self._decompressor.flush())
+            self._decompressor = None
+        super().close()
+
+
+class ModeZFTPHandler(LatencyFTPHandler):
+    """Handler que anuncia e aceita MODE Z (deflate) nos envios"""
+    dtp_handler = ModeZDTPHandler
+    mode_z = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._extra_feats.append("MODE Z")
+
+    def ftp_MODE(self, line):
+        if line.upper() == "Z":
+            self.mode_z = True
+            self.respond("200 Transfer mode set to: Z")
+            return
+        if line.upper() == "S":
+            self.mode_z = False
+        super().ftp_MODE(line)
+
+
+def start_local_server(root_dir, latency=0.0, host="127.0.0.1", mode_z=False):
+    """Inicia um servidor FTP local em uma thread e retorna (server, port)"""
+    authorizer = DummyAuthorizer()
+    authorizer.add_user(BENCH_USER, BENCH_PASSWORD, root_dir, perm="elradfmwMT")
+
+    handler = type("BenchHandler", (ModeZFTPHandler if mode_z else LatencyFTPHandler,), {})
+    handler.authorizer = authorizer
+    handler.latency = latency
+
+    server = ThreadedFTPServer((host, 0), handler)
+    server.max_cons = 512
+    port = server.socket.getsockname()[1]
+    threading.Thread(target=server.serve_forever, kwargs={"handle_exit": False}, daemon=True).start()
+    return server, port
+
+
+def make_files(folder, count, size, prefix="file"):
+    """Gera arquivos sintéticos e retorna a lista de caminhos"""
+    os.makedirs(folder, exist_ok=True)
+    payload = os.urandom(size)
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, f"{prefix}_{index:06d}.bin")
+        with open(path, "wb") as f:
+            f.write(payload)
+        paths.append(path)
+    return paths
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo atual em MB, ou None se não der para medir"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em bytes no macOS e em KB no Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
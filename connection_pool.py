@@ -0,0 +1,207 @@
+import ftplib
+import logging
+import threading
+import time
+from collections import deque
+
+
+class FTPConnectionPool:
+    """Pool de sessões FTP autenticadas e reutilizáveis.
+
+    As conexões ociosas são mantidas aquecidas com NOOP periódico por uma
+    thread em segundo plano, que também descarta os sockets mortos. O
+    acquire() entrega uma sessão ociosa sempre que possível (hit) e só abre
+    uma nova conexão com login quando não há nenhuma disponível (miss).
+    """
+
+    def __init__(self, host, port, username, password, max_size=4, keepalive_interval=30,
+                 health_check_after=10, max_idle=None, timeout=30, metrics=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max(1, int(max_size))
+        self.keepalive_interval = keepalive_interval
+        self.health_check_after = health_check_after
+        self.max_idle = max_idle
+        self.timeout = timeout
+        # transfer_metrics.TransferMetrics opcional: fases connect e login das conexões novas
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+
+        # Pilha LIFO de (ftp, último uso): a conexão mais recente é a mais provável de estar viva
+        self._idle = deque()
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._login_failures = 0
+        self._login_count = 0
+        self._login_total = 0.0
+        self._login_max = 0.0
+
+        self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name="ftp-keepalive", daemon=True)
+        self._keepalive_thread.start()
+
+    def _create_connection(self):
+        """Abre uma nova conexão e faz login, medindo a latência"""
+        started = time.monotonic()
+        ftp = ftplib.FTP()
+        try:
+            ftp.connect(self.host, int(self.port), timeout=self.timeout)
+            connected = time.monotonic()
+            ftp.login(self.username, self.password)
+            ftp.encoding = 'utf-8'
+        except Exception:
+            self._close_quietly(ftp)
+            with self._cond:
+                self._login_failures += 1
+            raise
+        elapsed = time.monotonic() - started
+        if self.metrics:
+            self.metrics.observe("connect", connected - started)
+            self.metrics.observe("login", elapsed - (connected - started))
+        with self._cond:
+            self._login_count += 1
+            self._login_total += elapsed
+            self._login_max = max(self._login_max, elapsed)
+        return ftp
+
+    @staticmethod
+    def _close_quietly(ftp):
+        try:
+            ftp.quit()
+        except Exception:
+            try:
+                ftp.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(ftp):
+        try:
+            ftp.voidcmd("NOOP")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Retorna uma sessão FTP autenticada e saudável"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise ConnectionError("Pool de conexões FTP encerrado")
+                    if self._idle:
+                        ftp, last_used = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.max_size:
+                        ftp, last_used = None, None
+                        self._in_use += 1
+                        break
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Nenhuma conexão FTP disponível no pool")
+                    self._cond.wait(remaining)
+
+            if ftp is not None:
+                # Só repete o NOOP se a keepalive não tiver validado a conexão recentemente
+                if time.monotonic() - last_used < self.health_check_after or self._is_alive(ftp):
+                    with self._cond:
+                        self._hits += 1
+                    return ftp
+                self._discard_slot(ftp)
+                continue
+
+            try:
+                ftp = self._create_connection()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._cond:
+                self._misses += 1
+            return ftp
+
+    def release(self, ftp):
+        """Devolve uma sessão ao pool para reutilização"""
+        if ftp is None:
+            return
+        with self._cond:
+            if self._closed:
+                self._in_use = max(0, self._in_use - 1)
+                closed = True
+            else:
+                self._idle.append((ftp, time.monotonic()))
+                self._in_use = max(0, self._in_use - 1)
+                self._cond.notify()
+                closed = False
+        if closed:
+            self._close_quietly(ftp)
+
+    def discard(self, ftp):
+        """Descarta uma sessão com falha em vez de devolvê-la ao pool"""
+        if ftp is None:
+            return
+        self._discard_slot(ftp)
+
+    def _discard_slot(self, ftp):
+        self._close_quietly(ftp)
+        with self._cond:
+            self._evictions += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use = max(0, self._in_use - 1)
+            self._cond.notify()
+
+    def _keepalive_loop(self):
+        """Envia NOOP às conexões ociosas e remove as que morreram"""
+        while True:
+            time.sleep(min(self.keepalive_interval, 5))
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [item for item in self._idle if now - item[1] >= self.keepalive_interval]
+                for item in due:
+                    self._idle.remove(item)
+                    self._in_use += 1
+
+            for ftp, last_used in due:
+                expired = self.max_idle is not None and now - last_used >= self.max_idle
+                if not expired and self._is_alive(ftp):
+                    self.release(ftp)
+                else:
+                    self.logger.info("Conexão FTP ociosa removida do pool")
+                    self._discard_slot(ftp)
+
+    def stats(self):
+        """Retorna contadores de uso do pool"""
+        with self._cond:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "login_failures": self._login_failures,
+                "logins": self._login_count,
+                "login_avg": self._login_total / self._login_count if self._login_count else 0.0,
+                "login_max": self._login_max,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+            }
+
+    def close(self):
+        """Fecha todas as conexões ociosas e encerra o pool"""
+        with self._cond:
+            self._closed = True
+            idle = [ftp for ftp, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for ftp in idle:
+            self._close_quietly(ftp)
@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from upload_pool import PRIORITY_AUTO, UploadQueue
+
+
+class DurableUploadQueue(UploadQueue):
+    """UploadQueue cujos jobs sobrevivem a um reinício ou crash do aplicativo.
+
+    Cada entrada na fila (e cada mudança de prioridade) é acrescentada em um
+    journal como uma linha JSON, e cada finish() acrescenta a conclusão; as
+    linhas são agrupadas e gravadas com fsync a cada flush_interval
+    segundos, como no FileLog. Um job só sai do journal quando é concluído,
+    então os arquivos que estavam na fila ou sendo enviados quando o
+    processo parou voltam para a fila (entrega pelo menos uma vez). A chave
+    continua sendo o filename, então o journal também não guarda duplicatas.
+
+    Os jobs lidos do journal ficam em recovered até restore(), que os
+    devolve à fila; quem chama decide quais já foram concluídos (upload
+    terminado, mas conclusão não gravada antes do crash). Concluir de novo
+    um job que já saiu do journal não faz nada.
+    """
+
+    def __init__(self, journal_file, maxsize=0, flush_interval=0.2, compact_min_entries=2000, **kwargs):
+        super().__init__(maxsize, **kwargs)
+        self.journal_file = journal_file
+        self.flush_interval = flush_interval
+        self.compact_min_entries = compact_min_entries
+        self.logger = logging.getLogger(__name__)
+        # filename -> (filepath, prioridade) dos jobs ainda não concluídos
+        self._live = {}
+        self._pending_lines = []
+        self._journal_lines = 0
+        self._journal_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._closed = False
+        self.recovered = self._load()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="upload-queue-journal", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        """Lê o journal e retorna os jobs não concluídos [(item, prioridade)], na ordem de entrada"""
+        torn = False
+        try:
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Última linha incompleta de uma gravação interrompida
+                            self.logger.warning("Linha inválida ignorada no journal da fila de upload")
+                            torn = True
+                            continue
+                        self._journal_lines += 1
+                        if record.get("done"):
+                            self._live.pop(record["k"], None)
+                        else:
+                            self._live[record["k"]] = (record["p"], record.get("pr", PRIORITY_AUTO))
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar journal da fila de upload: {str(e)}")
+
+        if torn or self._journal_lines > len(self._live):
+            self.compact()
+        if self._live:
+            self.logger.info(f"{len(self._live)} envios pendentes recuperados da fila de upload")
+        return [((filepath, filename), priority) for filename, (filepath, priority) in self._live.items()]
+
+    def restore(self, completed=()):
+        """Devolve à fila os jobs recuperados, exceto os filenames em completed.
+
+        Os de completed, e os cujo arquivo sumiu, são concluídos no journal.
+        Ignora maxsize, como o reenvio de finish(). Retorna os filenames que
+        voltaram para a fila.
+        """
+        completed = set(completed)
+        restored = []
+        with self.mutex:
+            recovered, self.recovered = self.recovered, []
+            for item, priority in recovered:
+                filename = item[1]
+                if filename in self._queued or filename in self._in_flight:
+                    # Enfileirado de novo antes do restore: o journal já tem a entrada atual
+                    continue
+                if filename in completed:
+                    self._record_done(filename)
+                    continue
+                try:
+                    size = os.path.getsize(item[0])
+                except OSError:
+                    self._record_done(filename)
+                    continue
+                # Já está no journal: não grava de novo
+                UploadQueue._enqueue(self, item, size, priority)
+                restored.append(filename)
+        return restored
+
+    def _enqueue(self, item, size, priority):
+        super()._enqueue(item, size, priority)
+        self._record_put(item, priority)
+
+    def _set_priority(self, filename, priority):
+        super()._set_priority(filename, priority)
+        entry = self._queued[filename]
+        self._record_put(entry[2], priority)
+
+    def _finished(self, key):
+        # A conclusão vai para o journal antes de um eventual reenvio, que grava uma nova entrada
+        self._record_done(key)
+
+    def _record_put(self, item, priority):
+        filepath, filename = item
+        with self._journal_lock:
+            self._live[filename] = (filepath, priority)
+            self._pending_lines.append(json.dumps({"k": filename, "p": filepath, "pr": priority}) + "\n")
+        self._flush_requested.set()
+
+    def _record_done(self, filename):
+        with self._journal_lock:
+            if self._live.pop(filename, None) is None:
+                # Já concluído: conclusão idempotente
+                return
+            self._pending_lines.append(json.dumps({"k": filename, "done": True}) + "\n")
+        self._flush_requested.set()
+
+    def flush(self):
+        """Grava no journal as linhas pendentes"""
+        try:
+            with self._io_lock:
+                with self._journal_lock:
+                    if not self._pending_lines:
+                        return
+                    lines, self._pending_lines = self._pending_lines, []
+                    live = len(self._live)
+                with open(self.journal_file, 'a') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journal_lines += len(lines)
+                needs_compaction = self._journal_lines > max(self.compact_min_entries, 4 * live)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar journal da fila de upload: {str(e)}")
+            return
+
+        if needs_compaction:
+            self.compact()
+
+    def compact(self):
+        """Reescreve o journal só com os jobs não concluídos, de forma atômica"""
+        try:
+            with self._io_lock:
+                with self._journal_lock:
+                    lines = [
+                        json.dumps({"k": filename, "p": filepath, "pr": priority}) + "\n"
+                        for filename, (filepath, priority) in self._live.items()
+                    ]
+                    # O estado atual já inclui as linhas pendentes
+                    self._pending_lines = []
+                tmp_file = self.journal_file + ".tmp"
+                with open(tmp_file, 'w') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.journal_file)
+                self._journal_lines = len(lines)
+        except Exception as e:
+            self.logger.error(f"Erro ao compactar journal da fila de upload: {str(e)}")
+
+    def close(self):
+        """Grava as linhas pendentes, compacta o journal e encerra a thread de gravação"""
+        self._closed = True
+        self._flush_requested.set()
+        self.flush()
+        with self._journal_lock:
+            redundant = self._journal_lines > len(self._live)
+        if redundant:
+            self.compact()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_requested.wait()
+            self._flush_requested.clear()
+            if self._closed:
+                return
+            self.flush()
+            # Agrupa as linhas que chegarem no intervalo em uma única gravação
+            time.sleep(self.flush_interval)
@@ -0,0 +1,139 @@
+import os
+import tarfile
+import time
+import uuid
+
+from file_hash import new_fingerprint
+
+# Sufixo do lote enquanto está sendo enviado; o RNTO final o torna visível com o nome .tar
+PART_SUFFIX = ".part"
+
+
+def bundle_name():
+    """Nome único de um lote no servidor"""
+    return f"lote_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.tar"
+
+
+class TarStream:
+    """Arquivo tar gerado sob demanda a partir de vários arquivos, sem arquivo temporário.
+
+    Objeto com read(n), aceito pelo envio do ftplib no lugar de um arquivo
+    aberto. Cada membro é aberto só quando o tar chega nele e lido em
+    blocos; os nomes no tar são as chaves do FileLog (caminho relativo com
+    '/'), então extrair o lote no diretório remoto base recria as subpastas.
+
+    Um membro que não pode mais ser aberto é deixado de fora (fica em
+    skipped). Um membro que encolhe durante a leitura invalidaria o
+    cabeçalho já enviado e levanta OSError; se cresceu, só o tamanho lido
+    no início é enviado.
+    """
+
+    def __init__(self, members, fingerprint=False, chunk_size=65536):
+        # members: lista de (filepath, filename)
+        self.chunk_size = chunk_size
+        self.fingerprint = fingerprint
+        # filename -> (tamanho, mtime, impressão digital ou None) dos membros incluídos
+        self.included = {}
+        self.skipped = []
+        self.size = 0
+        # Nome do lote no servidor, definido por quem o envia
+        self.name = None
+        self._members = iter(members)
+        self._chunks = self._generate()
+        self._buffer = b""
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b"".join([self._buffer] + list(self._chunks))
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.size += len(data)
+        return data
+
+    def _generate(self):
+        for filepath, filename in self._members:
+            try:
+                file = open(filepath, 'rb')
+            except OSError:
+                self.skipped.append(filename)
+                continue
+            with file:
+                stat = os.fstat(file.fileno())
+                info = tarfile.TarInfo(filename)
+                info.size = stat.st_size
+                info.mtime = int(stat.st_mtime)
+                info.mode = 0o644
+                yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+                digest = new_fingerprint() if self.fingerprint else None
+                remaining = stat.st_size
+                while remaining:
+                    data = file.read(min(self.chunk_size, remaining))
+                    if not data:
+                        raise OSError(f"Arquivo {filename} diminuiu durante o envio do lote")
+                    remaining -= len(data)
+                    if digest:
+                        digest.update(data)
+                    yield data
+                padding = -stat.st_size % tarfile.BLOCKSIZE
+                if padding:
+                    yield b"\0" * padding
+                self.included[filename] = (
+                    stat.st_size, stat.st_mtime, digest.hexdigest() if digest else None
+                )
+
+        # Dois blocos vazios fecham o tar; completa o último registro como o tarfile faz
+        end = 2 * tarfile.BLOCKSIZE
+        written = self.size + len(self._buffer) + end
+        yield b"\0" * (end + -written % tarfile.RECORDSIZE)
+
+
+class SmallFileBundler:
+    """Regras para juntar arquivos pequenos da fila em um único envio.
+
+    Um arquivo de até max_file_size bytes retirado da fila puxa os outros
+    arquivos pequenos que estiverem nela (ou chegarem em até max_wait
+    segundos), até max_files arquivos ou max_bytes bytes. Com menos de
+    min_files o lote não compensa e os arquivos são enviados um a um.
+    """
+
+    def __init__(self, max_file_size=256 * 1024, min_files=8, max_files=500,
+                 max_bytes=32 * 1024 * 1024, max_wait=0.5):
+        self.max_file_size = max_file_size
+        self.min_files = min_files
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_wait = max_wait
+
+    def eligible(self, filepath):
+        try:
+            return os.path.getsize(filepath) <= self.max_file_size
+        except OSError:
+            return False
+
+    def collect(self, upload_queue, first, stop_event=None):
+        """Retira da fila os arquivos pequenos que vão no lote de first; retorna a lista com first"""
+        items = [first]
+        try:
+            total = os.path.getsize(first[0])
+        except OSError:
+            total = 0
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_files and total < self.max_bytes:
+            if stop_event is not None and stop_event.is_set():
+                break
+            remaining = deadline - time.monotonic()
+            taken = upload_queue.take_small(
+                self.max_file_size, self.max_files - len(items), self.max_bytes - total,
+                timeout=max(0.0, remaining)
+            )
+            if not taken:
+                break
+            for item, size in taken:
+                items.append(item)
+                total += size
+        return items
@@ -3,6 +3,17 @@ import os
 from watchdog.events import FileSystemEventHandler
 
 class FileHandler(FileSystemEventHandler):
+    """Encaminha os eventos do watchdog para a fila de upload do app.
+
+    Os arquivos passam antes pelo app.file_stabilizer, que espera a gravação
+    terminar e junta a rajada de eventos on_modified em um único envio.
+    Roda na thread do observer: usa apenas métodos seguros entre threads.
+    Criação e modificação pedem a atualização só da linha do arquivo;
+    remoções, renomeações e pastas novas pedem a releitura da lista.
+    Com monitoramento recursivo (app.recursive), uma pasta criada ou movida
+    para dentro da monitorada tem os arquivos que já estão nela acompanhados,
+    pois eles podem ter sido gravados antes de o watchdog observá-la.
+    """
     def __init__(self, ftp_uploader, app):
         super().__init__()
         self.ftp_uploader = ftp_uploader
@@ -18,14 +29,31 @@ class FileHandler(FileSystemEventHandler):
         # Ignora arquivos temporários
         return not any(pattern in filepath.lower() for pattern in self._ignore_patterns)
 
+    def _track_directory(self, path):
+        """Acompanha os arquivos de uma pasta que acabou de aparecer na árvore monitorada"""
+        if not getattr(self.app, "recursive", False):
+            return
+        try:
+            for root, _, files in os.walk(path):
+                for name in files:
+                    filepath = os.path.join(root, name)
+                    if self._should_handle_file(filepath):
+                        self.app.file_stabilizer.track(filepath)
+            self.app.request_file_list_update()
+        except Exception as e:
+            self.logger.error(f"Erro ao processar a pasta {path}: {str(e)}")
+
     def on_created(self, event):
         if event.is_directory:
+            self._track_directory(event.src_path)
             return
             
         if self._should_handle_file(event.src_path):
             try:
                 self.logger.info(f"Arquivo detectado: {event.src_path}")
-                self.app.update_file_list()
+                self.app.file_stabilizer.track(event.src_path)
+                # Só a linha do arquivo; uma linha nova faz a interface reler a pasta uma vez
+                self.app.request_file_list_update(self.app.relative_name(event.src_path))
             except Exception as e:
                 self.logger.error(f"Erro ao processar novo arquivo {event.src_path}: {str(e)}")
 
@@ -33,7 +61,7 @@ class FileHandler(FileSystemEventHandler):
         if not event.is_directory:
             try:
                 self.logger.info(f"Arquivo removido: {event.src_path}")
-                self.app.update_file_list()
+                self.app.request_file_list_update()
             except Exception as e:
                 self.logger.error(f"Erro ao processar remoção do arquivo {event.src_path}: {str(e)}")
 
@@ -43,33 +71,25 @@ class FileHandler(FileSystemEventHandler):
             
         if self._should_handle_file(event.src_path):
             try:
-                filename = os.path.basename(event.src_path)
-                self.logger.info(f"Arquivo modificado: {event.src_path}")
-                
-                # Verifica se o arquivo já existe no log
-                file_info = self.app.file_log.get_file_info(filename)
-                if file_info:
-                    # Verifica se o arquivo realmente foi modificado comparando as datas
-                    current_mtime = os.path.getmtime(event.src_path)
-                    last_modified = float(file_info.get('last_modified', 0))
-                    
-                    if current_mtime > last_modified:
-                        self.logger.info(f"Arquivo {filename} foi modificado. Iniciando reenvio...")
-                        # Inicia o reenvio em uma nova thread
-                        self.app.queue_upload(event.src_path, is_update=True)
-                
-                self.app.update_file_list()
+                self.logger.debug(f"Arquivo modificado: {event.src_path}")
+                # Depois de estável, enqueue_file compara o mtime atual com o do último envio
+                self.app.file_stabilizer.track(event.src_path)
+                # Só a linha do arquivo; uma linha nova faz a interface reler a pasta uma vez
+                self.app.request_file_list_update(self.app.relative_name(event.src_path))
                 
             except Exception as e:
                 self.logger.error(f"Erro ao processar modificação do arquivo {event.src_path}: {str(e)}")
 
     def on_moved(self, event):
         if event.is_directory:
+            self._track_directory(event.dest_path)
             return
             
         if self._should_handle_file(event.dest_path):
             try:
                 self.logger.info(f"Arquivo movido/renomeado de {event.src_path} para {event.dest_path}")
-                self.app.update_file_list()
+                self.app.file_stabilizer.track(event.dest_path)
+                # O nome antigo sai da lista: releitura completa
+                self.app.request_file_list_update()
             except Exception as e:
                 self.logger.error(f"Erro ao processar movimentação do arquivo {event.src_path}: {str(e)}")
@@ -0,0 +1,52 @@
+import hashlib
+import zlib
+
+
+def new_fingerprint():
+    """Cria o hash usado como impressão digital do conteúdo dos arquivos"""
+    return hashlib.blake2b(digest_size=20)
+
+
+def compute_fingerprint(filepath, chunk_size=1024 * 1024):
+    """Calcula a impressão digital de um arquivo lendo-o em blocos"""
+    digest = new_fingerprint()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_fingerprint(file_log, filepath, filename, size, mtime):
+    """Retorna a impressão digital do arquivo, calculando-a só se tamanho ou mtime mudaram"""
+    digest = file_log.get_cached_hash(filename, size, mtime)
+    if digest is None:
+        digest = compute_fingerprint(filepath)
+        file_log.update_file_hash(filename, digest, size, mtime)
+    return digest
+
+
+class CRC32:
+    """CRC32 com a mesma interface incremental dos objetos do hashlib"""
+
+    def __init__(self):
+        self._value = 0
+
+    def update(self, data):
+        self._value = zlib.crc32(data, self._value)
+
+    def hexdigest(self):
+        return f"{self._value & 0xffffffff:08x}"
+
+
+# Algoritmos de hash remoto (nomes do comando HASH) e seus equivalentes locais
+SERVER_HASH_ALGORITHMS = {
+    "SHA-256": hashlib.sha256,
+    "SHA-1": hashlib.sha1,
+    "MD5": hashlib.md5,
+    "CRC32": CRC32,
+}
+
+
+def new_digest(algorithm):
+    """Cria o digest local correspondente a um algoritmo de hash do servidor"""
+    return SERVER_HASH_ALGORITHMS[algorithm]()
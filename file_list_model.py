@@ -0,0 +1,138 @@
+import os
+from datetime import datetime
+
+from folder_scanner import iter_files
+
+
+def format_size(size):
+    """Formata o tamanho do arquivo"""
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024*1024:
+        return f"{size/1024:.1f} KB"
+    else:
+        return f"{size/(1024*1024):.1f} MB"
+
+
+class FileListModel:
+    """Modelo em memória das linhas da tabela de arquivos.
+
+    Mantém uma linha por arquivo da pasta monitorada, já formatada com os
+    valores das colunas, e a ordem filtrada/ordenada usada pela tabela. A
+    tabela só materializa a página atual (page_size linhas) e, a cada
+    atualização, altera apenas as linhas cujos valores mudaram.
+    """
+
+    COLUMNS = ("Nome", "Tipo", "Tamanho", "Status", "Data Modificação", "Data Envio")
+
+    def __init__(self, page_size=500, recursive=True):
+        self.recursive = recursive
+        self.rows = {}
+        # filename -> (tamanho, mtime) da linha formatada
+        self._stat_cache = {}
+        self.order = []
+        self.sort_column = "Nome"
+        self.sort_reverse = False
+        self.search_term = ""
+        self.page = 0
+        self.page_size = page_size
+
+    def _build_row(self, filename, size, mtime, file_log):
+        # Obter status e data de envio do arquivo
+        status = file_log.get_file_status(filename)
+        if not status:
+            status = "Pendente"
+        return (
+            filename,
+            os.path.splitext(filename)[1],
+            format_size(size),
+            status,
+            datetime.fromtimestamp(mtime).strftime("%d/%m/%Y %H:%M:%S"),
+            file_log.get_upload_date(filename)
+        )
+
+    def refresh_steps(self, folder, file_log):
+        """Relê a pasta em pequenos passos (gerador) e atualiza as linhas ao final.
+
+        Linhas de arquivos com tamanho e mtime inalterados são reaproveitadas,
+        só status e data de envio são relidos do FileLog.
+        """
+        rows = {}
+        stat_cache = {}
+        if folder and os.path.isdir(folder):
+            # Nome da linha = caminho relativo com '/', a mesma chave do FileLog
+            for entry, filename in iter_files(folder, self.recursive):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                state = (stat.st_size, stat.st_mtime)
+                stat_cache[filename] = state
+                row = self.rows.get(filename)
+                if row is not None and self._stat_cache.get(filename) == state:
+                    status = file_log.get_file_status(filename) or "Pendente"
+                    upload_date = file_log.get_upload_date(filename)
+                    if row[3] != status or row[5] != upload_date:
+                        row = row[:3] + (status, row[4], upload_date)
+                else:
+                    if not file_log.get_file_status(filename):
+                        # Atualiza o timestamp inicial no log
+                        file_log.update_file_mtime(filename, stat.st_mtime)
+                    row = self._build_row(filename, stat.st_size, stat.st_mtime, file_log)
+                rows[filename] = row
+                yield
+
+        self.rows = rows
+        self._stat_cache = stat_cache
+        self.resort()
+
+    def update_status(self, filename, file_log):
+        """Relê status e data de envio de um arquivo; retorna True se a linha mudou"""
+        row = self.rows.get(filename)
+        if row is None:
+            return False
+        status = file_log.get_file_status(filename) or "Pendente"
+        upload_date = file_log.get_upload_date(filename)
+        if row[3] == status and row[5] == upload_date:
+            return False
+        self.rows[filename] = row[:3] + (status, row[4], upload_date)
+        return True
+
+    def update_row(self, folder, filename, file_log):
+        """Relê tamanho, mtime e status de um arquivo já listado; retorna True se a linha mudou"""
+        if filename not in self.rows:
+            return False
+        try:
+            stat = os.stat(os.path.join(folder, *filename.split("/")))
+        except OSError:
+            # Removido: a releitura da pasta pedida pela remoção tira a linha
+            return self.update_status(filename, file_log)
+        state = (stat.st_size, stat.st_mtime)
+        if self._stat_cache.get(filename) == state:
+            return self.update_status(filename, file_log)
+        self._stat_cache[filename] = state
+        self.rows[filename] = self._build_row(filename, stat.st_size, stat.st_mtime, file_log)
+        return True
+
+    def resort(self):
+        """Aplica o filtro de pesquisa e a ordenação atual"""
+        names = [name for name in self.rows if not self.search_term or self.search_term in name.lower()]
+        if self.sort_column == "Tamanho":
+            key = lambda name: self._stat_cache.get(name, (0, 0))[0]
+        elif self.sort_column == "Data Modificação":
+            key = lambda name: self._stat_cache.get(name, (0, 0))[1]
+        else:
+            index = self.COLUMNS.index(self.sort_column)
+            key = lambda name: str(self.rows[name][index])
+        names.sort(key=key, reverse=self.sort_reverse)
+        self.order = names
+        self.page = min(self.page, self.page_count() - 1)
+
+    def page_count(self):
+        return max(1, (len(self.order) + self.page_size - 1) // self.page_size)
+
+    def page_names(self):
+        """Nomes dos arquivos da página atual, na ordem de exibição"""
+        start = self.page * self.page_size
+        return self.order[start:start + self.page_size]
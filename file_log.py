@@ -1,70 +1,222 @@
+import atexit
 import json
 import os
 import logging
+import threading
 from datetime import datetime
 
 class FileLog:
-    def __init__(self):
+    """Registro de status dos arquivos monitorados.
+
+    O estado completo fica em file_log.json (snapshot) e cada alteração é
+    acrescentada em file_log.journal como uma linha JSON com a entrada
+    atualizada. As alterações são agrupadas e gravadas em lote após
+    flush_interval segundos; quando o journal cresce mais que o próprio log,
+    ele é compactado em um novo snapshot gravado de forma atômica.
+
+    Com load_in_background=True o arquivo é lido em uma thread e o construtor
+    retorna na hora; qualquer acesso a log_data espera a leitura terminar, e
+    is_loaded() permite à interface adiar o que depende do log.
+    """
+
+    def __init__(self, app_data_dir=None, flush_interval=0.5, batch_size=500, compact_min_entries=5000,
+                 load_in_background=False):
         # Configurar diretório de dados do aplicativo
-        self.app_data_dir = os.path.join(os.getenv('APPDATA'), 'FTP Manager')
+        if app_data_dir is None:
+            appdata = os.getenv('APPDATA') or os.path.expanduser('~')
+            app_data_dir = os.path.join(appdata, 'FTP Manager')
+        self.app_data_dir = app_data_dir
         if not os.path.exists(self.app_data_dir):
             os.makedirs(self.app_data_dir)
         
         self.log_file = os.path.join(self.app_data_dir, "file_log.json")
+        self.journal_file = os.path.join(self.app_data_dir, "file_log.journal")
         self.logger = logging.getLogger(__name__)
-        self.load_log()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.compact_min_entries = compact_min_entries
+        # Os workers de upload atualizam o log em paralelo
+        self._lock = threading.RLock()
+        # Serializa a escrita em disco (journal e snapshot) na ordem das alterações
+        self._io_lock = threading.Lock()
+        self._dirty = set()
+        self._journal_entries = 0
+        self._flush_requested = threading.Event()
+        self._batch_full = threading.Event()
+        self._closed = False
+        self._loaded = threading.Event()
+        self._log_data = {}
+        if load_in_background:
+            threading.Thread(target=self.load_log, name="file-log-load", daemon=True).start()
+        else:
+            self.load_log()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="file-log-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def log_data(self):
+        # Leituras e escritas esperam o carregamento em segundo plano
+        if not self._loaded.is_set():
+            self._loaded.wait()
+        return self._log_data
+
+    @log_data.setter
+    def log_data(self, value):
+        self._log_data = value
+
+    def is_loaded(self):
+        """True quando o log já foi lido do disco"""
+        return self._loaded.is_set()
+
+    def wait_loaded(self, timeout=None):
+        return self._loaded.wait(timeout)
 
     def load_log(self):
-        """Carrega o log de arquivos do disco"""
+        """Carrega o log de arquivos do disco (snapshot + journal)"""
+        log_data = {}
         try:
             if os.path.exists(self.log_file):
                 with open(self.log_file, 'r') as f:
-                    self.log_data = json.load(f)
-            else:
-                self.log_data = {}
+                    log_data = json.load(f)
         except Exception as e:
             self.logger.error(f"Erro ao carregar log de arquivos: {str(e)}")
-            self.log_data = {}
+            log_data = {}
+
+        self._journal_entries = 0
+        torn = False
+        try:
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, 'r') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Última linha incompleta de uma gravação interrompida
+                            self.logger.warning("Linha inválida ignorada no journal do log de arquivos")
+                            torn = True
+                            continue
+                        log_data[record["k"]] = record["v"]
+                        self._journal_entries += 1
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar journal do log de arquivos: {str(e)}")
+
+        self._log_data = log_data
+        self._loaded.set()
+        if torn:
+            # Compacta para não acrescentar novas linhas após um fragmento
+            self.save_log()
 
     def save_log(self):
-        """Salva o log de arquivos no disco"""
+        """Salva o log completo no disco como um novo snapshot e zera o journal"""
         try:
-            with open(self.log_file, 'w') as f:
-                json.dump(self.log_data, f, indent=4)
+            with self._io_lock:
+                with self._lock:
+                    content = json.dumps(self.log_data, indent=4)
+                    self._dirty.clear()
+                tmp_file = self.log_file + ".tmp"
+                with open(tmp_file, 'w') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # Troca atômica: um crash deixa o snapshot antigo ou o novo, nunca um parcial
+                os.replace(tmp_file, self.log_file)
+                with open(self.journal_file, 'w'):
+                    pass
+                self._journal_entries = 0
         except Exception as e:
             self.logger.error(f"Erro ao salvar log de arquivos: {str(e)}")
 
+    def flush(self):
+        """Grava no journal as entradas alteradas desde o último flush"""
+        try:
+            with self._io_lock:
+                with self._lock:
+                    if not self._dirty:
+                        return
+                    lines = [
+                        json.dumps({"k": filename, "v": self.log_data[filename]}) + "\n"
+                        for filename in self._dirty if filename in self.log_data
+                    ]
+                    self._dirty.clear()
+                    needs_compaction = (
+                        self._journal_entries + len(lines) > max(self.compact_min_entries, len(self.log_data))
+                    )
+                with open(self.journal_file, 'a') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._journal_entries += len(lines)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar journal do log de arquivos: {str(e)}")
+            return
+
+        if needs_compaction:
+            self.save_log()
+
+    def close(self):
+        """Grava as alterações pendentes e encerra a thread de gravação"""
+        self._closed = True
+        self._flush_requested.set()
+        self._batch_full.set()
+        self.flush()
+
+    def _mark_dirty(self, filename):
+        """Agenda a gravação de uma entrada alterada (chamado com self._lock adquirido)"""
+        self._dirty.add(filename)
+        if len(self._dirty) >= self.batch_size:
+            self._batch_full.set()
+        self._flush_requested.set()
+
+    def _flush_loop(self):
+        """Agrupa as alterações e grava no máximo uma vez a cada flush_interval"""
+        while not self._closed:
+            self._flush_requested.wait()
+            # Espera o intervalo de debounce, ou menos se o lote encher antes
+            self._batch_full.wait(self.flush_interval)
+            if self._closed:
+                return
+            self._flush_requested.clear()
+            self._batch_full.clear()
+            self.flush()
+
     def update_file_status(self, filename, status, date=None):
         """Atualiza o status de um arquivo no log"""
         try:
-            if filename not in self.log_data:
-                self.log_data[filename] = {}
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
             
-            # Se a data não for fornecida, usa a data atual
-            if date is None:
-                date = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+                # Se a data não for fornecida, usa a data atual
+                if date is None:
+                    date = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
             
-            self.log_data[filename]["status"] = status
-            self.log_data[filename]["status_date"] = date
+                self.log_data[filename]["status"] = status
+                self.log_data[filename]["status_date"] = date
             
-            # Se o status for "Enviado", atualiza a data de envio
-            if status == "Enviado":
-                self.log_data[filename]["upload_date"] = date
+                # Se o status for "Enviado", atualiza a data de envio
+                if status == "Enviado":
+                    self.log_data[filename]["upload_date"] = date
+                elif status.startswith("Erro"):
+                    # O conteúdo no servidor deixou de ser conhecido: a deduplicação não pode pular o reenvio
+                    self.log_data[filename].pop("uploaded_hash", None)
             
-            self.save_log()
+                self._mark_dirty(filename)
         except Exception as e:
             self.logger.error(f"Erro ao atualizar status do arquivo {filename}: {str(e)}")
 
     def update_file_mtime(self, filename, mtime):
         """Atualiza o timestamp de modificação de um arquivo no log"""
         try:
-            if filename not in self.log_data:
-                self.log_data[filename] = {}
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
             
-            self.log_data[filename]["mtime"] = mtime
-            # Converte o timestamp para string formatada
-            self.log_data[filename]["date"] = datetime.fromtimestamp(mtime).strftime("%d/%m/%Y %H:%M:%S")
-            self.save_log()
+                self.log_data[filename]["mtime"] = mtime
+                # Converte o timestamp para string formatada
+                self.log_data[filename]["date"] = datetime.fromtimestamp(mtime).strftime("%d/%m/%Y %H:%M:%S")
+                self._mark_dirty(filename)
         except Exception as e:
             self.logger.error(f"Erro ao atualizar mtime do arquivo {filename}: {str(e)}")
 
@@ -103,14 +255,122 @@ class FileLog:
     def update_upload_date(self, filename, date):
         """Atualiza a data de envio do arquivo"""
         try:
-            if filename not in self.log_data:
-                self.log_data[filename] = {}
-            self.log_data[filename]["upload_date"] = date
-            self.save_log()
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
+                self.log_data[filename]["upload_date"] = date
+                self._mark_dirty(filename)
         except Exception as e:
             self.logger.error(f"Erro ao atualizar data de envio do arquivo {filename}: {str(e)}")
 
+    def update_partial_upload(self, filename, offset, size, mtime):
+        """Registra o offset de um envio parcial para retomá-lo depois"""
+        try:
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
+                self.log_data[filename]["partial"] = {"offset": offset, "size": size, "mtime": mtime}
+                self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar envio parcial do arquivo {filename}: {str(e)}")
+
+    def get_partial_upload(self, filename):
+        """Retorna o registro de envio parcial ({offset, size, mtime}) ou None"""
+        try:
+            return self.log_data.get(filename, {}).get("partial", None)
+        except Exception as e:
+            self.logger.error(f"Erro ao obter envio parcial do arquivo {filename}: {str(e)}")
+            return None
+
+    def clear_partial_upload(self, filename):
+        """Remove o registro de envio parcial após o upload completo"""
+        try:
+            with self._lock:
+                if self.log_data.get(filename, {}).pop("partial", None) is not None:
+                    self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao limpar envio parcial do arquivo {filename}: {str(e)}")
+
+    def update_bundle(self, filename, bundle):
+        """Registra o lote (tar no diretório remoto base) em que o arquivo foi enviado"""
+        try:
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
+                self.log_data[filename]["bundle"] = bundle
+                self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar lote do arquivo {filename}: {str(e)}")
+
+    def get_bundle(self, filename):
+        """Retorna o nome do lote em que o arquivo foi enviado por último, ou None"""
+        try:
+            return self.log_data.get(filename, {}).get("bundle", None)
+        except Exception as e:
+            self.logger.error(f"Erro ao obter lote do arquivo {filename}: {str(e)}")
+            return None
+
+    def clear_bundle(self, filename):
+        """Remove o registro de lote quando o arquivo é enviado sozinho"""
+        try:
+            with self._lock:
+                if self.log_data.get(filename, {}).pop("bundle", None) is not None:
+                    self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao limpar lote do arquivo {filename}: {str(e)}")
+
+    def update_file_hash(self, filename, digest, size, mtime):
+        """Guarda a impressão digital do conteúdo, válida enquanto tamanho e mtime não mudarem"""
+        try:
+            with self._lock:
+                if filename not in self.log_data:
+                    self.log_data[filename] = {}
+                self.log_data[filename]["hash"] = {"digest": digest, "size": size, "mtime": mtime}
+                self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar hash do arquivo {filename}: {str(e)}")
+
+    def get_cached_hash(self, filename, size, mtime):
+        """Retorna o hash em cache se ainda corresponder ao tamanho e mtime informados"""
+        try:
+            cached = self.log_data.get(filename, {}).get("hash")
+            if cached and cached.get("size") == size and cached.get("mtime") == mtime:
+                return cached.get("digest")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao obter hash do arquivo {filename}: {str(e)}")
+            return None
+
+    def mark_uploaded_hash(self, filename):
+        """Registra o hash atual como o conteúdo enviado por último"""
+        try:
+            with self._lock:
+                entry = self.log_data.get(filename, {})
+                if entry.get("hash"):
+                    entry["uploaded_hash"] = entry["hash"]["digest"]
+                    self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar hash enviado do arquivo {filename}: {str(e)}")
+
+    def clear_uploaded_hash(self, filename):
+        """Esquece o conteúdo enviado por último (envio feito sem calcular o hash)"""
+        try:
+            with self._lock:
+                if self.log_data.get(filename, {}).pop("uploaded_hash", None) is not None:
+                    self._mark_dirty(filename)
+        except Exception as e:
+            self.logger.error(f"Erro ao limpar hash enviado do arquivo {filename}: {str(e)}")
+
+    def get_uploaded_hash(self, filename):
+        """Retorna o hash do conteúdo enviado por último"""
+        try:
+            return self.log_data.get(filename, {}).get("uploaded_hash", None)
+        except Exception as e:
+            self.logger.error(f"Erro ao obter hash enviado do arquivo {filename}: {str(e)}")
+            return None
+
     def clear_log(self):
         """Limpa todo o log de arquivos"""
-        self.log_data = {}
+        with self._lock:
+            self.log_data = {}
         self.save_log()
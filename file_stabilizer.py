@@ -0,0 +1,112 @@
+import os
+import logging
+import threading
+import time
+
+
+class FileStabilizer:
+    """Segura arquivos recém-detectados até que terminem de ser gravados.
+
+    Cada chamada a track() reinicia a observação do arquivo, de modo que a
+    rajada de eventos on_modified gerada por uma gravação vira um único
+    on_stable. O arquivo é liberado quando tamanho e mtime ficam inalterados
+    por `window` segundos ou, no Windows, antes disso se nenhum outro
+    processo o mantiver aberto (renomear para o mesmo nome só funciona com
+    acesso exclusivo).
+    """
+
+    def __init__(self, on_stable, window=2.0, check_interval=0.5):
+        self.on_stable = on_stable
+        self.window = window
+        self.check_interval = check_interval
+        self.logger = logging.getLogger(__name__)
+
+        # filepath -> [tamanho, mtime, instante da última mudança]
+        self._pending = {}
+        # Arquivos já estáveis cujo on_stable ainda não terminou
+        self._releasing = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="file-stabilizer", daemon=True)
+        self._thread.start()
+
+    def track(self, filepath):
+        """Começa (ou reinicia) a observação de um arquivo"""
+        state = self._stat(filepath)
+        if state is None:
+            return
+        with self._lock:
+            self._pending[filepath] = [state[0], state[1], time.monotonic()]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending) + self._releasing
+
+    def stop(self):
+        self._stop_event.set()
+
+    @staticmethod
+    def _stat(filepath):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    @staticmethod
+    def _can_open_exclusively(filepath):
+        """True se nenhum outro processo está com o arquivo aberto (somente Windows)"""
+        if os.name != 'nt':
+            return False
+        try:
+            os.rename(filepath, filepath)
+            return True
+        except OSError:
+            return False
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                for filepath in self._check_pending():
+                    try:
+                        self.on_stable(filepath)
+                    except Exception as e:
+                        self.logger.error(f"Erro ao liberar arquivo estável {filepath}: {str(e)}")
+                    finally:
+                        with self._lock:
+                            self._releasing -= 1
+            except Exception as e:
+                self.logger.error(f"Erro ao verificar arquivos em gravação: {str(e)}")
+
+    def _check_pending(self):
+        """Atualiza o estado dos arquivos observados e retorna os que estabilizaram"""
+        with self._lock:
+            items = list(self._pending.items())
+
+        now = time.monotonic()
+        stable = []
+        for filepath, (size, mtime, last_change) in items:
+            state = self._stat(filepath)
+            with self._lock:
+                entry = self._pending.get(filepath)
+                if entry is None or entry[2] != last_change:
+                    # Novo evento chegou durante a verificação
+                    continue
+                if state is None:
+                    # Arquivo removido ou renomeado antes de terminar
+                    del self._pending[filepath]
+                    continue
+                if state != (size, mtime):
+                    self._pending[filepath] = [state[0], state[1], now]
+                    continue
+
+            quiet_for = now - last_change
+            if quiet_for >= self.window or (
+                    quiet_for >= self.check_interval and self._can_open_exclusively(filepath)):
+                with self._lock:
+                    entry = self._pending.get(filepath)
+                    if entry is not None and entry[2] == last_change:
+                        del self._pending[filepath]
+                        self._releasing += 1
+                        stable.append(filepath)
+        return stable
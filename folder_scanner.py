@@ -0,0 +1,83 @@
+import os
+import logging
+
+
+def iter_files(folder, recursive=True):
+    """Percorre a pasta com os.scandir e gera (entry, nome relativo com '/').
+
+    O nome relativo é a chave do arquivo no FileLog e na fila; para os
+    arquivos da raiz é o próprio nome. Subpastas que não podem ser lidas
+    são ignoradas; um erro na pasta raiz é propagado.
+    """
+    pending = [(folder, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            if directory == folder:
+                raise
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append((entry.path, prefix + entry.name + "/"))
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                yield entry, prefix + entry.name
+
+
+class FolderScanner:
+    """Varredura incremental de uma pasta (e subpastas) com os.scandir.
+
+    Guarda o (tamanho, mtime) de cada arquivo visto na última varredura e
+    devolve apenas o que mudou, de forma que as entradas inalteradas não
+    precisem ser consultadas no FileLog novamente. Os arquivos são
+    identificados pelo caminho relativo à pasta, com '/'.
+    """
+
+    def __init__(self, recursive=True):
+        self.logger = logging.getLogger(__name__)
+        self.recursive = recursive
+        self.folder = None
+        self._cache = {}
+
+    def reset(self):
+        """Esquece o estado anterior; a próxima varredura devolve todos os arquivos"""
+        self._cache = {}
+
+    def forget(self, filename):
+        """Remove um arquivo do cache para que seja reavaliado na próxima varredura"""
+        self._cache.pop(filename, None)
+
+    def scan(self, folder):
+        """Retorna (alterados, removidos): alterados é uma lista de (filepath, filename, size, mtime)"""
+        if folder != self.folder:
+            self.folder = folder
+            self.reset()
+
+        changed = []
+        seen = {}
+        try:
+            for entry, filename in iter_files(folder, self.recursive):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Arquivo removido durante a varredura
+                    continue
+                state = (stat.st_size, stat.st_mtime)
+                seen[filename] = state
+                if self._cache.get(filename) != state:
+                    changed.append((entry.path, filename, stat.st_size, stat.st_mtime))
+        except OSError as e:
+            self.logger.error(f"Erro ao varrer a pasta {folder}: {str(e)}")
+            return [], []
+
+        removed = [filename for filename in self._cache if filename not in seen]
+        self._cache = seen
+        return changed, removed
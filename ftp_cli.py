@@ -0,0 +1,160 @@
+"""Upload automático sem interface gráfica, para rodar como serviço.
+
+Lê o ftp_config.json da interface (ou outro arquivo com --config) e, por
+cima dele, o .env e as variáveis de ambiente FTP_HOST, FTP_PORT, FTP_USER,
+FTP_PASSWORD, WATCH_FOLDER e REMOTE_DIR. Usa a mesma fila, o mesmo FileLog e as mesmas
+regras de reenvio da interface.
+
+Uso:
+    python ftp_cli.py                      # monitora a pasta até receber SIGTERM/Ctrl+C
+    python ftp_cli.py --once               # envia o que estiver pendente e sai
+    python ftp_cli.py --once --verify      # ...e confere no servidor o tamanho de tudo que foi enviado
+    python ftp_cli.py --folder /dados/entrada --connections 8 --env /etc/ftp-uploader.env
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+
+from file_log import FileLog
+from upload_service import UploadService
+
+# Variáveis do .env e do ambiente -> chaves do ftp_config.json
+ENV_KEYS = {
+    "FTP_HOST": "host",
+    "FTP_PORT": "port",
+    "FTP_USER": "user",
+    "FTP_PASSWORD": "password",
+    "WATCH_FOLDER": "monitored_folder",
+    "REMOTE_DIR": "remote_dir",
+}
+
+
+def default_app_data_dir():
+    appdata = os.getenv('APPDATA') or os.path.expanduser('~')
+    return os.path.join(appdata, 'FTP Manager')
+
+
+def read_env_file(path):
+    """Lê um arquivo .env simples (CHAVE=valor, comentários com #)"""
+    values = {}
+    if not path or not os.path.exists(path):
+        return values
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def load_settings(args):
+    """Monta a configuração: ftp_config.json < .env < ambiente < argumentos"""
+    config = {}
+    config_file = args.config or os.path.join(args.data_dir, "ftp_config.json")
+    if os.path.exists(config_file):
+        with open(config_file, 'r') as f:
+            config.update(json.load(f))
+
+    env = read_env_file(args.env)
+    env.update({key: value for key, value in os.environ.items() if key in ENV_KEYS})
+    for env_key, config_key in ENV_KEYS.items():
+        if env.get(env_key):
+            config[config_key] = env[env_key]
+    if env.get("LOG_LEVEL") and not args.log_level:
+        args.log_level = env["LOG_LEVEL"]
+
+    if args.folder:
+        config["monitored_folder"] = args.folder
+    if args.connections:
+        config["connections"] = args.connections
+    if args.engine:
+        config["upload_engine"] = args.engine
+    if args.skip_existing:
+        config["skip_existing_remote"] = True
+    if args.metrics_file:
+        config["metrics_file"] = args.metrics_file
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="ftp_config.json a usar (padrão: o da interface)")
+    parser.add_argument("--env", default=".env", help="arquivo .env (padrão: .env no diretório atual)")
+    parser.add_argument("--data-dir", default=default_app_data_dir(), help="diretório do FileLog e ajustes")
+    parser.add_argument("--folder", help="pasta monitorada")
+    parser.add_argument("--connections", type=int, help="conexões paralelas")
+    parser.add_argument("--engine", choices=("threads", "asyncio"), help="motor de upload")
+    parser.add_argument("--once", action="store_true", help="envia o que estiver pendente e sai")
+    parser.add_argument("--verify", action="store_true",
+                        help="com --once, confere no servidor os arquivos enviados (código 1 se houver divergências)")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="não reenvia arquivos sem registro que já estão no servidor com o mesmo tamanho")
+    parser.add_argument("--metrics-file",
+                        help="grava métricas por fase (texto do Prometheus, ou JSON se terminar em .json)")
+    parser.add_argument("--log-level", help="DEBUG, INFO, WARNING...")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    config = load_settings(args)
+    logging.basicConfig(
+        level=getattr(logging, (args.log_level or "INFO").upper(), logging.INFO),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger("ftp_cli")
+
+    missing = [key for key in ("host", "user", "password", "monitored_folder") if not config.get(key)]
+    if missing:
+        logger.error(f"Configuração incompleta, faltando: {', '.join(missing)}")
+        return 2
+    if not os.path.isdir(config["monitored_folder"]):
+        logger.error(f"Pasta monitorada não encontrada: {config['monitored_folder']}")
+        return 2
+
+    file_log = FileLog(app_data_dir=args.data_dir)
+    service = UploadService(file_log, app_data_dir=args.data_dir)
+    service.apply_config(config)
+
+    def request_stop(signum, frame):
+        logger.info("Encerrando...")
+        service.stop()
+
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        if not service.connect():
+            logger.error("Não foi possível conectar ao servidor FTP")
+            return 1
+        logger.info(f"Conectado a {service.host}:{service.port}")
+
+        if args.once:
+            service.reconcile()
+            # Espera a estabilização e a fila esvaziarem; falhas ficam para a próxima execução
+            service.wait_until_idle()
+            stats = service.upload_pool.stats()
+            logger.info(f"{stats['files_done']} arquivos enviados, {stats['files_failed']} falhas")
+            if stats.get('compressed_files'):
+                logger.info(
+                    f"MODE Z em {stats['compressed_files']} arquivos: "
+                    f"{stats['compressed_raw_bytes'] / 1048576:.1f} MB -> {stats['compressed_sent_bytes'] / 1048576:.1f} MB "
+                    f"({stats['compression_ratio']:.1f}x, {stats['compression_cpu']:.2f} s de CPU)"
+                )
+            mismatched = service.verify_remote() if args.verify else []
+            return 1 if stats['files_failed'] or mismatched else 0
+
+        service.start_discovery()
+        service.run_forever()
+        return 0
+    finally:
+        service.close()
+        file_log.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
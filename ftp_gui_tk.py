@@ -4,36 +4,18 @@ import logging
 import threading
 import queue
 import time
-from datetime import datetime
 from tkinter import filedialog, messagebox
 import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
-from dotenv import load_dotenv
-from ftp_uploader import FTPImageUploader
+from upload_pool import PRIORITY_AUTO, PRIORITY_LOW, PRIORITY_MANUAL
+from upload_service import UploadService
 from file_log import FileLog
-from file_handler import FileHandler
-# Dependências opcionais
-try:
-    import pystray
-except ImportError:
-    pystray = None
-try:
-    from PIL import Image
-except ImportError:
-    Image = None
-from assets.icon import create_icon
+from file_list_model import FileListModel
+from ui_events import UIEventBus
+# Dependências opcionais (pystray, PIL) e do Windows (winshell) são
+# importadas no primeiro uso, depois que a janela já apareceu
 # from license_manager import LicenseManager  # Removido - sistema liberado
-# Watchdog Observer
-try:
-    from watchdog.observers import Observer
-except ImportError:
-    Observer = None
-import winshell
-import win32con
-import win32com
-import win32api
-import pywintypes
 import sys
 
 class FTPManagerApp(ctk.CTk):
@@ -78,37 +60,51 @@ class FTPManagerApp(ctk.CTk):
         
         # Menu de Licença removido - sistema liberado
         
-        self.is_connected = False
-        self.ftp_uploader = None
-        self.observer = None
-        self.event_handler = None
-        self.auto_upload_enabled = True
-        self.upload_queue = queue.Queue()
-        self.upload_threads = {}
-        
-        # Inicia thread de processamento de upload
-        self.upload_processor = threading.Thread(target=self._process_upload_queue, daemon=True)
-        self.upload_processor.start()
+        self._folder_change_timer = None
+        # Modelo da tabela: só a página visível é materializada no Treeview
+        self.file_list_model = FileListModel(page_size=500)
+        self._rendered_rows = {}
+        self._list_pass = None
+        # None: nada pendente; False: só refiltrar/reordenar; True: reler a pasta
+        self._list_pass_pending = None
+        self.list_update_budget = 0.02  # segundos de trabalho por ciclo do loop do Tk
         
         self.config_file = os.path.join(self.app_data_dir, "ftp_config.json")
         
-        # Inicializar gerenciador de arquivos
-        self.file_log = FileLog()
+        # Inicializar gerenciador de arquivos; o log é lido em segundo plano
+        # enquanto a janela é montada
+        self.file_log = FileLog(load_in_background=True)
+        # Fila de eventos para comunicação entre threads, drenada a cada quadro
+        self.event_queue = UIEventBus()
+        self.ui_frame_interval = 50  # ms
+        # Fila, pool de uploaders, watchdog e reconciliação; o mesmo pipeline do ftp_cli.py
+        self.service = UploadService(
+            self.file_log,
+            self.app_data_dir,
+            on_status=self.event_queue.post_status,
+            on_progress=self.event_queue.post_progress,
+            on_files_changed=self.request_file_list_update
+        )
+        # Chaves do ftp_config.json sem campo na tela (stability_window, upload_engine, rate_schedule...)
+        self._extra_config = {}
         
         # Variáveis de configuração
         self.host_var = tk.StringVar(value="")
         self.port_var = tk.StringVar(value="21")
         self.user_var = tk.StringVar(value="")
         self.pass_var = tk.StringVar(value="")
+        self.connections_var = tk.StringVar(value="4")
+        self.rate_limit_var = tk.StringVar(value="0")
+        self.rate_limit_per_connection_var = tk.StringVar(value="0")
+        self.rate_limit_var.trace_add("write", lambda *args: self._on_rate_limit_changed())
+        self.rate_limit_per_connection_var.trace_add("write", lambda *args: self._on_rate_limit_changed())
         self.monitored_folder_var = tk.StringVar(value="")
         self.monitored_folder_var.trace_add("write", lambda *args: self.update_file_list())
         
-        # Fila de eventos para comunicação entre threads
-        self.event_queue = queue.Queue()
-        
-        # Configuração do ícone do system tray
+        # Ícone do system tray, criado depois que a janela aparece
         self.icon = None
-        self.setup_system_tray()
+        # A primeira leitura da pasta espera a janela aparecer e o log carregar
+        self._startup_done = False
         
         # Evento para controlar a visibilidade da janela
         self.is_visible = True
@@ -119,10 +115,35 @@ class FTPManagerApp(ctk.CTk):
         
         self.startup_checkbox_var = tk.BooleanVar(value=False)
         self.autoconnect_checkbox_var = tk.BooleanVar(value=False)
+        self.dedup_checkbox_var = tk.BooleanVar(value=False)
+        self.integrity_checkbox_var = tk.BooleanVar(value=False)
         
+        self.update_timer = None
+        # A lista acompanha os eventos do watchdog e dos uploads; a releitura periódica
+        # só cobre mudanças fora deles (ex.: pasta alterada enquanto desconectado)
+        self.list_refresh_interval = 60  # segundos
+        # Reconciliação roda fora do loop do Tk (varredura, hashes, consultas ao servidor)
+        self._reconcile_thread = None
+        self._reconcile_again = False
         self.setup_ui()
         self.load_config()
         self.load_startup_checkbox()
+        
+        # Inicia o processamento de eventos
+        self.process_events()
+        # Tarefas ociosas rodam depois do primeiro desenho da janela
+        self.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        """Cria o ícone da bandeja e aguarda o log para ler a pasta e conectar"""
+        self.setup_system_tray()
+        self._start_when_log_loaded()
+
+    def _start_when_log_loaded(self):
+        if not self.file_log.is_loaded():
+            self.after(50, self._start_when_log_loaded)
+            return
+        self._startup_done = True
         # Conexão automática se opção marcada
         if self.autoconnect_checkbox_var.get() and all([
             self.host_var.get(), self.port_var.get(), self.user_var.get(), self.pass_var.get()
@@ -131,13 +152,9 @@ class FTPManagerApp(ctk.CTk):
             self.connect_ftp()
         
         # Iniciar timers
-        self.update_timer = None
         self.start_auto_update()
         self.check_new_files()  # Inicia a verificação de novos arquivos
         
-        # Inicia o processamento de eventos
-        self.process_events()
-        
     def setup_ui(self):
         """Configura a interface do usuário"""
         # Frame principal
@@ -185,12 +202,31 @@ class FTPManagerApp(ctk.CTk):
         pass_entry = ctk.CTkEntry(pass_frame, textvariable=self.pass_var, show="*", width=200)
         pass_entry.pack(side=tk.LEFT, padx=5)
 
+        # Conexões paralelas
+        connections_frame = ctk.CTkFrame(config_frame)
+        connections_frame.pack(fill=tk.X, padx=5, pady=2)
+        connections_label = ctk.CTkLabel(connections_frame, text="Conexões:")
+        connections_label.pack(side=tk.LEFT)
+        connections_entry = ctk.CTkEntry(connections_frame, textvariable=self.connections_var, width=60)
+        connections_entry.pack(side=tk.LEFT, padx=5)
+
+        # Limite de banda em KB/s (0 = sem limite), aplicado na hora aos envios em andamento
+        rate_limit_label = ctk.CTkLabel(connections_frame, text="Limite (KB/s):")
+        rate_limit_label.pack(side=tk.LEFT, padx=(10, 0))
+        rate_limit_entry = ctk.CTkEntry(connections_frame, textvariable=self.rate_limit_var, width=80)
+        rate_limit_entry.pack(side=tk.LEFT, padx=5)
+        per_connection_label = ctk.CTkLabel(connections_frame, text="Por conexão:")
+        per_connection_label.pack(side=tk.LEFT)
+        per_connection_entry = ctk.CTkEntry(connections_frame, textvariable=self.rate_limit_per_connection_var, width=80)
+        per_connection_entry.pack(side=tk.LEFT, padx=5)
+
         # Monitored Folder
         folder_frame = ctk.CTkFrame(config_frame)
         folder_frame.pack(fill=tk.X, padx=5, pady=2)
         folder_label = ctk.CTkLabel(folder_frame, text="Pasta:")
         folder_label.pack(side=tk.LEFT)
         self.monitored_folder_var = tk.StringVar()
+        self.monitored_folder_var.trace_add("write", lambda *args: self._on_folder_changed())
         folder_entry = ctk.CTkEntry(folder_frame, textvariable=self.monitored_folder_var, width=400)
         folder_entry.pack(side=tk.LEFT, padx=5)
         folder_button = ctk.CTkButton(folder_frame, text="Escolher", command=self.browse_folder)
@@ -223,7 +259,7 @@ class FTPManagerApp(ctk.CTk):
         
         # Campo de pesquisa
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", lambda *args: self.update_file_list())
+        self.search_var.trace_add("write", lambda *args: self._on_search_changed())
         search_entry = ctk.CTkEntry(search_frame, textvariable=self.search_var, placeholder_text="Pesquisar arquivos...")
         search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
         
@@ -251,10 +287,27 @@ class FTPManagerApp(ctk.CTk):
         self.tree.column("Data Modificação", width=150)
         self.tree.column("Data Envio", width=150)
 
+        # Menu de contexto para mudar a prioridade de arquivos que aguardam na fila
+        self.tree_menu = tk.Menu(self, tearoff=0)
+        self.tree_menu.add_command(label="Enviar primeiro", command=lambda: self.reprioritize_selected(PRIORITY_MANUAL))
+        self.tree_menu.add_command(label="Prioridade normal", command=lambda: self.reprioritize_selected(PRIORITY_AUTO))
+        self.tree_menu.add_command(label="Adiar envio", command=lambda: self.reprioritize_selected(PRIORITY_LOW))
+        self.tree.bind("<Button-3>", self._show_tree_menu)
+
         # Scrollbar
         scrollbar = ttk.Scrollbar(self.table_frame, orient=tk.VERTICAL, command=self.tree.yview)
         self.tree.configure(yscrollcommand=scrollbar.set)
         
+        # Paginação
+        page_frame = ctk.CTkFrame(self.table_frame)
+        page_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+        prev_button = ctk.CTkButton(page_frame, text="◀", width=30, command=lambda: self.change_page(-1))
+        prev_button.pack(side=tk.LEFT)
+        self.page_label = ctk.CTkLabel(page_frame, text="Página 1/1")
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        next_button = ctk.CTkButton(page_frame, text="▶", width=30, command=lambda: self.change_page(1))
+        next_button.pack(side=tk.LEFT)
+
         # Layout
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -291,17 +344,47 @@ class FTPManagerApp(ctk.CTk):
             command=self.save_config
         )
         self.autoconnect_checkbox.pack(anchor=tk.W, padx=5, pady=2)
+        self.dedup_checkbox = ctk.CTkCheckBox(
+            config_frame,
+            text="Não reenviar arquivos com conteúdo idêntico (hash)",
+            variable=self.dedup_checkbox_var,
+            command=self.save_config
+        )
+        self.dedup_checkbox.pack(anchor=tk.W, padx=5, pady=2)
+        self.integrity_checkbox = ctk.CTkCheckBox(
+            config_frame,
+            text="Verificar integridade dos envios (hash no servidor)",
+            variable=self.integrity_checkbox_var,
+            command=self.save_config
+        )
+        self.integrity_checkbox.pack(anchor=tk.W, padx=5, pady=2)
 
-    def save_config(self):
-        """Salva as configurações do servidor e preferências"""
-        config = {
+    def _current_config(self):
+        """Configuração atual no formato do ftp_config.json"""
+        config = dict(self._extra_config)
+        config.update({
             'host': self.host_var.get(),
             'port': self.port_var.get(),
             'user': self.user_var.get(),
             'password': self.pass_var.get(),
+            'connections': self.connections_var.get(),
             'monitored_folder': self.monitored_folder_var.get(),
-            'autoconnect': self.autoconnect_checkbox_var.get()
-        }
+            'autoconnect': self.autoconnect_checkbox_var.get(),
+            'dedup_hash': self.dedup_checkbox_var.get(),
+            'verify_integrity': self.integrity_checkbox_var.get(),
+            'stability_window': self.service.stability_window,
+            'upload_engine': self.service.upload_engine,
+            'async_concurrency': self.service.async_concurrency,
+            'adaptive_transfer': self.service.adaptive_transfer,
+            'rate_limit_kbps': self.rate_limit_var.get(),
+            'rate_limit_per_connection_kbps': self.rate_limit_per_connection_var.get(),
+            'rate_schedule': self.service.rate_schedule
+        })
+        return config
+
+    def save_config(self):
+        """Salva as configurações do servidor e preferências"""
+        config = self._current_config()
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(config, f, indent=4)
@@ -319,8 +402,16 @@ class FTPManagerApp(ctk.CTk):
                     self.port_var.set(config.get('port', '21'))
                     self.user_var.set(config.get('user', ''))
                     self.pass_var.set(config.get('password', ''))
+                    self.connections_var.set(str(config.get('connections', '4')))
                     self.monitored_folder_var.set(config.get('monitored_folder', ''))
                     self.autoconnect_checkbox_var.set(config.get('autoconnect', False))
+                    self.dedup_checkbox_var.set(config.get('dedup_hash', False))
+                    self.integrity_checkbox_var.set(config.get('verify_integrity', False))
+                    self.rate_limit_var.set(str(config.get('rate_limit_kbps', '0')))
+                    self.rate_limit_per_connection_var.set(str(config.get('rate_limit_per_connection_kbps', '0')))
+                    self._extra_config = config
+                    self.service.apply_config(config)
+                    self.file_list_model.recursive = self.service.recursive
                     return config
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao carregar configurações: {str(e)}")
@@ -329,10 +420,8 @@ class FTPManagerApp(ctk.CTk):
         """Conecta ao servidor FTP"""
         try:
             # Se já estiver conectado, desconecta
-            if self.is_connected:
-                if self.ftp_uploader:
-                    self.ftp_uploader.disconnect()
-                self.is_connected = False
+            if self.service.is_connected:
+                self.service.disconnect()
                 self.connect_button.configure(text="Conectar")
                 self.update_status("Desconectado do servidor FTP")
                 return
@@ -342,22 +431,14 @@ class FTPManagerApp(ctk.CTk):
                 messagebox.showerror("Erro", "Por favor, preencha todos os campos de configuração")
                 return
 
-            # Cria nova instância do uploader com os dados de conexão
-            self.ftp_uploader = FTPImageUploader(
-                host=self.host_var.get(),
-                port=self.port_var.get(),
-                username=self.user_var.get(),
-                password=self.pass_var.get()
-            )
-            
-            # Tenta conectar
-            if self.ftp_uploader.connect():
-                self.is_connected = True
+            # Aplica o que está na tela e abre o pool de sessões e os uploaders
+            self.service.apply_config(self._current_config())
+            if self.service.connect():
                 self.connect_button.configure(text="Desconectar")
                 self.update_status("Conectado ao servidor FTP")
+                self._start_event_discovery()
                 messagebox.showinfo("Sucesso", "Conectado ao servidor FTP com sucesso!")
             else:
-                self.is_connected = False
                 messagebox.showerror("Erro", "Não foi possível conectar ao servidor FTP")
         except Exception as e:
             self.logger.error(f"Erro ao conectar ao servidor FTP: {str(e)}")
@@ -366,30 +447,17 @@ class FTPManagerApp(ctk.CTk):
     def start_monitoring(self):
         """Inicia o monitoramento da pasta"""
         try:
-            # Para monitoramento existente
-            self.stop_monitoring()
-            
             monitored_folder = self.monitored_folder_var.get()
             if not monitored_folder or not os.path.exists(monitored_folder):
                 messagebox.showerror("Erro", "Pasta monitorada não encontrada")
                 return False
 
-            # Cria novo observer
-            if Observer is None:
-                messagebox.showerror("Erro", "Dependência watchdog não instalada.")
-                return False
-            self.event_handler = FileHandler(self.ftp_uploader, self)
-            self.observer = Observer()
-            self.observer.schedule(self.event_handler, monitored_folder, recursive=False)
-            
-            try:
-                self.observer.start()
+            self.service.monitored_folder = monitored_folder
+            if self.service.start_watching():
                 self.update_status(f"Monitorando pasta: {monitored_folder}")
                 return True
-            except Exception as e:
-                self.logger.error(f"Erro ao iniciar observer: {str(e)}")
-                self.observer = None
-                return False
+            self.update_status("Erro ao iniciar monitoramento")
+            return False
 
         except Exception as e:
             self.logger.error(f"Erro ao iniciar monitoramento: {str(e)}")
@@ -398,96 +466,107 @@ class FTPManagerApp(ctk.CTk):
 
     def stop_monitoring(self):
         """Para o monitoramento da pasta"""
+        if self.service.observer:
+            self.service.stop_watching()
+            self.update_status("Monitoramento parado")
+
+    def update_file_list(self, rescan=True):
+        """Atualiza a lista de arquivos em passos curtos, sem travar a interface"""
+        if not self._startup_done:
+            # A lista é montada ao fim da inicialização
+            return
+        if self._list_pass is not None:
+            # Já existe uma atualização em andamento: repete ao terminar
+            self._list_pass_pending = bool(self._list_pass_pending) or rescan
+            return
+        self._list_pass = self._file_list_pass(rescan)
+        self._continue_file_list_pass()
+
+    def _file_list_pass(self, rescan):
+        """Gerador com os passos de uma atualização: releitura da pasta e diff da página visível"""
+        self.file_list_model.search_term = self.search_var.get().lower()
+        if rescan:
+            yield from self.file_list_model.refresh_steps(self.monitored_folder_var.get(), self.file_log)
+        else:
+            self.file_list_model.resort()
+        yield from self._render_page_steps()
+
+    def _continue_file_list_pass(self):
+        """Executa passos da atualização até esgotar o orçamento de tempo do ciclo"""
+        deadline = time.monotonic() + self.list_update_budget
         try:
-            if self.observer:
-                self.observer.stop()
-                self.observer.join()
-                self.observer = None
-                self.logger.info("Monitoramento parado")
-                self.update_status("Monitoramento parado")
+            while time.monotonic() < deadline:
+                next(self._list_pass)
+        except StopIteration:
+            self._list_pass = None
+            if self._list_pass_pending is not None:
+                rescan, self._list_pass_pending = self._list_pass_pending, None
+                self.update_file_list(rescan)
+            return
         except Exception as e:
-            self.logger.error(f"Erro ao parar monitoramento: {str(e)}")
-            self.observer = None
+            self.logger.error(f"Erro ao atualizar lista de arquivos: {str(e)}")
+            self._list_pass = None
+            return
+        self.after(1, self._continue_file_list_pass)
+
+    def _render_page_steps(self):
+        """Aplica na tabela apenas as diferenças entre a página atual e o que já está exibido"""
+        names = self.file_list_model.page_names()
+        wanted = set(names)
+        for iid in [iid for iid in self._rendered_rows if iid not in wanted]:
+            self.tree.delete(iid)
+            del self._rendered_rows[iid]
+            yield
+
+        for index, filename in enumerate(names):
+            values = self.file_list_model.rows[filename]
+            rendered = self._rendered_rows.get(filename)
+            if rendered is None:
+                self.tree.insert("", index, iid=filename, values=values)
+            else:
+                if rendered != values:
+                    self.tree.item(filename, values=values)
+                if self.tree.index(filename) != index:
+                    self.tree.move(filename, "", index)
+            self._rendered_rows[filename] = values
+            yield
+
+        self.page_label.configure(
+            text=f"Página {self.file_list_model.page + 1}/{self.file_list_model.page_count()} "
+                 f"({len(self.file_list_model.order)} arquivos)"
+        )
 
-    def update_file_list(self):
-        """Atualiza a lista de arquivos"""
+    def refresh_file_row(self, filename):
+        """Atualiza só a linha de um arquivo após mudança de status"""
         try:
-            # Guardar seleção atual
-            selected_files = []
-            for item in self.tree.selection():
-                values = self.tree.item(item)["values"]
-                if values:
-                    selected_files.append(values[0])  # Nome do arquivo
-
-            # Limpar tabela
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            # Obter pasta monitorada
-            monitored_folder = self.monitored_folder_var.get()
-            if not monitored_folder or not os.path.exists(monitored_folder):
+            if filename not in self.file_list_model.rows:
+                # Arquivo novo para a tabela: precisa reler a pasta
+                self.update_file_list()
                 return
+            changed = self.file_list_model.update_row(self.monitored_folder_var.get(), filename, self.file_log)
+            if changed and filename in self._rendered_rows:
+                values = self.file_list_model.rows[filename]
+                self.tree.item(filename, values=values)
+                self._rendered_rows[filename] = values
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar linha do arquivo {filename}: {str(e)}")
 
-            # Obter termo de pesquisa
-            search_term = self.search_var.get().lower()
+    def _on_search_changed(self):
+        """Refiltra as linhas já carregadas, sem reler a pasta"""
+        self.file_list_model.page = 0
+        self.update_file_list(rescan=False)
 
-            # Listar arquivos
-            for filename in os.listdir(monitored_folder):
-                # Filtrar por termo de pesquisa
-                if search_term and search_term not in filename.lower():
-                    continue
-                    
-                filepath = os.path.join(monitored_folder, filename)
-                if not os.path.isfile(filepath):
-                    continue
-
-                # Obter informações do arquivo
-                file_type = os.path.splitext(filename)[1]
-                file_size = os.path.getsize(filepath)
-                
-                # Usar o horário de modificação do arquivo
-                file_mtime = os.path.getmtime(filepath)
-                file_date = datetime.fromtimestamp(file_mtime)
-                
-                # Formatar tamanho
-                if file_size < 1024:
-                    size_str = f"{file_size} B"
-                elif file_size < 1024*1024:
-                    size_str = f"{file_size/1024:.1f} KB"
-                else:
-                    size_str = f"{file_size/(1024*1024):.1f} MB"
-                
-                # Obter status e data de envio do arquivo
-                status = self.file_log.get_file_status(filename)
-                if not status:
-                    status = "Pendente"
-                    # Atualiza o timestamp inicial no log
-                    self.file_log.update_file_mtime(filename, file_mtime)
-                
-                # Obter data de envio
-                upload_date = self.file_log.get_upload_date(filename)
-                
-                # Inserir na tabela
-                item = self.tree.insert("", tk.END, values=(
-                    filename,
-                    file_type,
-                    size_str,
-                    status,
-                    file_date.strftime("%d/%m/%Y %H:%M:%S"),
-                    upload_date
-                ))
-                
-                # Restaurar seleção se arquivo estava selecionado
-                if filename in selected_files:
-                    self.tree.selection_add(item)
-
-        except Exception as e:
-            self.logger.error(f"Erro ao atualizar lista de arquivos: {str(e)}")
+    def change_page(self, delta):
+        """Navega entre as páginas da tabela"""
+        page = self.file_list_model.page + delta
+        if 0 <= page < self.file_list_model.page_count():
+            self.file_list_model.page = page
+            self.update_file_list(rescan=False)
 
     def upload_files(self):
         """Faz upload dos arquivos selecionados"""
         try:
-            if not self.is_connected:
+            if not self.service.is_connected:
                 if not self.connect_ftp():
                     return
 
@@ -496,14 +575,9 @@ class FTPManagerApp(ctk.CTk):
                 messagebox.showwarning("Aviso", "Selecione pelo menos um arquivo para upload")
                 return
 
-            # Processa cada arquivo selecionado
-            for item in selected_items:
-                values = self.tree.item(item)["values"]
-                if not values:
-                    continue
-
-                filename = values[0]
-                filepath = os.path.join(self.monitored_folder_var.get(), filename)
+            # Processa cada arquivo selecionado; o iid da linha é o caminho relativo do arquivo
+            for filename in selected_items:
+                filepath = self.service.local_path(filename)
                 
                 # Verifica se o arquivo existe
                 if not os.path.exists(filepath):
@@ -518,9 +592,15 @@ class FTPManagerApp(ctk.CTk):
                     messagebox.showwarning("Aviso", f"Arquivo já está sendo enviado: {filename}")
                     continue
 
-                # Adiciona à fila de upload
-                self._update_status_quietly(filename, "Aguardando...")
-                self.upload_queue.put((filepath, filename))
+                # Adiciona à fila de upload, à frente dos arquivos detectados
+                # automaticamente (ou promove o arquivo se ele já estava na fila)
+                try:
+                    if self.service.offer_upload((filepath, filename), priority=PRIORITY_MANUAL, block=False):
+                        self._update_status_quietly(filename, "Aguardando...")
+                except queue.Full:
+                    self.logger.warning(f"Fila de upload cheia; arquivo não adicionado: {filename}")
+                    messagebox.showwarning("Aviso", "Fila de upload cheia. Tente novamente em instantes.")
+                    break
                 self.logger.info(f"Arquivo adicionado à fila: {filename}")
 
             # Atualiza interface
@@ -531,68 +611,78 @@ class FTPManagerApp(ctk.CTk):
             self.logger.error(f"Erro ao iniciar upload: {str(e)}")
             messagebox.showerror("Erro", f"Erro ao iniciar upload: {str(e)}")
 
-    def _process_upload_queue(self):
-        """Thread dedicada para processar a fila de upload"""
-        while True:
-            try:
-                # Espera por um novo item na fila
-                filepath, filename = self.upload_queue.get()
-                
-                try:
-                    # Atualiza status inicial e mostra barra de progresso
-                    self.after(0, lambda: self._update_status_quietly(filename, "Enviando..."))
-                    self.after(0, lambda: self.progress_frame.pack(fill=tk.X, padx=5, pady=5))
-                    self.after(0, lambda: self.progress_label.configure(text=f"Enviando arquivo: {filename}"))
-                    self.after(0, lambda: self.progress_bar.set(0))
-                    
-                    def progress_callback(current, total):
-                        progress = current / total if total > 0 else 0
-                        self.after(0, lambda: self.progress_bar.set(progress))
-                        self.after(0, lambda: self.progress_label.configure(
-                            text=f"Enviando arquivo: {filename} ({current/1024/1024:.1f}MB / {total/1024/1024:.1f}MB)"
-                        ))
-                    
-                    # Faz o upload com callback de progresso
-                    if self.ftp_uploader and hasattr(self.ftp_uploader, 'upload_file'):
-                        if self.ftp_uploader.upload_file(filepath, progress_callback=progress_callback, force=True):
-                            # Sucesso - atualiza status e timestamp
-                            current_mtime = os.path.getmtime(filepath)
-                            self.after(0, lambda: self._update_status_quietly(filename, "Enviado"))
-                            self.after(0, lambda: self.file_log.update_file_mtime(filename, current_mtime))
-                        else:
-                            # Falha
-                            self.after(0, lambda: self._update_status_quietly(filename, "Erro"))
-                    else:
-                        self.after(0, lambda: self._update_status_quietly(filename, "Erro: FTP Uploader não disponível"))
-                    
-                    # Oculta barra de progresso após concluir
-                    self.after(1000, lambda: self.progress_frame.pack_forget())
-                        
-                except Exception as e:
-                    self.logger.error(f"Erro no upload do arquivo {filename}: {str(e)}")
-                    self.after(0, lambda: self._update_status_quietly(filename, f"Erro: {str(e)}"))
-                    self.after(0, lambda: self.progress_frame.pack_forget())
-                
-                finally:
-                    # Marca o item como processado e atualiza a lista
-                    self.upload_queue.task_done()
-                    self.after(0, self.update_file_list)
-                    
-            except Exception as e:
-                self.logger.error(f"Erro no processador de upload: {str(e)}")
-                time.sleep(1)  # Evita consumo excessivo de CPU em caso de erro
-                
+    def _show_tree_menu(self, event):
+        row = self.tree.identify_row(event.y)
+        if row and row not in self.tree.selection():
+            self.tree.selection_set(row)
+        if self.tree.selection():
+            self.tree_menu.tk_popup(event.x_root, event.y_root)
+
+    def reprioritize_selected(self, priority):
+        """Muda a prioridade dos arquivos selecionados que ainda aguardam na fila"""
+        changed = 0
+        # O iid de cada linha é o nome do arquivo
+        for filename in self.tree.selection():
+            if self.service.upload_queue.reprioritize(filename, priority):
+                changed += 1
+        if changed:
+            self.update_status(f"Prioridade alterada para {changed} arquivo(s) na fila")
+        else:
+            self.update_status("Nenhum dos arquivos selecionados está aguardando na fila")
+
+    def _on_rate_limit_changed(self):
+        """Aplica os limites digitados sem reiniciar os envios em andamento"""
+        try:
+            limit_kbps = max(0, int(self.rate_limit_var.get() or 0))
+            per_connection_kbps = max(0, int(self.rate_limit_per_connection_var.get() or 0))
+        except ValueError:
+            # Valor incompleto enquanto o usuário digita
+            return
+        self.service.rate_limiter.set_default_limits(limit_kbps, per_connection_kbps)
+
+    def _apply_ui_batch(self, batch):
+        """Aplica em uma única passada as atualizações coalescidas dos workers"""
+        for filename, status in batch.statuses.items():
+            if not batch.refresh_list:
+                self.refresh_file_row(filename)
+        if not batch.refresh_list:
+            for filename in batch.rows - batch.statuses.keys():
+                self.refresh_file_row(filename)
+
+        if batch.statuses:
+            filename, status = next(reversed(batch.statuses.items()))
+            self.status_label.configure(text=f"Status: Arquivo {filename}: {status}")
+            if "Enviando..." in batch.statuses.values():
+                self.progress_frame.pack(fill=tk.X, padx=5, pady=5)
+                if status == "Enviando...":
+                    self.progress_label.configure(text=f"Enviando arquivo: {filename}")
+                    self.progress_bar.set(0)
+            elif self.service.upload_queue.unfinished_tasks == 0:
+                # Oculta barra de progresso quando a fila esvazia
+                self.after(1000, self._hide_progress_if_idle)
+
+        if batch.progress:
+            filename, (current, total) = next(reversed(batch.progress.items()))
+            self.progress_bar.set(current / total if total > 0 else 0)
+            self.progress_label.configure(
+                text=f"Enviando arquivo: {filename} ({current/1024/1024:.1f}MB / {total/1024/1024:.1f}MB)"
+            )
+
+        if batch.refresh_list:
+            self.update_file_list()
+
+    def _hide_progress_if_idle(self):
+        if self.service.upload_queue.unfinished_tasks == 0:
+            self.progress_frame.pack_forget()
+
     def _update_status_quietly(self, filename, status):
         """Atualiza o status sem bloquear a interface"""
         try:
             # Atualiza o log
             self.file_log.update_file_status(filename, status)
             
-            # Atualiza a interface sem travar
-            self.status_label.configure(text=f"Status: Arquivo {filename}: {status}")
-            
-            # Agenda uma atualização da lista para o próximo ciclo de eventos
-            self.after(100, self.update_file_list)
+            # A interface é atualizada no próximo quadro
+            self.event_queue.post_status(filename, status)
             
         except Exception as e:
             self.logger.error(f"Erro ao atualizar status: {str(e)}")
@@ -602,12 +692,11 @@ class FTPManagerApp(ctk.CTk):
         self.status_label.configure(text=f"Status: {message}")
 
     def start_auto_update(self):
-        """Inicia a atualização automática da lista de arquivos"""
-        if not self.update_timer:
-            self.update_file_list()  # Atualização inicial
-            # Agendar próxima atualização
-            self.update_timer = self.after(2000, self.start_auto_update)  # Atualiza a cada 2 segundos
-        
+        """Relê a lista de arquivos agora e depois a cada list_refresh_interval segundos"""
+        self.stop_auto_update()
+        self.update_file_list()
+        self.update_timer = self.after(int(self.list_refresh_interval * 1000), self.start_auto_update)
+
     def stop_auto_update(self):
         """Para a atualização automática"""
         if self.update_timer:
@@ -640,70 +729,83 @@ class FTPManagerApp(ctk.CTk):
 
     def sort_treeview(self, column, reverse):
         """Ordena a tabela por uma coluna específica"""
-        l = [(self.tree.set(k, column), k) for k in self.tree.get_children('')]
-        # Corrigir para garantir que o valor é string para comparação
-        l.sort(key=lambda t: str(t[0]), reverse=reverse)
-
-        for index, (val, k) in enumerate(l):
-            self.tree.move(k, '', index)
+        self.file_list_model.sort_column = column
+        self.file_list_model.sort_reverse = reverse
+        self.update_file_list(rescan=False)
 
         self.tree.heading(column, command=lambda: self.sort_treeview(column, not reverse))
 
+    def request_file_list_update(self, filename=None):
+        """Pede uma atualização da lista, ou só da linha de um arquivo; seguro entre threads"""
+        if filename:
+            self.event_queue.post_row(filename)
+        else:
+            self.event_queue.post_refresh()
+
+    def _start_event_discovery(self):
+        """Inicia o watchdog e faz uma reconciliação completa da pasta"""
+        monitored_folder = self.monitored_folder_var.get()
+        self.service.monitored_folder = monitored_folder
+        if monitored_folder and os.path.isdir(monitored_folder):
+            self.start_monitoring()
+        # Arquivos que chegaram enquanto estava desconectado
+        self.service.folder_scanner.reset()
+        self.reconcile_in_background()
+
+    def _on_folder_changed(self):
+        """Troca a pasta monitorada, aguardando a digitação terminar"""
+        self.update_file_list()
+        if self._folder_change_timer:
+            self.after_cancel(self._folder_change_timer)
+        self._folder_change_timer = self.after(1000, self._apply_folder_change)
+
+    def _apply_folder_change(self):
+        self._folder_change_timer = None
+        if self.service.is_connected:
+            self._start_event_discovery()
+
     def check_new_files(self):
-        """Verifica novos arquivos e arquivos modificados para envio automático"""
+        """Agenda a varredura de reconciliação de baixa frequência"""
         try:
-            if self.is_connected and self.ftp_uploader and self.auto_upload_enabled:
-                monitored_folder = self.monitored_folder_var.get()
-                if monitored_folder and os.path.exists(monitored_folder):
-                    # Lista todos os arquivos na pasta
-                    for filename in os.listdir(monitored_folder):
-                        filepath = os.path.join(monitored_folder, filename)
-                        if not os.path.isfile(filepath):
-                            continue
-
-                        # Obtém o timestamp de modificação atual do arquivo
-                        current_mtime = os.path.getmtime(filepath)
-                        
-                        # Verifica se o arquivo já foi enviado
-                        status = self.file_log.get_file_status(filename)
-                        last_mtime = self.file_log.get_file_mtime(filename)
-                        
-                        # Arquivo precisa ser enviado se:
-                        # 1. Nunca foi enviado (status None ou "Pendente")
-                        # 2. Teve erro no envio anterior
-                        # 3. Foi modificado desde o último envio
-                        # 4. Não está atualmente sendo enviado
-                        needs_upload = (
-                            not status or 
-                            status == "Pendente" or 
-                            status == "Erro" or
-                            (status == "Enviado" and last_mtime and current_mtime > last_mtime)
-                        )
-                        
-                        if needs_upload and status != "Enviando...":
-                            try:
-                                self.logger.info(f"Iniciando upload automático do arquivo: {filename} (mtime: {datetime.fromtimestamp(current_mtime)})")
-                                self.file_log.update_file_status(filename, "Aguardando...")
-                                self.file_log.update_file_mtime(filename, current_mtime)
-                                
-                                # Adiciona à fila de upload
-                                self.upload_queue.put((filepath, filename))
-                                self.update_file_list()
-                                
-                            except Exception as e:
-                                self.logger.error(f"Erro ao preparar upload do arquivo {filename}: {str(e)}")
-                                self.file_log.update_file_status(filename, "Erro")
-                                self.update_status(f"Erro ao enviar arquivo: {filename}")
-
-        except Exception as e:
-            self.logger.error(f"Erro ao verificar novos arquivos: {str(e)}")
+            self.reconcile_in_background()
         finally:
             # Agenda próxima verificação
-            self.after(5000, self.check_new_files)  # Verifica a cada 5 segundos
+            self.after(int(self.service.reconcile_interval * 1000), self.check_new_files)
+
+    def reconcile_in_background(self):
+        """Roda service.reconcile() em uma thread; os resultados chegam pelo event_queue.
+
+        Se uma reconciliação já estiver em andamento, ela é repetida ao
+        terminar, em vez de abrir outra thread.
+        """
+        if self._reconcile_thread and self._reconcile_thread.is_alive():
+            self._reconcile_again = True
+            return
+
+        def reconcile_loop():
+            while True:
+                self._reconcile_again = False
+                self.service.reconcile()
+                if not self._reconcile_again:
+                    return
+
+        self._reconcile_thread = threading.Thread(target=reconcile_loop, name="reconcile", daemon=True)
+        self._reconcile_thread.start()
 
     def setup_system_tray(self):
         """Configura o ícone na área de notificação"""
         try:
+            try:
+                import pystray
+            except ImportError:
+                self.logger.warning("pystray não está instalado. System tray desabilitado.")
+                return
+            try:
+                from PIL import Image
+            except ImportError:
+                Image = None
+            from assets.icon import create_icon
+
             # Carrega o ícone do sistema
             icon_path = os.path.join(os.path.dirname(__file__), "public", "ftp.ico")
             self.logger.info(f"Tentando carregar ícone de: {icon_path}")
@@ -722,9 +824,6 @@ class FTPManagerApp(ctk.CTk):
                 image = create_icon()
             
             # Define o menu do system tray com mais opções
-            if pystray is None:
-                self.logger.warning("pystray não está instalado. System tray desabilitado.")
-                return
             menu = (
                 pystray.MenuItem('Mostrar/Ocultar', self.toggle_window),
                 pystray.MenuItem('Status', lambda: self.show_status_notification()),
@@ -758,7 +857,13 @@ class FTPManagerApp(ctk.CTk):
             
     def show_status_notification(self):
         """Mostra uma notificação com o status atual do aplicativo"""
-        status = "Conectado" if self.is_connected else "Desconectado"
+        service = self.service
+        status = "Conectado" if service.is_connected else "Desconectado"
+        if service.connection_pool:
+            stats = service.connection_pool.stats()
+            status += f" - pool: {stats['hits']} hits / {stats['misses']} misses"
+        if service.dedup_files_skipped:
+            status += f" - idênticos ignorados: {service.dedup_files_skipped} ({self.format_size(service.dedup_bytes_saved)})"
         if self.icon:
             self.icon.notify(f"Status: {status}", "TARGETWEB FTP")
     
@@ -781,96 +886,42 @@ class FTPManagerApp(ctk.CTk):
         try:
             if self.icon:
                 self.icon.stop()
-            if hasattr(self, 'observer') and self.observer:
-                self.observer.stop()
-                self.observer.join()
+            if hasattr(self, 'service'):
+                self.service.close()
+            self.file_log.close()
             self.destroy()
         except Exception as e:
             self.logger.error(f"Erro ao fechar aplicativo: {str(e)}")
             self.destroy()
     
     def process_events(self):
-        """Processa eventos da fila"""
+        """Processa eventos da fila, em lotes, a uma taxa fixa de quadros"""
         try:
-            while True:
-                try:
-                    event = self.event_queue.get_nowait()
-                    if event == "quit":
-                        if self.icon:
-                            self.icon.stop()
-                        if self.observer:
-                            self.observer.stop()
-                            self.observer.join()
-                        self.quit()
-                        return
-                except queue.Empty:
-                    break
-                
-            if self.is_running:
-                self.after(100, self.process_events)
+            batch = self.event_queue.drain()
+            for event in batch.events:
+                if event == "quit":
+                    if self.icon:
+                        self.icon.stop()
+                    self.service.stop_watching()
+                    self.is_running = False
+                    self.quit()
+                    return
+
+            if not batch.is_empty():
+                self._apply_ui_batch(batch)
         except Exception as e:
             self.logger.error(f"Erro ao processar eventos: {str(e)}")
+        finally:
+            if self.is_running:
+                self.after(self.ui_frame_interval, self.process_events)
     
     def __del__(self):
         """Destrutor da classe"""
         self.quit_app()
 
     def queue_upload(self, filepath, is_update=False):
-        """Adiciona um arquivo à fila de upload"""
-        try:
-            filename = os.path.basename(filepath)
-            
-            # Verifica se já existe uma thread de upload para este arquivo
-            if filename in self.upload_threads:
-                self.logger.warning(f"Upload do arquivo {filename} já está em andamento")
-                return
-                
-            # Inicia uma nova thread para o upload
-            upload_thread = threading.Thread(
-                target=self._upload_file_thread,
-                args=(filepath, filename, is_update),
-                daemon=True
-            )
-            self.upload_threads[filename] = upload_thread
-            upload_thread.start()
-            
-        except Exception as e:
-            self.logger.error(f"Erro ao adicionar arquivo à fila de upload: {str(e)}")
-            messagebox.showerror("Erro", f"Erro ao iniciar upload: {str(e)}")
-
-    def _upload_file_thread(self, filepath, filename, is_update=False):
-        """Função executada em thread separada para fazer o upload"""
-        try:
-            # Mostra frame de progresso
-            # self.after(0, lambda: self._show_progress(filename))
-            def update_progress(progress):
-                pass  # Removido _update_progress
-            # Atualiza o status no log
-            status_text = "Atualizando..." if is_update else "Enviando..."
-            self.file_log.update_file_status(filename, status_text)
-            # Faz o upload com callback de progresso
-            if self.ftp_uploader:
-                self.ftp_uploader.upload_file(filepath, progress_callback=update_progress)
-            # Atualiza o status no log
-            status_text = "Atualizado" if is_update else "Enviado"
-            self.file_log.update_file_status(filename, status_text, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            # Atualiza a interface
-            self.after(0, lambda: self._upload_complete(filename, is_update))
-        except Exception as e:
-            error_msg = f"Erro no upload do arquivo {filename}: {str(e)}"
-            self.logger.error(error_msg)
-            # self.after(0, lambda: self._upload_error(filename, str(e)))
-        finally:
-            self.upload_threads.pop(filename, None)
-
-    def _upload_complete(self, filename, is_update=False):
-        """Chamado quando o upload é concluído com sucesso"""
-        self.progress_frame.pack_forget()
-        self.update_file_list()
-        action = "atualização" if is_update else "upload"
-        message = f"{action.capitalize()} do arquivo {filename} concluído com sucesso"
-        self.update_status(message)
-        messagebox.showinfo("Sucesso", message)
+        """Adiciona um arquivo à fila de upload, consumida pelo pool de conexões"""
+        return self.service.enqueue_file(filepath)
 
     # Métodos de licença removidos - sistema liberado
 
@@ -882,6 +933,11 @@ class FTPManagerApp(ctk.CTk):
             exe_name = os.path.splitext(os.path.basename(exe_path))[0]
             shortcut = os.path.join(startup, f"{exe_name}.lnk")
             if self.startup_checkbox_var.get():
+                try:
+                    import winshell
+                except ImportError:
+                    self.logger.warning("winshell não está instalado (somente Windows). Atalho de inicialização não criado.")
+                    return
                 with winshell.shortcut(shortcut) as link:
                     link.path = exe_path
                     link.arguments = "--tray"
@@ -1,31 +1,64 @@
 import os
 import ftplib
 import logging
+from contextlib import nullcontext
 from datetime import datetime
 import shutil
-# Ajuste: Dependências opcionais
-try:
-    from watchdog.observers import Observer
-    from watchdog.events import FileSystemEventHandler
-except ImportError:
-    Observer = None
-    FileSystemEventHandler = type("FileSystemEventHandler", (), {})
-# tqdm é opcional, usado apenas se necessário
-try:
-    from tqdm import tqdm
-except ImportError:
-    tqdm = None
 import time
 import socket
-from file_handler import FileHandler
+try:
+    import ssl
+except ImportError:
+    ssl = None
+from file_bundler import PART_SUFFIX, TarStream, bundle_name
+from file_hash import SERVER_HASH_ALGORITHMS, compute_fingerprint, new_digest, new_fingerprint
+from transfer_compression import DeflateStream, is_compressible, server_supports_mode_z, set_transfer_mode
+from transfer_tuning import TransferTuner
+from remote_dirs import RemoteDirCache, remote_location, session_path
 
 class FTPImageUploader:
-    def __init__(self, host, port, username, password):
+    def __init__(self, host, port, username, password, pool=None, file_log=None, fingerprint=False,
+                 integrity=False, tuning=None, rate_limiter=None, remote_dir=None, dir_cache=None,
+                 remote_cache=None, compression=True, metrics=None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.ftp = None
+        # Pool opcional de sessões autenticadas (connection_pool.FTPConnectionPool)
+        self.pool = pool
+        # FileLog opcional onde ficam os offsets de envios parciais, para retomar após reiniciar
+        self.file_log = file_log
+        # Arquivos menores que isso são simplesmente reenviados do zero
+        self.resume_min_size = 1024 * 1024
+        # Calcula a impressão digital do conteúdo enquanto envia (ver file_hash)
+        self.fingerprint = fingerprint
+        self.last_fingerprint = None
+        # Compara o hash calculado durante o envio com o HASH/XMD5/XCRC do servidor
+        self.integrity = integrity
+        self._features = None
+        # Bloco e SO_SNDBUF adaptativos, lembrados por host (transfer_tuning.TransferTuningStore)
+        self.tuner = TransferTuner(host, tuning) if tuning else None
+        # Envio com sendfile quando nenhum hash precisa ver os blocos
+        self.zero_copy = True
+        self.zero_copy_chunk = 4 * 1024 * 1024
+        # Limite de banda compartilhado (rate_limiter.RateLimiter) e o balde desta conexão
+        self.rate_limiter = rate_limiter
+        self.rate_bucket = rate_limiter.connection_bucket() if rate_limiter else None
+        # Diretório remoto base; os subdiretórios da pasta monitorada são espelhados abaixo dele.
+        # None: diretório inicial da sessão
+        self.remote_dir = remote_dir
+        # Diretórios remotos já existentes (remote_dirs.RemoteDirCache), compartilhado entre conexões
+        self.dir_cache = dir_cache if dir_cache is not None else RemoteDirCache()
+        # Listagens remotas em cache (remote_cache.RemoteListingCache), atualizadas a cada envio
+        self.remote_cache = remote_cache
+        # MODE Z (deflate) quando o servidor anuncia no FEAT, exceto para formatos já comprimidos
+        self.compression = compression
+        self.compression_level = 6
+        # DeflateStream do último envio comprimido (bytes, taxa e CPU), ou None
+        self.last_compression = None
+        # Duração das fases e contadores compartilhados (transfer_metrics.TransferMetrics)
+        self.metrics = metrics
         self.logger = logging.getLogger(__name__)
         self.is_connected = False
 
@@ -35,10 +68,18 @@ class FTPImageUploader:
             # Se já estiver conectado, desconecta primeiro
             self.disconnect()
             
+            if self.pool:
+                # Sessão já autenticada e validada pelo pool
+                self.ftp = self.pool.acquire(timeout=30)
+                self.is_connected = True
+                return True
+            
             # Cria nova conexão
             self.ftp = ftplib.FTP()
-            self.ftp.connect(self.host, int(self.port), timeout=30)
-            self.ftp.login(self.username, self.password)
+            with self._phase("connect"):
+                self.ftp.connect(self.host, int(self.port), timeout=30)
+            with self._phase("login"):
+                self.ftp.login(self.username, self.password)
             self.ftp.encoding = 'utf-8'
             
             # Testa a conexão
@@ -56,7 +97,10 @@ class FTPImageUploader:
     def disconnect(self):
         """Desconecta do servidor FTP"""
         try:
-            if self.ftp:
+            if self.ftp and self.pool:
+                # Devolve a sessão ao pool em vez de encerrá-la
+                self.pool.release(self.ftp)
+            elif self.ftp:
                 try:
                     self.ftp.quit()
                 except:
@@ -69,13 +113,26 @@ class FTPImageUploader:
 
     def reconnect(self):
         """Tenta reconectar ao servidor FTP"""
+        if self.metrics:
+            self.metrics.inc("reconnects")
         try:
+            if self.pool:
+                # A sessão atual falhou: descarta e pega outra saudável do pool
+                self.pool.discard(self.ftp)
+                self.ftp = None
+                self.ftp = self.pool.acquire(timeout=30)
+                self.is_connected = True
+                self.logger.info("Reconectado ao servidor FTP com sucesso")
+                return True
+            
             self.disconnect()  # Garante que a conexão anterior está fechada
             
             # Tenta reconectar
             self.ftp = ftplib.FTP()
-            self.ftp.connect(self.host, int(self.port), timeout=30)
-            self.ftp.login(self.username, self.password)
+            with self._phase("connect"):
+                self.ftp.connect(self.host, int(self.port), timeout=30)
+            with self._phase("login"):
+                self.ftp.login(self.username, self.password)
             self.is_connected = True
             self.logger.info("Reconectado ao servidor FTP com sucesso")
             return True
@@ -85,10 +142,24 @@ class FTPImageUploader:
             self.is_connected = False
             return False
 
-    def upload_file(self, filepath, progress_callback=None, force=False):
-        """Faz upload de um arquivo para o servidor FTP"""
+    def upload_file(self, filepath, progress_callback=None, force=False, filename=None):
+        """Faz upload de um arquivo para o servidor FTP, retomando do ponto de falha.
+
+        filename é a chave do arquivo no FileLog, o caminho relativo à pasta
+        monitorada com '/'; os diretórios dele são criados sob remote_dir.
+        """
         max_retries = 3
         retry_count = 0
+        filename = filename or os.path.basename(filepath)
+        remote_dir, remote_name = remote_location(self.remote_dir, filename)
+        filesize = 0
+        mtime = None
+        resume_offset = None
+        # Só depois que um STOR deste envio começou o tamanho remoto é um prefixo deste arquivo;
+        # antes disso ele pode ser de uma versão antiga, e continuar dele corromperia o arquivo
+        transfer_started = False
+        self.last_fingerprint = None
+        self.last_compression = None
         
         while retry_count < max_retries:
             try:
@@ -97,57 +168,124 @@ class FTPImageUploader:
                         self.logger.error("Não foi possível reconectar ao servidor FTP")
                         return False
 
-                filename = os.path.basename(filepath)
                 filesize = os.path.getsize(filepath)
+                mtime = os.path.getmtime(filepath)
+                resumable = filesize >= self.resume_min_size
+                self._change_remote_dir(remote_dir)
 
-                # Abre o arquivo em modo binário
-                with open(filepath, 'rb') as file:
-                    # Cria um wrapper para monitorar o progresso
-                    if progress_callback:
-                        bytes_sent = 0
-                        last_callback = 0
-                        def callback_wrapper(data):
-                            nonlocal bytes_sent, last_callback
-                            bytes_sent += len(data)
-                            # Atualiza a cada 256 KB enviados ou ao finalizar
-                            if bytes_sent - last_callback >= 262144 or bytes_sent == filesize:
-                                progress_callback(bytes_sent, filesize)
-                                last_callback = bytes_sent
-                            return data
-                        
-                        # Inicia o upload com callback
-                        if self.ftp is not None:
-                            self.ftp.storbinary(f'STOR {filename}', file, blocksize=65536, callback=callback_wrapper)
-                        else:
-                            self.logger.error("FTP não está conectado.")
-                            return False
-                    else:
-                        # Upload sem callback
-                        if self.ftp is not None:
-                            self.ftp.storbinary(f'STOR {filename}', file, blocksize=65536)
+                # Na primeira tentativa, retoma um envio parcial registrado antes de reiniciar o app
+                if resume_offset is None:
+                    resume_offset = 0
+                    if resumable and self.file_log:
+                        partial = self.file_log.get_partial_upload(filename)
+                        if partial and partial.get("size") == filesize and partial.get("mtime") == mtime:
+                            resume_offset = self._remote_resume_offset(remote_name, filesize)
+
+                def on_started(offset=resume_offset):
+                    # Resposta 1xx ao STOR: o servidor passa a ter um prefixo deste arquivo
+                    nonlocal transfer_started
+                    transfer_started = True
+                    if resumable and self.file_log:
+                        self.file_log.update_partial_upload(filename, offset, filesize, mtime)
+
+                fingerprint = None
+                digest = None
+                hash_method = self._server_hash_method() if self.integrity else None
+                if resume_offset >= filesize > 0:
+                    self.logger.info(f"Arquivo {filename} já está completo no servidor")
+                elif self.ftp is None:
+                    self.logger.error("FTP não está conectado.")
+                    return False
+                else:
+                    # Abre o arquivo em modo binário
+                    with open(filepath, 'rb') as file:
+                        callback_wrapper = None
+                        # Impressão digital calculada sobre os blocos enviados, sem reler o arquivo,
+                        # a menos que a verificação de duplicatas já a tenha calculado
+                        if self.fingerprint and not resume_offset:
+                            cached = self.file_log.get_cached_hash(filename, filesize, mtime) if self.file_log else None
+                            if cached:
+                                self.last_fingerprint = cached
+                            else:
+                                fingerprint = new_fingerprint()
+                        if hash_method:
+                            digest = new_digest(hash_method[1])
+                            if resume_offset:
+                                # O digest precisa cobrir o trecho já enviado antes da falha
+                                for chunk in iter(lambda: file.read(min(65536, resume_offset - file.tell())), b''):
+                                    digest.update(chunk)
+                        hashers = [h for h in (fingerprint, digest) if h]
+                        # Só o hash precisa ver os blocos; sem ele o envio pode usar sendfile
+                        if hashers:
+                            def callback_wrapper(data):
+                                for hasher in hashers:
+                                    hasher.update(data)
+
+                        on_sent = None
+                        if progress_callback:
+                            bytes_sent = resume_offset
+                            last_callback = resume_offset
+                            def on_sent(count):
+                                nonlocal bytes_sent, last_callback
+                                bytes_sent += count
+                                # Atualiza a cada 256 KB enviados ou ao finalizar
+                                if bytes_sent - last_callback >= 262144 or bytes_sent == filesize:
+                                    progress_callback(bytes_sent, filesize)
+                                    last_callback = bytes_sent
+
+                        if resume_offset:
+                            self.logger.info(f"Retomando upload do arquivo {filename} a partir do byte {resume_offset}")
+                            self._resume_store(remote_name, file, resume_offset, callback_wrapper, on_sent, on_started)
                         else:
-                            self.logger.error("FTP não está conectado.")
-                            return False
+                            self._store(f'STOR {remote_name}', file, callback_wrapper, on_sent=on_sent,
+                                        compress=self._should_compress(remote_name), on_started=on_started)
+
+                if resumable and self.file_log:
+                    self.file_log.clear_partial_upload(filename)
+                if self.remote_cache:
+                    self.remote_cache.record(remote_dir, remote_name, filesize)
+
+                if self.fingerprint and not self.last_fingerprint:
+                    # Envio retomado não passou por todos os blocos: calcula a partir do arquivo
+                    self.last_fingerprint = fingerprint.hexdigest() if fingerprint else compute_fingerprint(filepath)
+
+                if self.integrity:
+                    with self._phase("verify"):
+                        return self.verify_integrity(remote_name, filesize, digest, hash_method)
 
                 # Se for upload forçado, não verifica o status anterior
                 if force:
                     return True
                     
                 # Verifica se o arquivo existe no servidor e tem o mesmo tamanho
-                if self.verify_upload(filename, filesize):
+                with self._phase("verify"):
+                    verified = self.verify_upload(remote_name, filesize)
+                if verified:
                     self.logger.info(f"Upload do arquivo {filename} verificado com sucesso")
                     return True
                 else:
                     self.logger.error(f"Falha na verificação do upload do arquivo {filename}")
                     return False
 
-            except (ConnectionError, TimeoutError, socket.error) as e:
+            except (ConnectionError, TimeoutError, socket.error, ftplib.error_temp) as e:
                 retry_count += 1
+                if self.metrics:
+                    self.metrics.inc("retries")
                 self.logger.warning(f"Tentativa {retry_count} de {max_retries} falhou: {str(e)}")
                 
                 if retry_count < max_retries:
                     time.sleep(2)  # Espera 2 segundos antes de tentar novamente
-                    self.reconnect()  # Tenta reconectar antes da próxima tentativa
+                    # Tenta reconectar e descobre quanto do arquivo já chegou ao servidor
+                    if not self.reconnect():
+                        resume_offset = 0
+                    elif transfer_started and filesize >= self.resume_min_size:
+                        resume_offset = self._remote_resume_offset(remote_name, filesize, remote_dir)
+                        if self.file_log:
+                            self.file_log.update_partial_upload(filename, resume_offset, filesize, mtime)
+                    elif transfer_started:
+                        resume_offset = 0
+                    # Sem STOR iniciado, o servidor não mudou: mantém o offset (0, ou o do
+                    # registro parcial, gravado quando um STOR desta versão começou)
                 else:
                     self.logger.error(f"Erro de conexão após {max_retries} tentativas: {str(e)}")
                     return False
@@ -158,6 +296,302 @@ class FTPImageUploader:
 
         return False
 
+    def upload_bundle(self, members):
+        """Envia vários arquivos pequenos como um único tar, gerado durante o envio.
+
+        members é uma lista de (filepath, filename). O lote vai para o
+        diretório remoto base com o sufixo .part e é renomeado ao terminar;
+        o servidor (ou um processo nele) extrai o tar nesse diretório.
+        Retorna o TarStream (membros incluídos e ignorados) ou None se falhou.
+        """
+        if not self.ftp or not self.is_connected:
+            if not self.reconnect():
+                self.logger.error("Não foi possível reconectar ao servidor FTP")
+                return None
+
+        remote_dir, _ = remote_location(self.remote_dir, "")
+        name = bundle_name()
+        stream = TarStream(members, fingerprint=self.fingerprint)
+        stream.name = name
+        try:
+            self._change_remote_dir(remote_dir)
+            self._store(f'STOR {name}{PART_SUFFIX}', stream)
+            self.ftp.rename(f"{name}{PART_SUFFIX}", name)
+            # Um único SIZE confere o lote inteiro
+            with self._phase("verify"):
+                verified = self.verify_upload(name, stream.size)
+            if not verified:
+                self.logger.error(f"Falha na verificação do lote {name}")
+                return None
+        except ftplib.error_perm as e:
+            self.logger.error(f"Servidor recusou o lote {name}: {str(e)}")
+            return None
+        except (OSError, ftplib.Error) as e:
+            # Conexão caiu ou um membro mudou no meio do tar: a transferência ficou
+            # pela metade, então a sessão é trocada por outra do pool (ou um novo login)
+            self.logger.error(f"Erro no envio do lote {name}: {str(e)}")
+            self.reconnect()
+            return None
+
+        self.logger.info(
+            f"Lote {name} enviado: {len(stream.included)} arquivos, {stream.size} bytes"
+        )
+        return stream
+
+    def _remote_resume_offset(self, filename, filesize, remote_dir=None):
+        """Consulta o tamanho remoto (SIZE) e retorna o offset a partir do qual retomar"""
+        try:
+            if remote_dir is not None:
+                # Sessão nova após reconectar: volta ao diretório do arquivo
+                self._change_remote_dir(remote_dir)
+            self.ftp.voidcmd("TYPE I")
+            remote_size = self.ftp.size(filename) or 0
+        except (ftplib.error_perm, ftplib.error_temp):
+            # Arquivo ainda não existe no servidor ou SIZE não suportado
+            return 0
+        except Exception as e:
+            self.logger.warning(f"Não foi possível consultar o tamanho remoto de {filename}: {str(e)}")
+            return 0
+        if remote_size > filesize:
+            # Arquivo remoto diferente do local: recomeça do zero
+            return 0
+        return remote_size
+
+    def _change_remote_dir(self, directory):
+        """Entra no diretório remoto do arquivo, criando-o se preciso.
+
+        O diretório atual fica guardado na própria sessão (que pode vir do
+        pool), então arquivos seguidos no mesmo diretório não repetem o CWD.
+        """
+        ftp = self.ftp
+        if getattr(ftp, "remote_cwd", "") == directory:
+            return
+        self.dir_cache.change_dir(ftp, session_path(ftp, directory))
+        ftp.remote_cwd = directory
+
+    def _resume_store(self, filename, file, offset, callback=None, on_sent=None, on_started=None):
+        """Continua um envio a partir de offset usando REST+STOR, ou APPE se REST for recusado"""
+        file.seek(offset)
+        try:
+            self._store(f'STOR {filename}', file, callback, rest=offset, on_sent=on_sent, on_started=on_started)
+        except ftplib.error_perm as e:
+            if not str(e).startswith(('500', '501', '502', '504')):
+                raise
+            self.logger.info(f"Servidor não aceitou REST, usando APPE para {filename}")
+            file.seek(offset)
+            self._store(f'APPE {filename}', file, callback, on_sent=on_sent, on_started=on_started)
+
+    def _phase(self, name):
+        """Mede um trecho como a fase name nas métricas, se houver"""
+        return self.metrics.phase(name) if self.metrics else nullcontext()
+
+    def _should_compress(self, remote_name):
+        """True se o arquivo deve ir em MODE Z: servidor anuncia e o formato não é já comprimido"""
+        if not self.compression or not is_compressible(remote_name):
+            return False
+        return server_supports_mode_z(self.get_features())
+
+    def _set_transfer_mode(self, compress):
+        """Coloca a sessão em MODE Z ou S; retorna se o envio vai comprimido"""
+        if compress:
+            try:
+                set_transfer_mode(self.ftp, "Z")
+                return True
+            except ftplib.error_perm as e:
+                # Anunciado no FEAT mas recusado: não tenta de novo nesta conexão
+                self.logger.warning(f"Servidor recusou MODE Z, enviando sem compressão: {str(e)}")
+                self.compression = False
+        set_transfer_mode(self.ftp, "S")
+        return False
+
+    def _store(self, cmd, file, callback=None, rest=None, on_sent=None, compress=False, on_started=None):
+        """Equivalente ao storbinary a partir da posição atual do arquivo.
+
+        callback recebe cada bloco lido (para hash) e on_sent a quantidade de
+        bytes enviada; on_started é chamado quando o servidor aceita o
+        comando (resposta 1xx), antes do primeiro byte. Sem callback e sem TLS, os dados vão do arquivo para o
+        socket com sendfile, sem passar por buffers do Python. Com compress
+        os blocos vão comprimidos em MODE Z; callback e on_sent continuam
+        vendo os bytes originais.
+        """
+        tuner = self.tuner
+        if tuner:
+            tuner.measure_rtt(self.ftp)
+        self.ftp.voidcmd('TYPE I')
+        compressor = DeflateStream(self.compression_level) if self._set_transfer_mode(compress) else None
+        started = time.perf_counter()
+        conn = self.ftp.transfercmd(cmd, rest)
+        opened = time.perf_counter()
+        if on_started:
+            on_started()
+        with conn:
+            if tuner:
+                tuner.prepare(conn)
+            if compressor is None and callback is None and self._can_sendfile(conn, file):
+                sent = self._send_zero_copy(conn, file, on_sent)
+            else:
+                sent = self._send_buffered(conn, file, callback, on_sent, compressor)
+            if ssl and isinstance(conn, ssl.SSLSocket):
+                conn.unwrap()
+        if tuner:
+            tuner.finish()
+        resp = self.ftp.voidresp()
+        if self.metrics:
+            self.metrics.observe("data_open", opened - started)
+            self.metrics.observe("transfer", time.perf_counter() - opened)
+            self.metrics.inc("bytes_sent", sent)
+        if compressor:
+            self.last_compression = compressor
+            self.logger.info(
+                f"{cmd.split(' ', 1)[-1]} enviado com MODE Z: {compressor.raw_bytes / 1024:.0f} KB -> "
+                f"{compressor.sent_bytes / 1024:.0f} KB ({compressor.ratio:.1f}x, "
+                f"{compressor.cpu_time * 1000:.0f} ms de CPU)"
+            )
+        return resp
+
+    def _can_sendfile(self, conn, file):
+        # os.sendfile não existe no Windows, não serve para sockets TLS nem para
+        # fontes que não são arquivos de verdade (lotes gerados durante o envio)
+        return (self.zero_copy and hasattr(os, "sendfile") and hasattr(file, "fileno")
+                and not (ssl and isinstance(conn, ssl.SSLSocket)))
+
+    def _send_buffered(self, conn, file, callback=None, on_sent=None, compressor=None):
+        tuner = self.tuner
+        limiter = self.rate_limiter
+        base_blocksize = tuner.blocksize if tuner else 65536
+        sent = 0
+        while True:
+            blocksize = limiter.chunk_size(self.rate_bucket, base_blocksize) if limiter else base_blocksize
+            buf = file.read(blocksize)
+            if not buf:
+                break
+            # O limite de banda vale para o que passa pela rede: com MODE Z, os bytes comprimidos
+            data = compressor.compress(buf) if compressor else buf
+            if data:
+                if limiter:
+                    limiter.throttle(self.rate_bucket, len(data))
+                conn.sendall(data)
+                sent += len(data)
+            if callback:
+                callback(buf)
+            if on_sent:
+                on_sent(len(buf))
+            if tuner:
+                base_blocksize = tuner.sent(len(buf))
+        if compressor:
+            data = compressor.flush()
+            if limiter:
+                limiter.throttle(self.rate_bucket, len(data))
+            conn.sendall(data)
+            sent += len(data)
+        return sent
+
+    def _send_zero_copy(self, conn, file, on_sent=None):
+        # O progresso é amostrado entre trechos de zero_copy_chunk bytes
+        offset = start = file.tell()
+        size = os.fstat(file.fileno()).st_size
+        limiter = self.rate_limiter
+        while offset < size:
+            chunk = min(self.zero_copy_chunk, size - offset)
+            if limiter:
+                chunk = limiter.chunk_size(self.rate_bucket, chunk)
+                limiter.throttle(self.rate_bucket, chunk)
+            sent = conn.sendfile(file, offset, chunk)
+            if not sent:
+                break
+            offset += sent
+            if on_sent:
+                on_sent(sent)
+            if self.tuner:
+                self.tuner.sent(sent, tune_blocksize=False)
+        return offset - start
+
+    def get_features(self):
+        """Retorna as extensões anunciadas pelo servidor no FEAT, consultado uma única vez"""
+        if self._features is None:
+            features = {}
+            try:
+                resp = self.ftp.sendcmd("FEAT")
+                for line in resp.splitlines()[1:-1]:
+                    parts = line.strip().split(" ", 1)
+                    if parts[0]:
+                        features[parts[0].upper()] = parts[1] if len(parts) > 1 else ""
+            except ftplib.error_perm:
+                # Servidor sem suporte a FEAT
+                pass
+            self._features = features
+        return self._features
+
+    def _server_hash_method(self):
+        """Escolhe o comando de hash remoto: (comando, algoritmo, precisa_opts) ou None"""
+        features = self.get_features()
+        if "HASH" in features:
+            algorithms = [name.strip().upper() for name in features["HASH"].split(";") if name.strip()]
+            # O algoritmo marcado com '*' é o ativo e dispensa o OPTS HASH
+            for name in algorithms:
+                if name.endswith("*") and name[:-1] in SERVER_HASH_ALGORITHMS:
+                    return ("HASH", name[:-1], False)
+            for name in SERVER_HASH_ALGORITHMS:
+                if name in algorithms:
+                    return ("HASH", name, True)
+        for command, algorithm in (("XSHA256", "SHA-256"), ("XSHA1", "SHA-1"), ("XMD5", "MD5"), ("XCRC", "CRC32")):
+            if command in features:
+                return (command, algorithm, False)
+        return None
+
+    def _request_server_hash(self, filename, hash_method):
+        """Pede ao servidor o hash do arquivo e retorna o valor hexadecimal"""
+        command, algorithm, needs_opts = hash_method
+        if needs_opts and getattr(self.ftp, "hash_algorithm", None) != algorithm:
+            # Vale para a sessão inteira; guardado na própria conexão (que pode vir do pool)
+            self.ftp.voidcmd(f"OPTS HASH {algorithm}")
+            self.ftp.hash_algorithm = algorithm
+        resp = self.ftp.sendcmd(f"{command} {filename}")
+        # O valor é lido pela posição, não pelo formato: um CRC32 pode vir sem os zeros à esquerda
+        parts = resp.split()
+        if command == "HASH":
+            # "213 SHA-256 0-49 <hex> arquivo"
+            value = parts[3] if len(parts) > 3 else None
+        else:
+            # "250 <hex>" (XSHA256, XSHA1, XMD5, XCRC)
+            value = parts[1] if len(parts) > 1 else None
+        if value and value[:2].lower() == "0x":
+            value = value[2:]
+        if not value or not all(c in "0123456789abcdefABCDEF" for c in value):
+            return None
+        if algorithm == "CRC32":
+            value = value.rjust(8, "0")
+        return value.lower()
+
+    def verify_integrity(self, filename, local_size, digest, hash_method):
+        """Compara o digest local com o hash do servidor, ou só o tamanho se não houver suporte"""
+        if digest is not None and hash_method:
+            try:
+                server_hash = self._request_server_hash(filename, hash_method)
+            except ftplib.error_perm as e:
+                self.logger.warning(f"Servidor recusou {hash_method[0]} para {filename}: {str(e)}")
+                server_hash = None
+            if server_hash:
+                local_hash = digest.hexdigest()
+                if hash_method[1] == "CRC32":
+                    matches = int(server_hash, 16) == int(local_hash, 16)
+                else:
+                    matches = server_hash == local_hash
+                if matches:
+                    self.logger.info(f"Integridade do arquivo {filename} confirmada ({hash_method[1]})")
+                    return True
+                self.logger.error(
+                    f"Hash divergente para {filename}: local {local_hash}, servidor {server_hash} ({hash_method[1]})"
+                )
+                return False
+
+        # Sem hash remoto disponível: compara o tamanho
+        if self.verify_upload(filename, local_size):
+            self.logger.info(f"Upload do arquivo {filename} verificado com sucesso")
+            return True
+        self.logger.error(f"Falha na verificação do upload do arquivo {filename}")
+        return False
+
     def verify_upload(self, filename, local_size):
         """Verifica se o arquivo foi enviado corretamente"""
         try:
@@ -194,9 +628,13 @@ def start_monitoring(host, port=21, user=None, password=None, watch_folder=None,
         print("Não foi possível conectar ao servidor FTP")
         return False, False
     
-    if Observer is None:
+    # O watchdog só é carregado por quem monitora a pasta
+    try:
+        from watchdog.observers import Observer
+    except ImportError:
         print("Dependência watchdog não instalada. Monitoramento automático desabilitado.")
         return False, False
+    from file_handler import FileHandler
     event_handler = FileHandler(uploader, app=None)
     observer = Observer()
     observer.schedule(event_handler, watch_folder, recursive=False)
@@ -205,44 +643,7 @@ def start_monitoring(host, port=21, user=None, password=None, watch_folder=None,
 
 # Exemplo de uso
 if __name__ == "__main__":
-    try:
-        # Substitua com suas credenciais do servidor FTP
-        FTP_HOST = "seu_servidor_ftp.com"
-        FTP_USER = "seu_usuario"
-        FTP_PASS = "sua_senha"
-        
-        # Pastas para monitorar e armazenar arquivos completados
-        WATCH_FOLDER = os.path.join(os.path.dirname(__file__), "para_upload")
-        COMPLETED_FOLDER = os.path.join(os.path.dirname(__file__), "realizados")
-        
-        print(f"Iniciando monitoramento da pasta: {WATCH_FOLDER}")
-        print(f"Arquivos completados serão movidos para: {COMPLETED_FOLDER}")
-        
-        uploader, observer = start_monitoring(
-            FTP_HOST, 
-            21, 
-            FTP_USER, 
-            FTP_PASS, 
-            WATCH_FOLDER, 
-            COMPLETED_FOLDER
-        )
-        
-        if not uploader or not observer:
-            print("Não foi possível conectar ao servidor FTP ou iniciar o monitoramento.")
-            exit()
-        
-        if uploader:
-            # Mantém o programa rodando
-            try:
-                while True:
-                    import time
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                observer.stop()
-                uploader.disconnect()
-                observer.join()
-                print("\nMonitoramento finalizado.")
-        else:
-            print("Erro ao iniciar o monitoramento. Verifique as credenciais FTP.")
-    except Exception as e:
-        print(f"Erro: {str(e)}")
+    # Execução direta: o mesmo modo sem interface do ftp_cli.py
+    import sys
+    from ftp_cli import main
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime
+
+
+class TokenBucket:
+    """Balde de fichas com taxa em bytes/s; taxa 0 significa sem limite.
+
+    reserve() debita as fichas na hora, mesmo que o saldo fique negativo, e
+    retorna quanto tempo o chamador deve esperar até que a dívida seja paga.
+    Assim várias threads (ou tarefas asyncio) podem dividir o mesmo balde
+    sem manter o lock enquanto dormem.
+    """
+
+    def __init__(self, rate=0, burst=None):
+        self._lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        """Muda a taxa sem interromper quem está usando o balde"""
+        with self._lock:
+            self._refill()
+            self.rate = max(0, int(rate or 0))
+            # Por padrão permite rajadas de até 1/4 de segundo
+            self.burst = int(burst) if burst else max(self.rate // 4, 16 * 1024)
+            self._tokens = min(self._tokens, self.burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, nbytes):
+        """Debita nbytes e retorna os segundos de espera necessários"""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill()
+            self._tokens -= nbytes
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Limite de banda global e por conexão, com horários configuráveis.
+
+    Cada conexão pede o seu balde com connection_bucket(); todo bloco enviado
+    paga nesse balde e no balde global, que é compartilhado por todas as
+    conexões, de modo que a soma nunca passe do limite total. Os limites
+    podem ser alterados a qualquer momento e valem já para o próximo bloco.
+
+    schedule é uma lista de faixas de horário, por exemplo:
+
+        [{"start": "08:00", "end": "18:00", "days": [0, 1, 2, 3, 4],
+          "limit_kbps": 2048, "per_connection_kbps": 512}]
+
+    days é opcional (0 = segunda-feira) e uma faixa pode passar da
+    meia-noite ("22:00" a "06:00"). Dentro de uma faixa valem os limites
+    dela; fora de todas, os limites padrão. Limites em KB/s, 0 = sem limite.
+    """
+
+    def __init__(self, limit_kbps=0, per_connection_kbps=0, schedule=None, check_interval=30):
+        self.logger = logging.getLogger(__name__)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._global = TokenBucket()
+        self._connections = weakref.WeakSet()
+        self._limit_kbps = limit_kbps
+        self._per_connection_kbps = per_connection_kbps
+        self._schedule = schedule or []
+        self._active = None
+        self._checked_at = 0.0
+        self.apply_schedule()
+
+    def set_default_limits(self, limit_kbps=None, per_connection_kbps=None):
+        """Altera os limites usados fora das faixas de horário"""
+        with self._lock:
+            if limit_kbps is not None:
+                self._limit_kbps = limit_kbps
+            if per_connection_kbps is not None:
+                self._per_connection_kbps = per_connection_kbps
+        self.apply_schedule()
+
+    def set_schedule(self, schedule):
+        with self._lock:
+            self._schedule = schedule or []
+        self.apply_schedule()
+
+    def connection_bucket(self):
+        """Cria o balde de uma nova conexão, com o limite por conexão atual"""
+        bucket = TokenBucket(self.current_limits()[1] * 1024)
+        with self._lock:
+            self._connections.add(bucket)
+        return bucket
+
+    def current_limits(self):
+        """(limite total, limite por conexão) em vigor, em KB/s"""
+        with self._lock:
+            if self._active is not None:
+                return (self._active.get("limit_kbps", 0), self._active.get("per_connection_kbps", 0))
+            return (self._limit_kbps, self._per_connection_kbps)
+
+    def _active_entry(self, now):
+        minutes = now.hour * 60 + now.minute
+        for entry in self._schedule:
+            try:
+                start = self._parse_time(entry["start"])
+                end = self._parse_time(entry["end"])
+            except (KeyError, ValueError):
+                continue
+            days = entry.get("days")
+            if start <= end:
+                inside = start <= minutes < end
+                weekday = now.weekday()
+            else:
+                # Faixa que passa da meia-noite: depois da meia-noite conta como o dia anterior
+                inside = minutes >= start or minutes < end
+                weekday = now.weekday() if minutes >= start else (now.weekday() - 1) % 7
+            if inside and (days is None or weekday in days):
+                return entry
+        return None
+
+    @staticmethod
+    def _parse_time(value):
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+
+    def apply_schedule(self, now=None):
+        """Aplica aos baldes os limites da faixa de horário atual"""
+        with self._lock:
+            entry = self._active_entry(now or datetime.now())
+            changed = entry is not self._active
+            self._active = entry
+            self._checked_at = time.monotonic()
+            connections = list(self._connections)
+        limit_kbps, per_connection_kbps = self.current_limits()
+        self._global.set_rate(limit_kbps * 1024)
+        for bucket in connections:
+            bucket.set_rate(per_connection_kbps * 1024)
+        if changed:
+            self.logger.info(
+                f"Limite de banda: total {limit_kbps or 'ilimitado'} KB/s, "
+                f"por conexão {per_connection_kbps or 'ilimitado'} KB/s"
+            )
+
+    def delay(self, bucket, nbytes):
+        """Debita nbytes no balde da conexão e no global; retorna a espera em segundos"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.apply_schedule()
+        wait = self._global.reserve(nbytes)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve(nbytes))
+        return wait
+
+    def throttle(self, bucket, nbytes):
+        """Versão bloqueante de delay(), usada pelas threads de upload"""
+        wait = self.delay(bucket, nbytes)
+        if wait > 0:
+            time.sleep(wait)
+
+    def chunk_size(self, bucket, default):
+        """Tamanho de trecho que mantém o envio suave sob o limite atual"""
+        rates = [rate for rate in (self._global.rate, bucket.rate if bucket else 0) if rate]
+        if not rates:
+            return default
+        # Cerca de 1/10 de segundo de dados por trecho
+        return max(16 * 1024, min(default, min(rates) // 10))
+
+    def is_limited(self):
+        return any(self.current_limits())
@@ -0,0 +1,142 @@
+import calendar
+import ftplib
+import logging
+import threading
+import time
+
+from remote_dirs import session_path
+from transfer_compression import set_transfer_mode
+
+
+def parse_mlsd_time(value):
+    """Converte o fato modify do MLSD (YYYYMMDDHHMMSS[.sss], UTC) em timestamp"""
+    try:
+        return calendar.timegm(time.strptime(value[:14], "%Y%m%d%H%M%S"))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_list_line(line):
+    """(nome, tamanho) de uma linha de LIST no formato Unix ou DOS; None para diretórios e lixo"""
+    parts = line.split(None, 8)
+    if len(parts) == 9 and parts[0][:1] in "-l":
+        # -rw-r--r-- 1 dono grupo 1234 Jan 01 12:00 nome
+        try:
+            return parts[8], int(parts[4])
+        except ValueError:
+            return None
+    parts = line.split(None, 3)
+    if len(parts) == 4 and parts[2].isdigit():
+        # 01-01-24  10:00AM   1234 nome
+        return parts[3], int(parts[2])
+    return None
+
+
+class RemoteListingCache:
+    """Conteúdo dos diretórios remotos: nome -> (tamanho, modify ou None).
+
+    Cada diretório é lido com um único MLSD (ou LIST, se o servidor não
+    tiver MLSD) e reaproveitado por max_age segundos; só os diretórios
+    consultados são relidos, quando vencem. Depois de cada STOR bem
+    sucedido o uploader registra o arquivo com record(), mantendo a
+    listagem em dia sem voltar ao servidor. Os diretórios são identificados
+    como em remote_dirs.remote_location (relativos ao diretório inicial da
+    sessão, ou absolutos). Compartilhado entre as conexões.
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        # diretório -> (instante da leitura, {nome: (tamanho, modify)})
+        self._listings = {}
+        # None até descobrir (pelo FEAT, ou pela resposta ao MLSD) se o servidor aceita MLSD
+        self._use_mlsd = None
+        self._feat_checked = False
+
+    def get(self, directory):
+        """Listagem ainda válida do diretório, sem acessar o servidor, ou None"""
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached and time.monotonic() - cached[0] < self.max_age:
+                return cached[1]
+        return None
+
+    def listing(self, ftp, directory, refresh=False):
+        """Listagem do diretório, lida do servidor se não estiver em cache (ou se refresh)"""
+        if not refresh:
+            cached = self.get(directory)
+            if cached is not None:
+                return cached
+        entries = self._fetch(ftp, session_path(ftp, directory))
+        with self._lock:
+            self._listings[directory] = (time.monotonic(), entries)
+        return entries
+
+    def record(self, directory, name, size):
+        """Registra um arquivo recém-enviado na listagem em cache do diretório"""
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached:
+                cached[1][name] = (size, time.time())
+
+    def forget(self, directory, name):
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached:
+                cached[1].pop(name, None)
+
+    def clear(self):
+        """Esquece as listagens e o suporte a MLSD (a próxima conexão pode ser outro servidor)"""
+        with self._lock:
+            self._listings.clear()
+            self._use_mlsd = None
+            self._feat_checked = False
+
+    def _supports_mlsd(self, ftp):
+        """MLSD anunciado no FEAT (como MLST)? Consultado uma vez; None se o FEAT não responder"""
+        if self._use_mlsd is None and not self._feat_checked:
+            self._feat_checked = True
+            try:
+                resp = ftp.sendcmd("FEAT")
+            except ftplib.error_perm:
+                return None
+            self._use_mlsd = any(line.strip().upper().startswith("MLST") for line in resp.splitlines()[1:-1])
+            if not self._use_mlsd:
+                self.logger.info("Servidor sem suporte a MLSD; usando LIST")
+        return self._use_mlsd
+
+    def _fetch(self, ftp, path):
+        # A sessão pode ter ficado em MODE Z depois de um envio comprimido
+        set_transfer_mode(ftp, "S")
+        if self._supports_mlsd(ftp) is not False:
+            try:
+                entries = {}
+                for name, facts in ftp.mlsd(path, facts=["type", "size", "modify"]):
+                    if facts.get("type", "file").lower() != "file":
+                        continue
+                    try:
+                        size = int(facts["size"])
+                    except (KeyError, ValueError):
+                        size = None
+                    entries[name] = (size, parse_mlsd_time(facts.get("modify")))
+                self._use_mlsd = True
+                return entries
+            except ftplib.error_perm as e:
+                if not str(e).startswith(("500", "502")):
+                    # 501/550: erro do caminho (diretório ainda não existe), não do comando
+                    return {}
+                self.logger.info("Servidor sem suporte a MLSD; usando LIST")
+                self._use_mlsd = False
+
+        lines = []
+        try:
+            ftp.retrlines(f"LIST {path}", lines.append)
+        except ftplib.error_perm:
+            return {}
+        entries = {}
+        for line in lines:
+            parsed = parse_list_line(line)
+            if parsed:
+                entries[parsed[0]] = (parsed[1], None)
+        return entries
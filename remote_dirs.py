@@ -0,0 +1,96 @@
+import ftplib
+import logging
+import posixpath
+import threading
+
+
+def remote_location(remote_dir, filename):
+    """Diretório e nome remotos de um arquivo.
+
+    filename é o caminho relativo à pasta monitorada, com '/' (a chave do
+    FileLog). Sem remote_dir o diretório é relativo ao diretório inicial
+    da sessão; '' significa o próprio diretório inicial.
+    """
+    reldir, name = posixpath.split(filename)
+    directory = posixpath.join(remote_dir, reldir) if remote_dir else reldir
+    if directory:
+        directory = posixpath.normpath(directory)
+        if directory == ".":
+            directory = ""
+    return directory, name
+
+
+def session_path(ftp, directory):
+    """Caminho absoluto de um diretório de remote_location em uma sessão ftplib.
+
+    O diretório inicial é lido com PWD uma vez e guardado na própria sessão
+    (que pode vir do pool); isso acontece antes de qualquer CWD relativo,
+    então o PWD sempre devolve o diretório inicial.
+    """
+    if directory.startswith("/"):
+        return directory
+    home_dir = getattr(ftp, "home_dir", None)
+    if home_dir is None:
+        home_dir = ftp.home_dir = ftp.pwd()
+    return posixpath.join(home_dir, directory) if directory else home_dir
+
+
+class RemoteDirCache:
+    """Diretórios remotos que já se sabe existirem, compartilhado pelas conexões.
+
+    Evita repetir MKD de diretórios que outra conexão já criou (ou que já
+    existiam). Os caminhos são absolutos. Um diretório removido no servidor
+    é descoberto quando o CWD falha e sai do cache.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._known
+
+    def add(self, path):
+        """Registra o diretório e todos os seus ancestrais"""
+        with self._lock:
+            while path not in self._known and path not in ("/", ""):
+                self._known.add(path)
+                path = posixpath.dirname(path)
+
+    def discard(self, path):
+        with self._lock:
+            self._known.discard(path)
+
+    def clear(self):
+        with self._lock:
+            self._known.clear()
+
+    def missing(self, path):
+        """Ancestrais de path (incluindo ele) fora do cache, do mais alto para o mais baixo"""
+        parts = []
+        with self._lock:
+            while path not in self._known and path not in ("/", ""):
+                parts.append(path)
+                path = posixpath.dirname(path)
+        return parts[::-1]
+
+    def change_dir(self, ftp, path):
+        """CWD para path (absoluto) na sessão ftplib, criando os diretórios que faltarem"""
+        try:
+            ftp.cwd(path)
+            self.add(path)
+            return
+        except ftplib.error_perm:
+            # Não existe (ou saiu do servidor desde que foi registrado)
+            self.discard(path)
+        for directory in self.missing(path):
+            try:
+                ftp.mkd(directory)
+                self.logger.info(f"Diretório remoto criado: {directory}")
+            except ftplib.error_perm:
+                # Já existe; se for falta de permissão, o CWD abaixo falha
+                pass
+        ftp.cwd(path)
+        self.add(path)
@@ -0,0 +1,62 @@
+import os
+import time
+import zlib
+
+# Formatos que já vêm comprimidos: passar por MODE Z só gastaria CPU
+COMPRESSED_EXTENSIONS = frozenset((
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst",
+    ".mp4", ".mov", ".mkv", ".avi", ".webm", ".mp3", ".m4a", ".aac", ".ogg",
+    ".pdf", ".docx", ".xlsx", ".pptx",
+))
+
+
+def is_compressible(filename):
+    """False para extensões de formatos já comprimidos"""
+    return os.path.splitext(filename)[1].lower() not in COMPRESSED_EXTENSIONS
+
+
+def server_supports_mode_z(features):
+    """True se o FEAT (dicionário de FTPImageUploader.get_features) anuncia MODE Z"""
+    return "Z" in features.get("MODE", "").upper().split()
+
+
+def set_transfer_mode(ftp, mode):
+    """MODE S ou Z na sessão ftplib, só se mudou; o modo atual fica guardado na sessão (que pode vir do pool)"""
+    if getattr(ftp, "transfer_mode", "S") == mode:
+        return
+    ftp.voidcmd(f"MODE {mode}")
+    ftp.transfer_mode = mode
+
+
+class DeflateStream:
+    """Compressor zlib de um envio em MODE Z, bloco a bloco (memória limitada).
+
+    Conta os bytes originais, os bytes que saíram pela conexão e o tempo
+    de CPU gasto comprimindo.
+    """
+
+    def __init__(self, level=6):
+        self._compressor = zlib.compressobj(level)
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.cpu_time = 0.0
+
+    def compress(self, data):
+        started = time.thread_time()
+        out = self._compressor.compress(data)
+        self.cpu_time += time.thread_time() - started
+        self.raw_bytes += len(data)
+        self.sent_bytes += len(out)
+        return out
+
+    def flush(self):
+        started = time.thread_time()
+        out = self._compressor.flush()
+        self.cpu_time += time.thread_time() - started
+        self.sent_bytes += len(out)
+        return out
+
+    @property
+    def ratio(self):
+        return self.raw_bytes / self.sent_bytes if self.sent_bytes else 1.0
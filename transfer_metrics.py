@@ -0,0 +1,202 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites (em segundos) dos baldes dos histogramas de duração
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Fases de uma transferência, na ordem em que acontecem
+PHASES = ("connect", "login", "data_open", "transfer", "verify", "upload")
+
+
+class Histogram:
+    """Histograma cumulativo de durações, no formato do Prometheus"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """[(limite, contagem acumulada)], terminando em +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, fraction):
+        """Limite superior do balde onde cai o quantil (estimativa); None se vazio"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return math.inf
+
+
+class TransferMetrics:
+    """Métricas das transferências: duração por fase, contadores e medidores.
+
+    Compartilhado por todos os uploaders e pelo pool de conexões (como o
+    RateLimiter). As fases são medidas com phase() e ficam em histogramas;
+    os contadores só crescem (bytes, arquivos, tentativas, reconexões) e os
+    medidores guardam o valor atual ou uma função que o calcula na hora do
+    snapshot (profundidade da fila). write() grava um snapshot em texto do
+    Prometheus ou, se o arquivo terminar em .json, em JSON; start_export()
+    regrava o arquivo periodicamente em uma thread.
+    """
+
+    def __init__(self, prefix="ftp_upload", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._export_thread = None
+        self._export_stop = threading.Event()
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Mede o bloco como uma ocorrência da fase (também quando ele levanta exceção)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """value é um número ou uma função sem argumentos chamada a cada snapshot"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def snapshot(self):
+        """Cópia das métricas atuais em um dicionário serializável em JSON"""
+        with self._lock:
+            histograms = {
+                name: {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5),
+                    "p99": h.quantile(0.99),
+                    "buckets": {_format_bound(bound): total for bound, total in h.cumulative()},
+                }
+                for name, h in self._histograms.items()
+            }
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, value in gauges.items():
+            if callable(value):
+                try:
+                    gauges[name] = value()
+                except Exception:
+                    gauges[name] = None
+        for histogram in histograms.values():
+            for key in ("p50", "p99"):
+                if histogram[key] is not None:
+                    histogram[key] = _format_bound(histogram[key])
+        return {
+            "timestamp": time.time(),
+            "phases": histograms,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def to_prometheus(self, snapshot=None):
+        """Snapshot no formato de texto do Prometheus (node_exporter textfile)"""
+        snapshot = snapshot or self.snapshot()
+        name = f"{self.prefix}_phase_seconds"
+        lines = [
+            f"# HELP {name} Duração de cada fase das transferências FTP",
+            f"# TYPE {name} histogram",
+        ]
+        for phase, histogram in sorted(snapshot["phases"].items(), key=lambda item: _phase_order(item[0])):
+            for bound, total in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{bound}"}} {total}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {histogram["count"]}')
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            lines.append(f"{self.prefix}_{counter}_total {value}")
+        for gauge, value in sorted(snapshot["gauges"].items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {self.prefix}_{gauge} gauge")
+            lines.append(f"{self.prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Grava o snapshot (JSON se path termina em .json, senão Prometheus) de forma atômica"""
+        snapshot = self.snapshot()
+        if path.lower().endswith(".json"):
+            content = json.dumps(snapshot, indent=2)
+        else:
+            content = self.to_prometheus(snapshot)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def start_export(self, path, interval=15.0):
+        """Regrava o snapshot em path a cada interval segundos, até stop_export()"""
+        self.stop_export()
+        self._export_stop.clear()
+
+        def export_loop():
+            while not self._export_stop.wait(interval):
+                self._write_quietly(path)
+            # Último snapshot ao parar
+            self._write_quietly(path)
+
+        self._export_thread = threading.Thread(target=export_loop, name="metrics-export", daemon=True)
+        self._export_thread.start()
+
+    def stop_export(self):
+        if self._export_thread:
+            self._export_stop.set()
+            self._export_thread.join(5)
+            self._export_thread = None
+
+    def _write_quietly(self, path):
+        try:
+            self.write(path)
+        except OSError as e:
+            self.logger.error(f"Erro ao gravar métricas em {path}: {str(e)}")
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+def _phase_order(phase):
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
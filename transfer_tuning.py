@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+
+class TransferTuningStore:
+    """Tamanho de bloco e SO_SNDBUF escolhidos para cada servidor.
+
+    Fica em transfer_tuning.json, no mesmo diretório de dados do FileLog,
+    para que uma nova sessão já comece com os valores que funcionaram da
+    última vez. Só é regravado quando os valores de algum host mudam.
+    """
+
+    def __init__(self, app_data_dir=None):
+        if app_data_dir is None:
+            appdata = os.getenv('APPDATA') or os.path.expanduser('~')
+            app_data_dir = os.path.join(appdata, 'FTP Manager')
+        if not os.path.exists(app_data_dir):
+            os.makedirs(app_data_dir)
+        self.tuning_file = os.path.join(app_data_dir, "transfer_tuning.json")
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._hosts = {}
+        try:
+            if os.path.exists(self.tuning_file):
+                with open(self.tuning_file, 'r') as f:
+                    self._hosts = json.load(f)
+        except Exception as e:
+            self.logger.error(f"Erro ao carregar ajustes de transferência: {str(e)}")
+
+    def get(self, host):
+        with self._lock:
+            return dict(self._hosts.get(host, {}))
+
+    def update(self, host, blocksize, sndbuf):
+        """Registra os valores do host e grava o arquivo se algo mudou"""
+        with self._lock:
+            values = {"blocksize": blocksize, "sndbuf": sndbuf}
+            if self._hosts.get(host) == values:
+                return
+            self._hosts[host] = values
+            content = json.dumps(self._hosts, indent=4)
+        try:
+            tmp_file = self.tuning_file + f".{threading.get_ident()}.tmp"
+            with open(tmp_file, 'w') as f:
+                f.write(content)
+            os.replace(tmp_file, self.tuning_file)
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar ajustes de transferência: {str(e)}")
+
+
+class TransferTuner:
+    """Ajusta o tamanho de bloco e o SO_SNDBUF de uma conexão durante o envio.
+
+    A cada `window` segundos mede a vazão do canal de dados. O bloco sobe ou
+    desce por busca de encosta (dobra enquanto a vazão melhora, volta quando
+    piora e para quando estabiliza) e o buffer de envio é ampliado para
+    cobrir o produto vazão x RTT, medido com um NOOP no canal de controle.
+    O buffer só é definido quando passa do padrão do sistema, para não
+    desligar o autoajuste do kernel à toa.
+    """
+
+    MIN_BLOCKSIZE = 16 * 1024
+    MAX_BLOCKSIZE = 4 * 1024 * 1024
+    MAX_SNDBUF = 16 * 1024 * 1024
+
+    def __init__(self, host, store=None, blocksize=65536, window=0.25, remember_min_bytes=8 * 1024 * 1024):
+        self.host = host
+        self.store = store
+        self.window = window
+        # Transferências menores que isso não medem nada útil para lembrar
+        self.remember_min_bytes = remember_min_bytes
+        remembered = store.get(host) if store else {}
+        self.blocksize = remembered.get("blocksize", blocksize)
+        self.sndbuf = remembered.get("sndbuf")
+        self.rtt = None
+        self.logger = logging.getLogger(__name__)
+
+    def measure_rtt(self, ftp):
+        """Mede o RTT com um NOOP, uma vez por sessão de controle"""
+        rtt = getattr(ftp, "tuning_rtt", None)
+        if rtt is None:
+            started = time.perf_counter()
+            ftp.voidcmd("NOOP")
+            rtt = time.perf_counter() - started
+            ftp.tuning_rtt = rtt
+        self.rtt = rtt
+        return rtt
+
+    def prepare(self, conn):
+        """Aplica o SO_SNDBUF lembrado ao socket de dados e zera as medições"""
+        self._conn = conn
+        try:
+            self._current_sndbuf = conn.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        except OSError:
+            self._current_sndbuf = 0
+        if self.sndbuf and self.sndbuf > self._current_sndbuf:
+            self._set_sndbuf(self.sndbuf)
+        self._transfer_bytes = 0
+        self._window_bytes = 0
+        self._window_start = time.perf_counter()
+        self._last_rate = None
+        self._direction = 1
+
+    def sent(self, nbytes, tune_blocksize=True):
+        """Registra um bloco enviado e retorna o tamanho do próximo bloco.
+
+        Com tune_blocksize=False (envio por sendfile) só o buffer é ajustado.
+        """
+        self._transfer_bytes += nbytes
+        self._window_bytes += nbytes
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed >= self.window:
+            self._adapt(self._window_bytes / elapsed, tune_blocksize)
+            self._window_bytes = 0
+            self._window_start = time.perf_counter()
+        return self.blocksize
+
+    def finish(self):
+        """Lembra os valores do host se a transferência foi longa o bastante para medir"""
+        if self.store and self._transfer_bytes >= self.remember_min_bytes:
+            self.store.update(self.host, self.blocksize, self.sndbuf)
+
+    def _adapt(self, rate, tune_blocksize=True):
+        if self.rtt:
+            # Buffer de envio com folga sobre o produto banda x atraso
+            target = min(int(rate * self.rtt * 2), self.MAX_SNDBUF)
+            if target > self._current_sndbuf * 1.25:
+                self._set_sndbuf(target)
+
+        if not tune_blocksize:
+            return
+        if self._last_rate is not None:
+            if rate < self._last_rate * 0.95:
+                self._direction = -self._direction
+            elif rate <= self._last_rate * 1.05:
+                # Vazão estável: mantém o bloco atual
+                self._last_rate = rate
+                return
+        self._last_rate = rate
+        if self._direction > 0:
+            self.blocksize = min(self.blocksize * 2, self.MAX_BLOCKSIZE)
+        else:
+            self.blocksize = max(self.blocksize // 2, self.MIN_BLOCKSIZE)
+
+    def _set_sndbuf(self, size):
+        try:
+            self._conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, size)
+            self._current_sndbuf = self._conn.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+            self.sndbuf = size
+        except OSError as e:
+            self.logger.debug(f"Não foi possível ajustar SO_SNDBUF para {size}: {str(e)}")
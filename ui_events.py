@@ -0,0 +1,72 @@
+import threading
+
+
+class UIBatch:
+    """Atualizações coalescidas retiradas do UIEventBus em um quadro"""
+
+    def __init__(self, statuses, progress, rows, refresh_list, events):
+        # filename -> último status, na ordem da última alteração
+        self.statuses = statuses
+        # filename -> (atual, total) mais recente
+        self.progress = progress
+        self.rows = rows
+        self.refresh_list = refresh_list
+        self.events = events
+
+    def is_empty(self):
+        return not (self.statuses or self.progress or self.rows or self.refresh_list or self.events)
+
+
+class UIEventBus:
+    """Canal entre as threads de trabalho e o loop principal do Tk.
+
+    Os workers publicam registros compactos de status e progresso; o loop
+    principal chama drain() em intervalos fixos e recebe um único lote em
+    que cada arquivo aparece uma vez, com o valor mais recente. Assim a
+    quantidade de trabalho na interface depende da taxa de quadros, e não
+    do número de blocos enviados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._statuses = {}
+        self._progress = {}
+        self._rows = set()
+        self._refresh_list = False
+        self._events = []
+
+    def post_status(self, filename, status):
+        with self._lock:
+            # Reinsere para que a ordem reflita a alteração mais recente
+            self._statuses.pop(filename, None)
+            self._statuses[filename] = status
+
+    def post_progress(self, filename, current, total):
+        with self._lock:
+            self._progress.pop(filename, None)
+            self._progress[filename] = (current, total)
+
+    def post_row(self, filename):
+        """Pede a atualização da linha de um arquivo na tabela"""
+        with self._lock:
+            self._rows.add(filename)
+
+    def post_refresh(self):
+        """Pede a releitura completa da lista de arquivos"""
+        with self._lock:
+            self._refresh_list = True
+
+    def put(self, event):
+        """Publica um evento genérico (ex.: "quit"), entregue em ordem"""
+        with self._lock:
+            self._events.append(event)
+
+    def drain(self):
+        """Retira tudo o que foi publicado desde a última chamada"""
+        with self._lock:
+            batch = UIBatch(self._statuses, self._progress, self._rows, self._refresh_list, self._events)
+            self._reset()
+        return batch
@@ -0,0 +1,523 @@
+import heapq
+import os
+import posixpath
+import queue
+import logging
+import threading
+import time
+
+
+# Classes de prioridade da fila de upload
+PRIORITY_MANUAL = 0  # selecionados em "Enviar Arquivo Manualmente"
+PRIORITY_AUTO = 1    # detectados pelo monitoramento da pasta
+PRIORITY_LOW = 2     # adiados pelo usuário
+
+
+class UploadQueue(queue.Queue):
+    """Fila de upload limitada e priorizada, com no máximo um job por arquivo.
+
+    Os itens são tuplas (filepath, filename) e o filename (caminho relativo à
+    pasta monitorada, com '/') é a chave. Um put()
+    de arquivo que já está na fila só pode elevar a sua prioridade; se o
+    arquivo está sendo enviado, o pedido é guardado e o arquivo volta para a
+    fila quando o worker chamar finish(), para que uma modificação feita
+    durante o envio não se perca. Com maxsize, put() bloqueia (ou levanta
+    queue.Full) quando a fila está cheia, segurando o produtor em vez de
+    acumular memória.
+
+    A ordem é a de menor chave, calculada no put():
+
+        chave = instante de entrada + atraso da classe + tamanho / aging_rate
+
+    Arquivos manuais saem antes de tudo o que entrou até class_delay
+    segundos depois deles, em ordem de chegada. Entre os automáticos, os
+    menores saem primeiro (shortest-job-first), mas cada segundo de espera
+    compensa aging_rate bytes de tamanho, então um arquivo grande acaba
+    passando à frente dos pequenos que continuam chegando.
+
+    get(directory=...) agrupa os envios por diretório: se houver na fila um
+    arquivo do diretório em que a conexão já está, com chave no máximo
+    dir_affinity segundos pior que a do primeiro, ele sai antes, poupando
+    o CWD.
+    """
+
+    def __init__(self, maxsize=0, aging_rate=8 * 1024 * 1024, class_delay=3600.0, dir_affinity=5.0):
+        super().__init__(maxsize)
+        self.aging_rate = aging_rate
+        self.class_delay = class_delay
+        self.dir_affinity = dir_affinity
+        # filename -> entrada [chave, seq, item, instante, tamanho, prioridade] no heap
+        self._queued = {}
+        # diretório -> {filename: entrada} dos arquivos na fila
+        self._dirs = {}
+        self._in_flight = set()
+        self._rerun = {}
+        self._seq = 0
+
+    def _init(self, maxsize):
+        self.queue = []
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, entry):
+        heapq.heappush(self.queue, entry)
+
+    def _get(self, directory=None):
+        entry = self.queue[0]
+        if directory is not None and self.dir_affinity > 0 and posixpath.dirname(entry[2][1]) != directory:
+            candidates = self._dirs.get(directory)
+            if candidates:
+                # Entradas comparam por (chave, seq): o melhor arquivo do diretório
+                best = min(candidates.values())
+                if best[0] - entry[0] <= self.dir_affinity:
+                    entry = best
+        return self._take(entry)
+
+    def _take(self, entry):
+        # Chamado com self.mutex adquirido: tira a entrada do heap e dos índices
+        if entry is self.queue[0]:
+            heapq.heappop(self.queue)
+        else:
+            last = self.queue.pop()
+            if last is not entry:
+                self.queue[self.queue.index(entry)] = last
+                heapq.heapify(self.queue)
+        item = entry[2]
+        del self._queued[item[1]]
+        entry_dir = posixpath.dirname(item[1])
+        siblings = self._dirs[entry_dir]
+        del siblings[item[1]]
+        if not siblings:
+            del self._dirs[entry_dir]
+        self._in_flight.add(item[1])
+        return item
+
+    def get(self, block=True, timeout=None, directory=None):
+        """Como Queue.get; directory é o diretório (relativo) em que a conexão está"""
+        with self.not_empty:
+            if not block:
+                if not self._qsize():
+                    raise queue.Empty
+            elif timeout is None:
+                while not self._qsize():
+                    self.not_empty.wait()
+            elif timeout < 0:
+                raise ValueError("'timeout' must be a non-negative number")
+            else:
+                endtime = time.monotonic() + timeout
+                while not self._qsize():
+                    remaining = endtime - time.monotonic()
+                    if remaining <= 0.0:
+                        raise queue.Empty
+                    self.not_empty.wait(remaining)
+            item = self._get(directory)
+            self.not_full.notify()
+            return item
+
+    def take_small(self, max_size, max_items, max_bytes, timeout=0.0):
+        """Retira de uma vez os arquivos de até max_size bytes, em ordem de chave.
+
+        Para em max_items arquivos ou max_bytes bytes no total. Se não houver
+        nenhum, espera até timeout segundos por um. Retorna [(item, tamanho)];
+        cada item precisa de um finish() como os de get().
+        """
+        endtime = time.monotonic() + timeout
+        with self.not_empty:
+            while True:
+                small = sorted(entry for entry in self.queue if entry[4] <= max_size)
+                remaining = endtime - time.monotonic()
+                if small or remaining <= 0:
+                    break
+                self.not_empty.wait(remaining)
+
+            taken = []
+            total = 0
+            for entry in small[:max_items]:
+                if taken and total + entry[4] > max_bytes:
+                    break
+                total += entry[4]
+                taken.append((self._take(entry), entry[4]))
+            if taken:
+                self.not_full.notify(len(taken))
+            if self._qsize():
+                # O aviso de item novo pode ter sido consumido aqui por um arquivo grande
+                self.not_empty.notify()
+            return taken
+
+    def _key(self, enqueued_at, size, priority):
+        if priority == PRIORITY_MANUAL:
+            return enqueued_at - self.class_delay
+        delay = self.class_delay if priority == PRIORITY_LOW else 0.0
+        return enqueued_at + delay + size / self.aging_rate
+
+    def put(self, item, block=True, timeout=None, priority=PRIORITY_AUTO):
+        """Enfileira o item; retorna False se o arquivo já tinha um job pendente"""
+        key = item[1]
+        try:
+            size = os.path.getsize(item[0])
+        except OSError:
+            size = 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.not_full:
+            while True:
+                if key in self._queued:
+                    if priority < self._queued[key][5]:
+                        self._set_priority(key, priority)
+                    return False
+                if key in self._in_flight:
+                    previous = self._rerun.get(key)
+                    if previous is not None:
+                        priority = min(priority, previous[2])
+                    self._rerun[key] = (item, size, priority)
+                    return False
+                if self.maxsize <= 0 or self._qsize() < self.maxsize:
+                    break
+                if not block:
+                    raise queue.Full
+                if deadline is None:
+                    self.not_full.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Full
+                    self.not_full.wait(remaining)
+            self._enqueue(item, size, priority)
+            return True
+
+    def _enqueue(self, item, size, priority):
+        # Chamado com self.mutex adquirido
+        now = time.monotonic()
+        self._seq += 1
+        entry = [self._key(now, size, priority), self._seq, item, now, size, priority]
+        self._put(entry)
+        self._queued[item[1]] = entry
+        self._dirs.setdefault(posixpath.dirname(item[1]), {})[item[1]] = entry
+        self.unfinished_tasks += 1
+        self.not_empty.notify()
+
+    def _set_priority(self, filename, priority):
+        # Chamado com self.mutex adquirido; mantém o instante de entrada (e o aging)
+        entry = self._queued[filename]
+        entry[0] = self._key(entry[3], entry[4], priority)
+        entry[5] = priority
+        heapq.heapify(self.queue)
+
+    def reprioritize(self, filename, priority):
+        """Muda a classe de um arquivo que ainda está na fila; retorna False se não está"""
+        with self.mutex:
+            if filename not in self._queued:
+                return False
+            self._set_priority(filename, priority)
+            return True
+
+    def finish(self, item):
+        """Marca o job como concluído e reenfileira o arquivo se ele mudou durante o envio.
+
+        Concluir de novo um job que não está em andamento não faz nada.
+        """
+        key = item[1]
+        with self.mutex:
+            if key not in self._in_flight:
+                return
+            self._in_flight.discard(key)
+            self._finished(key)
+            rerun = self._rerun.pop(key, None)
+            if rerun is not None:
+                # Ignora o limite: o job concluído acabou de liberar a vaga
+                self._enqueue(*rerun)
+        self.task_done()
+
+    def _finished(self, key):
+        # Chamado com self.mutex adquirido, uma vez por job concluído, antes de um eventual reenvio
+        pass
+
+    def requeue(self, item):
+        """Devolve à fila um job retirado que não chegou a ser enviado (ex.: pool parado)"""
+        key = item[1]
+        with self.mutex:
+            if key not in self._in_flight:
+                return
+            self._in_flight.discard(key)
+            rerun = self._rerun.pop(key, None)
+            if rerun is not None:
+                item, size, priority = rerun
+            else:
+                try:
+                    size = os.path.getsize(item[0])
+                except OSError:
+                    size = 0
+                priority = PRIORITY_AUTO
+            # Ignora o limite, como o reenvio de finish()
+            self._enqueue(item, size, priority)
+        self.task_done()
+
+    def in_flight_count(self):
+        with self.mutex:
+            return len(self._in_flight)
+
+
+class ParallelUploader:
+    """Pool de conexões FTP paralelas que consome uma fila de upload compartilhada.
+
+    Cada worker cria o seu próprio FTPImageUploader, faz login uma única vez e
+    reutiliza a conexão para todos os arquivos que retirar da fila. A fila
+    contém tuplas (filepath, filename), no mesmo formato usado pela interface;
+    com uma UploadQueue, cada job concluído é informado via finish().
+    Quando o uploader usa um FTPConnectionPool, a sessão volta para o pool
+    sempre que a fila fica ociosa e é retomada já autenticada no próximo arquivo.
+
+    Com um bundler (file_bundler.SmallFileBundler) e uma UploadQueue, os
+    arquivos pequenos são juntados em um tar enviado em um único STOR.
+    """
+
+    def __init__(self, uploader_factory, upload_queue, file_log=None, num_connections=4,
+                 on_status=None, on_progress=None, bundler=None, metrics=None):
+        self.uploader_factory = uploader_factory
+        self.upload_queue = upload_queue
+        self.file_log = file_log
+        self.num_connections = max(1, int(num_connections))
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.bundler = bundler
+        # transfer_metrics.TransferMetrics opcional: fase upload e contadores de arquivos
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+
+        self._stop_event = threading.Event()
+        self._workers = []
+        self._stats_lock = threading.Lock()
+        self._files_done = 0
+        self._files_failed = 0
+        self._bytes_done = 0
+        self._bundles_done = 0
+        # Envios em MODE Z: bytes originais, bytes na rede e CPU de compressão
+        self._compressed_files = 0
+        self._compressed_raw_bytes = 0
+        self._compressed_sent_bytes = 0
+        self._compression_cpu = 0.0
+        self._started_at = None
+
+    def start(self):
+        """Inicia os workers de upload"""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._started_at = time.monotonic()
+        self._workers = []
+        for index in range(self.num_connections):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f"ftp-upload-{index + 1}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+        self.logger.info(f"Pool de upload iniciado com {self.num_connections} conexões")
+
+    def stop(self, timeout=5):
+        """Para os workers e encerra as conexões"""
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self.logger.info("Pool de upload parado")
+
+    def is_running(self):
+        return any(worker.is_alive() for worker in self._workers)
+
+    def stats(self):
+        """Retorna contadores de arquivos e bytes enviados desde o início"""
+        with self._stats_lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0
+            return {
+                "connections": self.num_connections,
+                "files_done": self._files_done,
+                "files_failed": self._files_failed,
+                "bytes_done": self._bytes_done,
+                "elapsed": elapsed,
+                "files_per_sec": self._files_done / elapsed if elapsed > 0 else 0.0,
+                "bundles_done": self._bundles_done,
+                "compressed_files": self._compressed_files,
+                "compressed_raw_bytes": self._compressed_raw_bytes,
+                "compressed_sent_bytes": self._compressed_sent_bytes,
+                "compression_ratio": (self._compressed_raw_bytes / self._compressed_sent_bytes
+                                      if self._compressed_sent_bytes else 1.0),
+                "compression_cpu": self._compression_cpu,
+            }
+
+    def _notify_status(self, filename, status):
+        if self.file_log:
+            self.file_log.update_file_status(filename, status)
+        if self.on_status:
+            try:
+                self.on_status(filename, status)
+            except Exception as e:
+                self.logger.error(f"Erro no callback de status do arquivo {filename}: {str(e)}")
+
+    def _finish(self, item):
+        finish = getattr(self.upload_queue, "finish", None)
+        if finish:
+            finish(item)
+        else:
+            self.upload_queue.task_done()
+
+    def _requeue(self, item):
+        """Devolve à fila um item retirado e não enviado"""
+        requeue = getattr(self.upload_queue, "requeue", None)
+        if requeue:
+            requeue(item)
+        else:
+            self.upload_queue.task_done()
+            self.upload_queue.put(item)
+
+    def _worker_loop(self):
+        """Loop de cada worker: uma conexão, vários arquivos"""
+        uploader = self.uploader_factory()
+        if not uploader.connect():
+            self.logger.warning("Worker sem conexão inicial; tentará reconectar no primeiro upload")
+        # Diretório do último arquivo enviado: a fila prefere arquivos do mesmo diretório
+        directory = None
+        grouped = isinstance(self.upload_queue, UploadQueue)
+
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    if grouped:
+                        item = self.upload_queue.get(timeout=0.5, directory=directory)
+                    else:
+                        item = self.upload_queue.get(timeout=0.5)
+                except queue.Empty:
+                    if uploader.pool and uploader.is_connected:
+                        # Devolve a sessão ao pool, que a mantém aquecida
+                        uploader.disconnect()
+                    continue
+
+                filepath, filename = item
+                directory = posixpath.dirname(filename)
+                if not uploader.is_connected:
+                    uploader.connect()
+
+                if grouped and self.bundler and self.bundler.eligible(filepath):
+                    items = self.bundler.collect(self.upload_queue, item, self._stop_event)
+                    if len(items) >= self.bundler.min_files:
+                        self._upload_bundle(uploader, items)
+                        continue
+                    # Poucos arquivos pequenos: o lote não compensa, vão um a um
+                    for each in items:
+                        self._upload_one_safely(uploader, each)
+                    directory = posixpath.dirname(items[-1][1])
+                    continue
+
+                self._upload_one_safely(uploader, item)
+        finally:
+            uploader.disconnect()
+
+    def _record_upload(self, seconds, uploaded, files=1):
+        if self.metrics:
+            self.metrics.observe("upload", seconds)
+            self.metrics.inc("files_uploaded" if uploaded else "files_failed", files)
+
+    def _upload_one_safely(self, uploader, item):
+        filepath, filename = item
+        try:
+            self._upload_one(uploader, filepath, filename)
+        except Exception as e:
+            self.logger.error(f"Erro no upload do arquivo {filename}: {str(e)}")
+            self._notify_status(filename, f"Erro: {str(e)}")
+        finally:
+            self._finish(item)
+
+    def _upload_bundle(self, uploader, items):
+        """Envia os arquivos como um lote tar e registra cada um no FileLog"""
+        try:
+            for filepath, filename in items:
+                self._notify_status(filename, "Enviando...")
+            started = time.perf_counter()
+            stream = uploader.upload_bundle(items)
+            if self.metrics:
+                self.metrics.observe("upload", time.perf_counter() - started)
+                self.metrics.inc("bundles_uploaded" if stream else "bundles_failed")
+                if stream:
+                    self.metrics.inc("files_uploaded", len(stream.included))
+                    self.metrics.inc("files_failed", len(stream.skipped))
+                else:
+                    self.metrics.inc("files_failed", len(items))
+            if stream is None:
+                with self._stats_lock:
+                    self._files_failed += len(items)
+                for filepath, filename in items:
+                    self._notify_status(filename, "Erro")
+                return
+
+            for filename in stream.skipped:
+                self.logger.error(f"Arquivo não encontrado: {filename}")
+                self._notify_status(filename, "Erro")
+            for filename, (size, mtime, fingerprint) in stream.included.items():
+                if self.file_log:
+                    self.file_log.update_file_mtime(filename, mtime)
+                    # O arquivo só existe no servidor dentro do lote (verify_remote, skip_existing_remote)
+                    self.file_log.update_bundle(filename, stream.name)
+                    if fingerprint:
+                        self.file_log.update_file_hash(filename, fingerprint, size, mtime)
+                        self.file_log.mark_uploaded_hash(filename)
+                    else:
+                        self.file_log.clear_uploaded_hash(filename)
+                self._notify_status(filename, "Enviado")
+            with self._stats_lock:
+                self._files_done += len(stream.included)
+                self._files_failed += len(stream.skipped)
+                self._bytes_done += stream.size
+                self._bundles_done += 1
+        except Exception as e:
+            self.logger.error(f"Erro no envio do lote: {str(e)}")
+            for filepath, filename in items:
+                self._notify_status(filename, f"Erro: {str(e)}")
+        finally:
+            for item in items:
+                self._finish(item)
+
+    def _upload_one(self, uploader, filepath, filename):
+        """Envia um arquivo e registra o resultado no FileLog"""
+        if not os.path.exists(filepath):
+            self.logger.error(f"Arquivo não encontrado: {filepath}")
+            self._notify_status(filename, "Erro")
+            return
+
+        self._notify_status(filename, "Enviando...")
+
+        progress_callback = None
+        if self.on_progress:
+            def progress_callback(current, total):
+                self.on_progress(filename, current, total)
+
+        filesize = os.path.getsize(filepath)
+        started = time.perf_counter()
+        uploaded = uploader.upload_file(filepath, progress_callback=progress_callback, force=True, filename=filename)
+        self._record_upload(time.perf_counter() - started, uploaded)
+        if uploaded:
+            current_mtime = os.path.getmtime(filepath)
+            if self.file_log:
+                self.file_log.update_file_mtime(filename, current_mtime)
+                self.file_log.clear_bundle(filename)
+                if uploader.last_fingerprint:
+                    # Permite reconhecer cópias idênticas deste conteúdo mais tarde
+                    self.file_log.update_file_hash(filename, uploader.last_fingerprint, filesize, current_mtime)
+                    self.file_log.mark_uploaded_hash(filename)
+                else:
+                    # Sem hash deste envio, o registrado é de um conteúdo anterior
+                    self.file_log.clear_uploaded_hash(filename)
+            compression = getattr(uploader, "last_compression", None)
+            with self._stats_lock:
+                self._files_done += 1
+                self._bytes_done += filesize
+                if compression:
+                    self._compressed_files += 1
+                    self._compressed_raw_bytes += compression.raw_bytes
+                    self._compressed_sent_bytes += compression.sent_bytes
+                    self._compression_cpu += compression.cpu_time
+            self._notify_status(filename, "Enviado")
+        else:
+            with self._stats_lock:
+                self._files_failed += 1
+            self._notify_status(filename, "Erro")
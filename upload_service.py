@@ -0,0 +1,673 @@
+import os
+import queue
+import logging
+import threading
+from datetime import datetime
+
+from connection_pool import FTPConnectionPool
+from durable_queue import DurableUploadQueue
+from file_hash import get_fingerprint
+from file_list_model import format_size
+from file_bundler import SmallFileBundler
+from file_stabilizer import FileStabilizer
+from folder_scanner import FolderScanner
+from ftp_uploader import FTPImageUploader
+from rate_limiter import RateLimiter
+from remote_cache import RemoteListingCache
+from remote_dirs import RemoteDirCache, remote_location
+from transfer_metrics import TransferMetrics
+from transfer_tuning import TransferTuningStore
+from upload_pool import ParallelUploader, UploadQueue, PRIORITY_AUTO
+
+
+def _to_int(value, default, minimum=0):
+    try:
+        return max(minimum, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+class UploadService:
+    """Pipeline de upload sem interface gráfica.
+
+    Liga o watchdog à estabilização de arquivos, a estabilização à fila de
+    upload, a fila ao pool de uploaders e todos eles ao FileLog. É usado
+    tanto pela interface Tk (FTPManagerApp) quanto pelo ftp_cli.py, que roda
+    como serviço; por isso não importa nada de GUI nem do Windows.
+
+    As configurações usam as mesmas chaves do ftp_config.json (apply_config).
+    on_status e on_progress recebem as notificações dos workers e
+    on_files_changed(filename=None) é chamado quando a lista de arquivos da
+    pasta muda; todos podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self, file_log, app_data_dir=None, on_status=None, on_progress=None, on_files_changed=None):
+        self.file_log = file_log
+        self.on_status = on_status
+        self.on_progress = on_progress
+        self.on_files_changed = on_files_changed
+        self.logger = logging.getLogger(__name__)
+
+        # Configuração (ver apply_config)
+        self.host = ""
+        self.port = 21
+        self.username = ""
+        self.password = ""
+        self.monitored_folder = ""
+        # Subpastas da monitorada são espelhadas sob remote_dir ("" = diretório inicial do login)
+        self.recursive = True
+        self.remote_dir = ""
+        self.num_connections = 4
+        self.dedup = False
+        self.integrity = False
+        # MODE Z nos servidores que anunciam, para arquivos que não são de formatos já comprimidos
+        self.compress_transfers = True
+        self.stability_window = 2.0
+        # "threads" (ftplib, uma thread por conexão) ou "asyncio" (um loop, muitas transferências)
+        self.upload_engine = "threads"
+        self.async_concurrency = 64
+        self.adaptive_transfer = True
+        self.rate_schedule = []
+        # Segundos entre varreduras de reconciliação
+        self.reconcile_interval = 60.0
+        # Arquivos sem registro no FileLog que já estão no servidor com o mesmo
+        # tamanho são marcados como enviados em vez de reenviados
+        self.skip_existing_remote = False
+        # Arquivos pequenos juntados em lotes tar (só no motor "threads"); o servidor extrai os lotes
+        self.bundle_small_files = False
+        self.bundler = SmallFileBundler()
+        # Snapshot das métricas (Prometheus, ou JSON se terminar em .json), regravado a cada metrics_interval s
+        self.metrics_file = ""
+        self.metrics_interval = 15.0
+        self.auto_upload_enabled = True
+
+        self.is_connected = False
+        self.ftp_uploader = None
+        self.connection_pool = None
+        self.upload_pool = None
+        self.observer = None
+        # Fila limitada, com um job por arquivo; cheia, segura os produtores. Fica em um
+        # journal no disco, então o que estava na fila volta depois de reiniciar (resume_pending)
+        self.upload_queue = DurableUploadQueue(
+            os.path.join(app_data_dir or file_log.app_data_dir, "upload_queue.journal"), maxsize=1000
+        )
+        self._resumed = False
+        # A descoberta de arquivos é feita pelos eventos do watchdog; a varredura
+        # periódica só reconcilia o que eventualmente tenha escapado
+        self.folder_scanner = FolderScanner(recursive=self.recursive)
+        # Arquivos só entram na fila depois de terminarem de ser gravados
+        self.file_stabilizer = FileStabilizer(self.enqueue_file, window=self.stability_window)
+        # Bloco e buffer de envio ajustados pela vazão medida, lembrados por servidor
+        self.transfer_tuning = TransferTuningStore(app_data_dir)
+        # Limite de banda global e por conexão, compartilhado por todos os uploaders
+        self.rate_limiter = RateLimiter()
+        # Diretórios remotos já criados, para não repetir MKD entre conexões
+        self.dir_cache = RemoteDirCache()
+        # Listagens dos diretórios remotos (um MLSD por diretório) para checagens em lote
+        self.remote_cache = RemoteListingCache()
+        # Duração das fases de cada transferência e contadores, para exportação
+        self.metrics = TransferMetrics()
+        self.metrics.set_gauge("queue_depth", self.upload_queue.qsize)
+        self.metrics.set_gauge("in_flight", self.upload_queue.in_flight_count)
+        self.metrics.set_gauge("stabilizing", self.file_stabilizer.pending_count)
+        self._enqueue_lock = threading.Lock()
+        self._failed_files = set()
+        self._stop_event = threading.Event()
+        # Contadores da execução atual para arquivos idênticos não reenviados
+        self.dedup_files_skipped = 0
+        self.dedup_bytes_saved = 0
+
+    def apply_config(self, config):
+        """Aplica as chaves do ftp_config.json (as mesmas gravadas pela interface)"""
+        self.host = config.get('host', self.host)
+        self.port = _to_int(config.get('port'), self.port, minimum=1)
+        self.username = config.get('user', self.username)
+        self.password = config.get('password', self.password)
+        self.monitored_folder = config.get('monitored_folder', self.monitored_folder)
+        self.recursive = bool(config.get('recursive', self.recursive))
+        self.folder_scanner.recursive = self.recursive
+        self.remote_dir = config.get('remote_dir', self.remote_dir) or ""
+        self.num_connections = _to_int(config.get('connections'), self.num_connections, minimum=1)
+        self.dedup = bool(config.get('dedup_hash', self.dedup))
+        self.integrity = bool(config.get('verify_integrity', self.integrity))
+        self.compress_transfers = bool(config.get('compress_transfers', self.compress_transfers))
+        self.stability_window = float(config.get('stability_window', self.stability_window))
+        self.file_stabilizer.window = self.stability_window
+        self.upload_engine = config.get('upload_engine', self.upload_engine)
+        self.async_concurrency = _to_int(config.get('async_concurrency'), self.async_concurrency, minimum=1)
+        self.adaptive_transfer = bool(config.get('adaptive_transfer', self.adaptive_transfer))
+        self.reconcile_interval = float(config.get('reconcile_interval', self.reconcile_interval))
+        self.skip_existing_remote = bool(config.get('skip_existing_remote', self.skip_existing_remote))
+        self.bundle_small_files = bool(config.get('bundle_small_files', self.bundle_small_files))
+        bundler = self.bundler
+        bundler.max_file_size = _to_int(config.get('bundle_max_file_kb'), bundler.max_file_size // 1024, minimum=1) * 1024
+        bundler.min_files = _to_int(config.get('bundle_min_files'), bundler.min_files, minimum=2)
+        bundler.max_files = _to_int(config.get('bundle_max_files'), bundler.max_files, minimum=bundler.min_files)
+        bundler.max_bytes = _to_int(config.get('bundle_max_mb'), bundler.max_bytes // (1024 * 1024), minimum=1) * 1024 * 1024
+        bundler.max_wait = float(config.get('bundle_max_wait', bundler.max_wait))
+        self.metrics_file = config.get('metrics_file', self.metrics_file) or ""
+        self.metrics_interval = float(config.get('metrics_interval', self.metrics_interval))
+        self.rate_limiter.set_default_limits(
+            _to_int(config.get('rate_limit_kbps'), 0),
+            _to_int(config.get('rate_limit_per_connection_kbps'), 0)
+        )
+        self.rate_schedule = config.get('rate_schedule', self.rate_schedule) or []
+        self.rate_limiter.set_schedule(self.rate_schedule)
+
+    def create_uploader(self):
+        """Cria um uploader com as credenciais atuais, um por conexão do pool"""
+        return FTPImageUploader(
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            pool=self.connection_pool,
+            file_log=self.file_log,
+            fingerprint=self.dedup,
+            integrity=self.integrity,
+            tuning=self.transfer_tuning if self.adaptive_transfer else None,
+            rate_limiter=self.rate_limiter,
+            remote_dir=self.remote_dir or None,
+            dir_cache=self.dir_cache,
+            remote_cache=self.remote_cache,
+            compression=self.compress_transfers,
+            metrics=self.metrics
+        )
+
+    def connect(self):
+        """Abre o pool de sessões, testa a conexão e inicia os uploaders"""
+        self.disconnect()
+        # Pode ser outro servidor (ou outro remote_dir)
+        self.dir_cache.clear()
+        self.remote_cache.clear()
+        # Pool de sessões autenticadas compartilhado pelos uploaders
+        self.connection_pool = FTPConnectionPool(
+            self.host, self.port, self.username, self.password,
+            max_size=self.num_connections + 1,
+            metrics=self.metrics
+        )
+        self.ftp_uploader = self.create_uploader()
+        if not self.ftp_uploader.connect():
+            self._close_connection_pool()
+            return False
+        # Conexão testada: devolve a sessão ao pool, que fica com uma sessão além das
+        # dos uploaders para as consultas ao servidor (skip_existing_remote, verify_remote)
+        self.ftp_uploader.disconnect()
+        self.is_connected = True
+        self.resume_pending()
+        self._start_upload_pool()
+        if self.metrics_file:
+            self.metrics.start_export(self.metrics_file, self.metrics_interval)
+        return True
+
+    def disconnect(self):
+        """Para os uploaders, o watchdog e encerra as conexões"""
+        self._stop_upload_pool()
+        if self.ftp_uploader:
+            self.ftp_uploader.disconnect()
+            self.ftp_uploader = None
+        self._close_connection_pool()
+        self.stop_watching()
+        self.is_connected = False
+
+    def close(self):
+        """Encerra o serviço; o FileLog é fechado por quem o criou"""
+        self._stop_event.set()
+        self.disconnect()
+        self.file_stabilizer.stop()
+        self.upload_queue.close()
+        # Grava o último snapshot
+        self.metrics.stop_export()
+
+    def _close_connection_pool(self):
+        """Encerra o pool de sessões e registra suas estatísticas"""
+        if self.connection_pool:
+            stats = self.connection_pool.stats()
+            self.logger.info(
+                f"Pool de conexões: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['evictions']} removidas, login médio {stats['login_avg'] * 1000:.0f} ms"
+            )
+            self.connection_pool.close()
+            self.connection_pool = None
+
+    def _start_upload_pool(self):
+        """Inicia o pool de conexões paralelas que consome a fila de upload"""
+        self._stop_upload_pool()
+        if self.upload_engine == "asyncio":
+            # Só carrega o asyncio quando o motor é usado
+            from async_uploader import AsyncParallelUploader
+            if self.integrity:
+                self.logger.warning("Verificação de integridade não é suportada pelo motor asyncio e será ignorada")
+            if self.bundle_small_files:
+                self.logger.warning("Lotes de arquivos pequenos não são suportados pelo motor asyncio e serão ignorados")
+            self.upload_pool = AsyncParallelUploader(
+                self.host,
+                self.port,
+                self.username,
+                self.password,
+                self.upload_queue,
+                file_log=self.file_log,
+                num_connections=self.async_concurrency,
+                on_status=self._on_upload_status,
+                on_progress=self.on_progress,
+                rate_limiter=self.rate_limiter,
+                remote_dir=self.remote_dir or None,
+                dir_cache=self.dir_cache,
+                remote_cache=self.remote_cache,
+                metrics=self.metrics
+            )
+        else:
+            self.upload_pool = ParallelUploader(
+                self.create_uploader,
+                self.upload_queue,
+                file_log=self.file_log,
+                num_connections=self.num_connections,
+                on_status=self._on_upload_status,
+                on_progress=self.on_progress,
+                bundler=self.bundler if self.bundle_small_files else None,
+                metrics=self.metrics
+            )
+        self.upload_pool.start()
+
+    def _stop_upload_pool(self):
+        """Para o pool de conexões paralelas"""
+        if self.upload_pool:
+            self.upload_pool.stop()
+            self.upload_pool = None
+
+    def _on_upload_status(self, filename, status):
+        if status.startswith("Erro"):
+            # Será tentado de novo na próxima reconciliação
+            with self._enqueue_lock:
+                self._failed_files.add(filename)
+        if self.on_status:
+            self.on_status(filename, status)
+
+    def resume_pending(self):
+        """Devolve à fila os envios interrompidos na execução anterior, sem varrer a pasta.
+
+        Roda uma vez, na primeira conexão. Um job do journal cujo arquivo já
+        consta como "Enviado" com o mesmo mtime terminou antes de a conclusão
+        ser gravada e não é reenviado. Arquivos com status "Aguardando..." ou
+        "Enviando..." que não estavam no journal (execução anterior sem a fila
+        em disco) voltam para "Pendente" e entram na próxima reconciliação.
+        """
+        if self._resumed:
+            return
+        self._resumed = True
+
+        completed = []
+        for (filepath, filename), _ in self.upload_queue.recovered:
+            if self.file_log.get_file_status(filename) != "Enviado":
+                continue
+            last_mtime = self.file_log.get_file_mtime(filename)
+            try:
+                if last_mtime and os.path.getmtime(filepath) <= last_mtime:
+                    completed.append(filename)
+            except OSError:
+                pass
+        restored = self.upload_queue.restore(completed)
+        for filename in restored:
+            self.file_log.update_file_status(filename, "Aguardando...")
+
+        restored_set = set(restored)
+        stale = [
+            filename for filename, info in list(self.file_log.log_data.items())
+            if info.get('status') in ("Aguardando...", "Enviando...") and filename not in restored_set
+        ]
+        for filename in stale:
+            self.file_log.update_file_status(filename, "Pendente")
+        with self._enqueue_lock:
+            self._failed_files.update(stale)
+
+        if restored or completed or stale:
+            self.logger.info(
+                f"Fila retomada: {len(restored)} envios de volta à fila, {len(completed)} já concluídos, "
+                f"{len(stale)} status interrompidos para reconciliar"
+            )
+            self.request_file_list_update()
+
+    def start_watching(self):
+        """Inicia o watchdog na pasta monitorada; retorna False se não foi possível"""
+        self.stop_watching()
+        if not self.monitored_folder or not os.path.isdir(self.monitored_folder):
+            self.logger.error(f"Pasta monitorada não encontrada: {self.monitored_folder}")
+            return False
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            self.logger.error("Dependência watchdog não instalada. Monitoramento automático desabilitado.")
+            return False
+        from file_handler import FileHandler
+
+        observer = Observer()
+        observer.schedule(FileHandler(self.ftp_uploader, self), self.monitored_folder, recursive=self.recursive)
+        try:
+            observer.start()
+        except Exception as e:
+            self.logger.error(f"Erro ao iniciar observer: {str(e)}")
+            return False
+        self.observer = observer
+        self.logger.info(f"Monitorando pasta: {self.monitored_folder}")
+        return True
+
+    def stop_watching(self):
+        """Para o watchdog"""
+        try:
+            if self.observer:
+                self.observer.stop()
+                self.observer.join()
+                self.logger.info("Monitoramento parado")
+        except Exception as e:
+            self.logger.error(f"Erro ao parar monitoramento: {str(e)}")
+        finally:
+            self.observer = None
+
+    def start_discovery(self):
+        """Inicia o watchdog e prepara uma reconciliação completa da pasta"""
+        watching = self.start_watching()
+        # A próxima reconciliação pega os arquivos que chegaram enquanto estava desconectado
+        self.folder_scanner.reset()
+        return watching
+
+    def request_file_list_update(self, filename=None):
+        """Avisa que a lista de arquivos (ou a linha de um arquivo) mudou; seguro entre threads"""
+        if self.on_files_changed:
+            self.on_files_changed(filename)
+
+    def relative_name(self, filepath):
+        """Chave do arquivo no FileLog e na fila: caminho relativo à pasta monitorada, com '/'"""
+        if self.monitored_folder:
+            try:
+                relative = os.path.relpath(filepath, self.monitored_folder)
+            except ValueError:
+                # Outro drive no Windows
+                relative = None
+            if relative and not relative.startswith(os.pardir):
+                return relative.replace(os.sep, "/")
+        return os.path.basename(filepath)
+
+    def local_path(self, filename):
+        """Caminho local de uma chave do FileLog"""
+        return os.path.join(self.monitored_folder, *filename.split("/"))
+
+    def enqueue_file(self, filepath, current_mtime=None):
+        """Coloca um arquivo detectado na fila de upload se ele precisar ser enviado.
+
+        Chamado pela thread do watchdog (via estabilização) e pela varredura
+        de reconciliação.
+        """
+        try:
+            if not (self.is_connected and self.auto_upload_enabled):
+                return False
+
+            filename = self.relative_name(filepath)
+            if current_mtime is None:
+                if not os.path.isfile(filepath):
+                    return False
+                current_mtime = os.path.getmtime(filepath)
+
+            with self._enqueue_lock:
+                # Verifica se o arquivo já foi enviado
+                status = self.file_log.get_file_status(filename)
+                last_mtime = self.file_log.get_file_mtime(filename)
+
+                # Arquivo precisa ser enviado se:
+                # 1. Nunca foi enviado (status None ou "Pendente")
+                # 2. Teve erro no envio anterior
+                # 3. Foi modificado desde o último envio (ou durante o envio atual,
+                #    caso em que a fila o reenvia quando o upload terminar)
+                # 4. Não está atualmente na fila
+                needs_upload = (
+                    not status or
+                    status == "Pendente" or
+                    status == "Erro" or
+                    (status in ("Enviado", "Enviando...") and last_mtime and current_mtime > last_mtime)
+                )
+                if not needs_upload or status == "Aguardando...":
+                    return False
+
+            # Hash e consulta ao servidor fora do lock: não seguram a descoberta dos outros arquivos.
+            # Só um arquivo enviado e depois tocado pode ser duplicata; com erro, precisa ir de novo
+            if self.dedup and status == "Enviado" and self._is_duplicate_content(filepath, filename, current_mtime):
+                return False
+
+            # "Pendente": envio interrompido, que pode ter chegado ao servidor
+            if status in (None, "Pendente") and self.skip_existing_remote and \
+                    self._exists_on_server(filepath, filename, current_mtime):
+                return False
+
+            with self._enqueue_lock:
+                status = self.file_log.get_file_status(filename)
+                if status == "Aguardando...":
+                    # Enfileirado por outra thread durante o hash ou a consulta ao servidor
+                    return False
+                self.logger.info(f"Iniciando upload automático do arquivo: {filename} (mtime: {datetime.fromtimestamp(current_mtime)})")
+                if status != "Enviando...":
+                    self.file_log.update_file_status(filename, "Aguardando...")
+                self.file_log.update_file_mtime(filename, current_mtime)
+
+            # Adiciona à fila de upload
+            try:
+                self.offer_upload((filepath, filename))
+            except queue.Full:
+                self.logger.warning(f"Fila de upload cheia; {filename} será enfileirado na próxima reconciliação")
+                self.file_log.update_file_status(filename, "Pendente")
+                with self._enqueue_lock:
+                    self._failed_files.add(filename)
+                return False
+            self.request_file_list_update(filename)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Erro ao preparar upload do arquivo {filepath}: {str(e)}")
+            filename = self.relative_name(filepath)
+            self.file_log.update_file_status(filename, "Erro")
+            # A varredura não o vê de novo (não mudou): tenta outra vez na próxima reconciliação
+            with self._enqueue_lock:
+                self._failed_files.add(filename)
+            return False
+
+    def offer_upload(self, item, priority=PRIORITY_AUTO, block=True):
+        """Coloca um item na fila limitada de upload.
+
+        Com block, espera por uma vaga (contrapressão sobre o watchdog, a
+        estabilização e a reconciliação do ftp_cli), verificando a cada
+        segundo se o serviço foi desconectado ou parado; só então levanta
+        queue.Full. A interface passa block=False na thread do Tk, que não
+        pode travar, e recebe queue.Full na hora.
+        """
+        while True:
+            try:
+                return self.upload_queue.put(item, block=block, timeout=1, priority=priority)
+            except queue.Full:
+                if not block or not self.is_connected or self._stop_event.is_set():
+                    raise
+
+    def _is_duplicate_content(self, filepath, filename, current_mtime):
+        """True se o conteúdo é idêntico ao último enviado (arquivo tocado ou copiado de novo).
+
+        Chamado sem o _enqueue_lock: só o registro do resultado o adquire.
+        """
+        uploaded_hash = self.file_log.get_uploaded_hash(filename)
+        if not uploaded_hash:
+            return False
+        size = os.path.getsize(filepath)
+        if get_fingerprint(self.file_log, filepath, filename, size, current_mtime) != uploaded_hash:
+            return False
+
+        with self._enqueue_lock:
+            status = self.file_log.get_file_status(filename)
+            if status == "Aguardando...":
+                # Enfileirado por outra thread durante o hash
+                return True
+            if status != "Enviado" or self.file_log.get_uploaded_hash(filename) != uploaded_hash:
+                # Marcado com erro (ex.: verify_remote) ou reenviado durante o hash
+                return False
+            # Conteúdo já está no servidor: só registra o novo mtime, mantendo a data de envio
+            self.file_log.update_file_status(filename, "Enviado", date=self.file_log.get_upload_date(filename) or None)
+            self.file_log.update_file_mtime(filename, current_mtime)
+            self.dedup_files_skipped += 1
+            self.dedup_bytes_saved += size
+        self.logger.info(
+            f"Arquivo {filename} idêntico ao último envio, ignorado "
+            f"({self.dedup_files_skipped} arquivos, {format_size(self.dedup_bytes_saved)} economizados nesta execução)"
+        )
+        return True
+
+    def _exists_on_server(self, filepath, filename, current_mtime):
+        """True se o arquivo ainda não enviado (ou interrompido) já está no servidor com o mesmo tamanho.
+
+        Um arquivo enviado dentro de um lote conta como presente se o lote
+        registrado no FileLog está no servidor e o arquivo não mudou desde
+        então. Se o servidor não puder ser consultado logo (todas as sessões
+        ocupadas, erro na listagem), retorna False e o arquivo é enviado.
+        """
+        bundle = self.file_log.get_bundle(filename)
+        try:
+            remote = self.remote_entries([filename] + ([bundle] if bundle else []), timeout=5)
+        except Exception as e:
+            self.logger.warning(f"Não foi possível consultar {filename} no servidor, será enviado: {str(e)}")
+            return False
+        entry = remote.get(filename)
+        if entry:
+            size, modify = entry
+            present = size == os.path.getsize(filepath) and (modify is None or modify >= int(current_mtime))
+        else:
+            present = bool(bundle and remote.get(bundle)) and self.file_log.get_file_mtime(filename) == current_mtime
+        if not present:
+            return False
+        self.file_log.update_file_status(filename, "Enviado")
+        self.file_log.update_file_mtime(filename, current_mtime)
+        self.logger.info(f"Arquivo {filename} já está no servidor{' (no lote ' + bundle + ')' if not entry else ''}, ignorado")
+        self.request_file_list_update(filename)
+        return True
+
+    def remote_entries(self, filenames, refresh=False, timeout=30):
+        """Tamanho e data remotos de vários arquivos: {filename: (tamanho, modify) ou None}.
+
+        Agrupa os arquivos por diretório remoto e lê cada diretório com um
+        único MLSD (ou LIST), em vez de um SIZE por arquivo. Listagens ainda
+        válidas do cache não vão ao servidor; com refresh todas são relidas.
+        timeout é a espera máxima por uma sessão livre do pool.
+        """
+        by_dir = {}
+        for filename in filenames:
+            directory, name = remote_location(self.remote_dir, filename)
+            by_dir.setdefault(directory, []).append((filename, name))
+
+        listings = {}
+        if not refresh:
+            for directory in by_dir:
+                cached = self.remote_cache.get(directory)
+                if cached is not None:
+                    listings[directory] = cached
+        stale = [directory for directory in by_dir if directory not in listings]
+        if stale:
+            if not self.connection_pool:
+                raise ConnectionError("Não conectado ao servidor FTP")
+            ftp = self.connection_pool.acquire(timeout=timeout)
+            try:
+                for directory in stale:
+                    listings[directory] = self.remote_cache.listing(ftp, directory, refresh=True)
+            except Exception:
+                self.connection_pool.discard(ftp)
+                raise
+            self.connection_pool.release(ftp)
+
+        return {
+            filename: listings[directory].get(name)
+            for directory, names in by_dir.items()
+            for filename, name in names
+        }
+
+    def verify_remote(self, filenames=None):
+        """Confere no servidor, em lote, o tamanho dos arquivos marcados como enviados.
+
+        Os que faltam ou diferem do arquivo local são marcados com erro e
+        reenviados na próxima reconciliação. Um arquivo enviado dentro de um
+        lote está certo se aparece no servidor (lote extraído) ou se o lote
+        está lá. Retorna a lista dos divergentes.
+        """
+        if filenames is None:
+            filenames = [
+                filename for filename, info in list(self.file_log.log_data.items())
+                if info.get('status') == "Enviado"
+            ]
+        local_sizes = {}
+        for filename in filenames:
+            try:
+                local_sizes[filename] = os.path.getsize(self.local_path(filename))
+            except OSError:
+                # Removido localmente: nada a conferir
+                continue
+        bundles = {}
+        for filename in local_sizes:
+            bundle = self.file_log.get_bundle(filename)
+            if bundle:
+                bundles[filename] = bundle
+        remote = self.remote_entries(list(local_sizes) + sorted(set(bundles.values())), refresh=True)
+
+        mismatched = []
+        for filename, size in local_sizes.items():
+            entry = remote.get(filename)
+            if entry and entry[0] == size:
+                continue
+            if not entry and filename in bundles and remote.get(bundles[filename]):
+                continue
+            mismatched.append(filename)
+            self.logger.warning(
+                f"Arquivo {filename} {'com tamanho diferente' if entry else 'ausente'} no servidor"
+            )
+            self.file_log.update_file_status(filename, "Erro")
+            self.request_file_list_update(filename)
+        with self._enqueue_lock:
+            self._failed_files.update(mismatched)
+        self.logger.info(f"Verificação remota: {len(local_sizes)} arquivos, {len(mismatched)} divergentes")
+        return mismatched
+
+    def reconcile(self):
+        """Varredura de reconciliação: enfileira o que mudou desde a última varredura"""
+        try:
+            if self.is_connected and self.auto_upload_enabled:
+                monitored_folder = self.monitored_folder
+                if monitored_folder and os.path.exists(monitored_folder):
+                    changed, removed = self.folder_scanner.scan(monitored_folder)
+                    for filepath, filename, size, mtime in changed:
+                        # Pode estar no meio de uma gravação: passa pela estabilização
+                        self.file_stabilizer.track(filepath)
+                        # Eventos perdidos pelo watchdog também atualizam a linha na interface
+                        self.request_file_list_update(filename)
+
+                    # Arquivos inalterados cujo último envio falhou
+                    with self._enqueue_lock:
+                        failed, self._failed_files = self._failed_files, set()
+                    for filename in failed:
+                        self.enqueue_file(self.local_path(filename))
+
+                    if removed:
+                        self.request_file_list_update()
+
+        except Exception as e:
+            self.logger.error(f"Erro ao verificar novos arquivos: {str(e)}")
+
+    def is_idle(self):
+        """True quando não há arquivos em estabilização, na fila ou sendo enviados"""
+        return self.file_stabilizer.pending_count() == 0 and self.upload_queue.unfinished_tasks == 0
+
+    def wait_until_idle(self, poll_interval=0.2):
+        """Espera o trabalho pendente terminar; retorna False se stop() foi chamado antes"""
+        while not self.is_idle():
+            if self._stop_event.wait(poll_interval):
+                return False
+        return True
+
+    def run_forever(self):
+        """Reconcilia periodicamente até stop() ser chamado (modo serviço)"""
+        self.reconcile()
+        while not self._stop_event.wait(self.reconcile_interval):
+            self.reconcile()
+
+    def stop(self):
+        """Interrompe run_forever()"""
+        self._stop_event.set()